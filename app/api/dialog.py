@@ -1,23 +1,26 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.models.dialog_models import SessionState, DialogAction
-from app.core.deps import get_planner, get_recommender
+from app.core.deps import get_planner, get_prefetcher, get_recommender
 from app.core.logging import get_logger
-from app.sessions.sessions_memory import MemoryStore
+from app.core.utils import _sse, SSE_HEADERS
+from app.services.rec_cache import slot_key, slot_text
+from app.sessions.factory import create_session_store
 
 router = APIRouter()
-session_store = MemoryStore()
+session_store = create_session_store()
 
 class StartOut(BaseModel):
     session_id: str
     message: str
 
 @router.post("/session", response_model=StartOut)
-def create_session(
+async def create_session(
     logger = Depends(lambda: get_logger(__name__)),
 ):
-    sid = session_store.new()
+    sid = await session_store.anew()
     logger.info("session.created", session_id=sid)
     return StartOut(session_id=sid, message="Hi—how can I help today? In a few words, how do you feel.")
 
@@ -51,15 +54,15 @@ def _update_session_state(state: SessionState, action: DialogAction):
 
 
 
-@router.post("/chat", response_model=ChatOut)
-def chat_step(
-    payload: ChatIn,
-    planner = Depends(get_planner),
-    recommender = Depends(get_recommender),
-    logger = Depends(lambda: get_logger(__name__)),
-):
+CRISIS_REPLY = ("I'm concerned by what you shared. I can't provide recommendations in potential crisis situations. "
+                "Please consider reaching out to a trusted person or local professional support. "
+                "If you're in immediate danger, contact local emergency services.")
+
+
+async def _plan_turn(payload: ChatIn, planner, logger) -> tuple[str, SessionState, DialogAction]:
+    """Record the user message, run the planner and persist the merged slots."""
     sid = payload.session_id
-    state = session_store.get(sid)
+    state = await session_store.aget(sid)
     if not state:
         raise HTTPException(status_code=401, detail="invalid session_id")
 
@@ -67,7 +70,7 @@ def chat_step(
     state.turns.append({"role":"user","content":user_msg})
 
     try:
-        action = planner.plan(state, user_msg)
+        action = await planner.plan(state, user_msg, sid)
     except Exception as e:
         logger.exception("planner.failed", error=str(e))
         raise HTTPException(status_code=500, detail="Planner failed.")
@@ -75,35 +78,118 @@ def chat_step(
     logger.info("planner.action", action=action.model_dump())
     _update_session_state(state, action)
     session_store.set(sid, state)
+    return sid, state, action
+
 
+def _direct_reply(action: DialogAction) -> ChatOut | None:
+    """Reply that needs no generation, or None when the recommender must run."""
     if action.safety in ("crisis","medical"):
-        text = ("I'm concerned by what you shared. I can't provide recommendations in potential crisis situations. "
-                "Please consider reaching out to a trusted person or local professional support. "
-                "If you're in immediate danger, contact local emergency services.")
-        state.turns.append({"role":"assistant","content":text})
-        session_store.set(sid, state)
-        return ChatOut(reply=text, stage="end")
+        return ChatOut(reply=CRISIS_REPLY, stage="end")
 
     if action.stage in ("ask_feelings","ask_context","ask_duration"):
         question = action.next_question or "Could you tell me a bit more?"
-        state.turns.append({"role":"assistant","content":question})
-        session_store.set(sid, state)
         return ChatOut(reply=question, stage=action.stage)
 
     if action.stage == "confirm":
         question = action.next_question or (action.summary or "Shall I suggest a few essences?")
-        state.turns.append({"role":"assistant","content":question})
-        session_store.set(sid, state)
         return ChatOut(reply=question, stage="confirm")
 
     if action.stage in ("recommend","end"):
-        summary = action.summary or "feelings and context as discussed"
-        text = action.recommendation_text or recommender.recommend(summary)
-        state.turns.append({"role":"assistant","content":text})
-        session_store.set(sid, state)
-        return ChatOut(reply=text, stage="recommend")
+        if action.recommendation_text:
+            return ChatOut(reply=action.recommendation_text, stage="recommend")
+        return None
 
     question = action.next_question or "How are you feeling right now?"
-    state.turns.append({"role":"assistant","content":question})
-    session_store.set(sid, state)
     return ChatOut(reply=question, stage=action.stage)
+
+
+def _slots_complete(state: SessionState) -> bool:
+    return bool(state.feelings and state.duration and (state.goal or state.context))
+
+
+def _maybe_prefetch(sid: str, state: SessionState, action: DialogAction, recommender, prefetcher) -> None:
+    """Start retrieval in the background once the next turn is likely to be the recommendation."""
+    if action.safety != "ok" or action.stage in ("recommend", "end"):
+        return
+    if action.stage != "confirm" and not _slots_complete(state):
+        return
+    key = slot_key(state)
+    version = recommender.retriever.chroma_repo.version
+    cached = recommender.cache_key(state)
+    if key is None or (cached is not None and recommender.cache.has(cached, version)):
+        return
+    summary = recommender.summary_for(action.summary or slot_text(state), state)
+    prefetcher.start(sid, key, version, recommender.contexts(summary))
+
+
+async def _prefetched(sid: str, state: SessionState, recommender, prefetcher):
+    return await prefetcher.take(sid, slot_key(state), recommender.retriever.chroma_repo.version)
+
+
+def _finish_turn(sid: str, state: SessionState, out: ChatOut, planner) -> ChatOut:
+    state.turns.append({"role":"assistant","content":out.reply})
+    session_store.set(sid, state)
+    # Summarizing older turns waits until the reply is out; the next turn picks the summary up.
+    planner.compactor.fold_later(sid, state)
+    return out
+
+
+@router.post("/chat", response_model=ChatOut)
+async def chat_step(
+    payload: ChatIn,
+    planner = Depends(get_planner),
+    recommender = Depends(get_recommender),
+    prefetcher = Depends(get_prefetcher),
+    logger = Depends(lambda: get_logger(__name__)),
+):
+    sid, state, action = await _plan_turn(payload, planner, logger)
+
+    out = _direct_reply(action)
+    if out is None:
+        summary = action.summary or "feelings and context as discussed"
+        contexts = await _prefetched(sid, state, recommender, prefetcher)
+        out = ChatOut(reply=await recommender.recommend(summary, state=state, contexts=contexts), stage="recommend")
+    else:
+        _maybe_prefetch(sid, state, action, recommender, prefetcher)
+    return _finish_turn(sid, state, out, planner)
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    payload: ChatIn,
+    planner = Depends(get_planner),
+    recommender = Depends(get_recommender),
+    prefetcher = Depends(get_prefetcher),
+    logger = Depends(lambda: get_logger(__name__)),
+):
+    """Same turn as /chat, but the recommendation is streamed as SSE `delta` events.
+
+    Non-generated replies arrive as a single delta. The stream always ends with a
+    `done` event carrying the full ChatOut (or an `error` event).
+    """
+    sid, state, action = await _plan_turn(payload, planner, logger)
+    out = _direct_reply(action)
+    if out is not None:
+        _maybe_prefetch(sid, state, action, recommender, prefetcher)
+
+    async def events():
+        if out is not None:
+            yield _sse("delta", {"text": out.reply})
+            yield _sse("done", _finish_turn(sid, state, out, planner).model_dump())
+            return
+
+        summary = action.summary or "feelings and context as discussed"
+        parts = []
+        try:
+            contexts = await _prefetched(sid, state, recommender, prefetcher)
+            async for delta in recommender.recommend_stream(summary, state=state, contexts=contexts):
+                parts.append(delta)
+                yield _sse("delta", {"text": delta})
+        except Exception as e:
+            logger.exception("recommender.stream.failed", error=str(e))
+            yield _sse("error", {"detail": "Recommendation failed."})
+            return
+        final = ChatOut(reply="".join(parts), stage="recommend")
+        yield _sse("done", _finish_turn(sid, state, final, planner).model_dump())
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,18 +1,51 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
 from app.core.settings import settings
-from app.core.deps import get_chroma_repository
+from app.repositories.vector_store import active_collection
+from app.core.deps import get_async_openai_service, get_chroma_repository, get_embedding_cache, get_fast_planner, get_prefetcher, get_recommendation_cache
 from app.repositories.chroma import ChromaRepository
+from app.api.dialog import session_store
 
 router = APIRouter()
 
 @router.get("/stats")
-def stats(settings=Depends(lambda: settings), chroma_repo: ChromaRepository = Depends(get_chroma_repository)):
+def stats(
+    settings=Depends(lambda: settings),
+    chroma_repo: ChromaRepository = Depends(get_chroma_repository),
+    embedding_cache=Depends(get_embedding_cache),
+    recommendation_cache=Depends(get_recommendation_cache),
+    prefetcher=Depends(get_prefetcher),
+    fast_planner=Depends(get_fast_planner),
+    async_openai_service=Depends(get_async_openai_service),
+):
     try:
-        cnt = chroma_repo.collection.count()
+        cnt = chroma_repo.count()
     except Exception:
         cnt = -1
-    return {"collection": settings.COLLECTION_NAME, "count": cnt, "persist_directory": settings.CHROMA_DIR}
+    return {
+        "collection": active_collection(),
+        "count": cnt,
+        "persist_directory": settings.CHROMA_DIR,
+        "vector_backend": settings.VECTOR_BACKEND,
+        "lexical_count": chroma_repo.lexical.count() if chroma_repo.lexical else None,
+        "embed_cache": embedding_cache.stats() if embedding_cache else None,
+        "embed_batcher": async_openai_service.batcher.stats() if async_openai_service.batcher else None,
+        "recommendation_cache": recommendation_cache.stats() if recommendation_cache else None,
+        "prefetch": prefetcher.stats(),
+        "fast_planner": fast_planner.stats() if fast_planner else None,
+        "sessions": session_store.stats(),
+    }
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+@router.get("/ready")
+def ready(request: Request):
+    """503 until the vector store is open and warm; /health only says the process is up."""
+    state = request.app.state
+    if state.startup_error:
+        return JSONResponse({"status": "failed", "error": state.startup_error}, status_code=503)
+    if not state.ready.is_set():
+        return JSONResponse({"status": "starting", "steps": state.startup_timings}, status_code=503)
+    return {"status": "ready", "startup": state.startup_timings}
@@ -1,20 +1,23 @@
-import glob
 import os
-import pathlib
-import time
+import shutil
 from fastapi import APIRouter, Depends, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from app.core.logging import get_logger
-from app.core.deps import get_ingest_service
-from app.services.ingest import IngestService, IngestResult
+from app.core.deps import get_job_manager
+from app.services.jobs import JobManager
 
 router = APIRouter()
 
-@router.post("/ingest/pdf")
+def _spool_upload(file: UploadFile, dest: str) -> None:
+    with open(dest, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1024 * 1024)
+
+@router.post("/ingest/pdf", status_code=202)
 async def ingest_pdf(
     file: UploadFile = File(...),
     logger = Depends(lambda: get_logger(__name__)),
-    ingest_service: IngestService = Depends(get_ingest_service)
+    jobs: JobManager = Depends(get_job_manager),
 ):
     fname = file.filename
     if not fname:
@@ -22,26 +25,45 @@ async def ingest_pdf(
     if not fname.lower().endswith(".pdf"):
         return JSONResponse({"ok": False, "msg": "Only PDF files are supported."}, status_code=400)
     try:
-        data = await file.read()
-        result: IngestResult = ingest_service.ingest_document(data, fname)
-        if result.error:
-            return JSONResponse({"ok": False, "msg": result.error}, status_code=result.status)
-        return {"ok": True, "chunks": result.count, "file": fname, "seconds": round(result.seconds or 0, 2)}
+        job_id = jobs.new_id()
+        await run_in_threadpool(_spool_upload, file, jobs.upload_path(job_id))
+        job = jobs.submit_pdf(job_id, fname)
+        return {"ok": True, "job_id": job.id, "file": fname}
     except Exception as e:
         logger.exception("ingest.pdf.failed", filename=fname, error=str(e))
         return JSONResponse({"ok": False, "msg": str(e)}, status_code=500)
 
-@router.post("/ingest/folder")
+@router.post("/ingest/folder", status_code=202)
 def ingest_folder(
     path: str = Form(...),
+    sync: bool = Form(False),
     logger = Depends(lambda: get_logger(__name__)),
-    ingest_service: IngestService = Depends(get_ingest_service)
+    jobs: JobManager = Depends(get_job_manager),
 ):
+    if not os.path.isdir(path):
+        return JSONResponse({"ok": False, "msg": "Folder not found."}, status_code=400)
     try:
-        result: IngestResult = ingest_service.ingest_folder(path)
-        if result.error:
-            return JSONResponse({"ok": False, "msg": result.error}, status_code=result.status)
-        return {"ok": True, "chunks": result.count, "files": None, "seconds": round(result.seconds or 0, 2)}
+        job = jobs.submit_folder(path, sync=sync)
+        return {"ok": True, "job_id": job.id, "path": path, "sync": sync}
     except Exception as e:
         logger.exception("ingest.folder.failed", path=path, error=str(e))
         return JSONResponse({"ok": False, "msg": str(e)}, status_code=500)
+
+@router.get("/ingest/jobs")
+def list_jobs(jobs: JobManager = Depends(get_job_manager)):
+    return {"jobs": [j.report() for j in jobs.list()]}
+
+@router.get("/ingest/jobs/{job_id}")
+def get_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    job = jobs.get(job_id)
+    if not job:
+        return JSONResponse({"ok": False, "msg": "Unknown job."}, status_code=404)
+    return job.report()
+
+@router.post("/ingest/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    if not jobs.get(job_id):
+        return JSONResponse({"ok": False, "msg": "Unknown job."}, status_code=404)
+    if not jobs.cancel(job_id):
+        return JSONResponse({"ok": False, "msg": "Job already finished."}, status_code=409)
+    return {"ok": True, "job_id": job_id}
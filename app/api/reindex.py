@@ -0,0 +1,31 @@
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.core.deps import get_chroma_service, get_reindexer
+from app.services.reindex import ReindexRunner
+
+router = APIRouter()
+
+class ReindexIn(BaseModel):
+    dimensions: Optional[int] = None   # None or 0: the model's full size
+    mode: str = "auto"                 # auto | truncate | reembed
+    collection: Optional[str] = None
+    switch: bool = True
+    min_recall: float = 0.0
+
+@router.post("/reindex", status_code=202)
+async def start_reindex(
+    req: ReindexIn,
+    reindexer: ReindexRunner = Depends(get_reindexer),
+    chroma_service = Depends(get_chroma_service),
+):
+    """Build the collection at another embedding size in the background; it replaces the served one when done."""
+    try:
+        return reindexer.start(chroma_service=chroma_service, **req.model_dump())
+    except RuntimeError as e:
+        return JSONResponse({"ok": False, "msg": str(e)}, status_code=409)
+
+@router.get("/reindex")
+async def reindex_status(reindexer: ReindexRunner = Depends(get_reindexer)):
+    return reindexer.state
@@ -1,44 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.models.models import AskIn, AskOut
 from app.core.settings import settings
-from app.core.deps import get_logger, get_openai_service, get_retriever, get_chroma_repository
-from app.services.openai import OpenAIService
-from app.repositories.chroma import ChromaRepository
-import tiktoken
+from app.core.deps import get_logger, get_async_openai_service, get_retriever
+from app.services.openai import AsyncOpenAIService
+from app.services.retriever import Retriever
+from app.services.context_packer import pack_contexts
 from app.prompts.retrieval import RETRIEVAL_SYSTEM_PROMPT
+from app.core.utils import _sse, SSE_HEADERS
 
 router = APIRouter()
 
-def _get_token_count(text: str) -> int:
-    enc = tiktoken.encoding_for_model(settings.OPENAI_EMBED_MODEL)
-    return len(enc.encode(text))
-
-def _embed(texts, openai_service: OpenAIService, logger=None):
-    MAX_TOKENS = 250000
-    batches = []
-    current_batch = []
-    current_tokens = 0
-    for t in texts:
-        t_tokens = _get_token_count(t)
-        if current_tokens + t_tokens > MAX_TOKENS and current_batch:
-            batches.append(current_batch)
-            current_batch = []
-            current_tokens = 0
-        current_batch.append(t)
-        current_tokens += t_tokens
-    if current_batch:
-        batches.append(current_batch)
-    out = []
-    for batch in batches:
-        try:
-            embeddings = openai_service.embed(batch)
-            out.extend(embeddings)
-        except Exception as e:
-            if logger:
-                logger.error(f"Embedding failed: {e}")
-            raise HTTPException(status_code=500, detail="Embedding failed.")
-    return out
-
 def _build_prompt(question: str, contexts):
     sections = []
     for c in contexts:
@@ -58,39 +30,38 @@ def _build_prompt(question: str, contexts):
         f"Answer:\n"
     )
 
-# --- Route ---
-@router.post("/ask", response_model=AskOut)
-def ask(
-    payload: AskIn,
-    logger = Depends(get_logger),
-    openai_service: OpenAIService = Depends(get_openai_service),
-    chroma_repo: ChromaRepository = Depends(get_chroma_repository),
-):
+async def _retrieve_contexts(payload: AskIn, retriever: Retriever, logger):
     k = payload.k or settings.TOP_K
     try:
-        qvecs = _embed([payload.question], openai_service, logger)
-        if not qvecs:
-            raise HTTPException(status_code=500, detail="Failed to embed question.")
-        qvec = qvecs[0]
-        res = chroma_repo.query(query_embeddings=[qvec], n_results=k, where=payload.where or None)
-        docs = res.get("documents", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
+        hits, qvec = await retriever.search(payload.question, k=k, where=payload.where or None)
     except Exception as e:
         logger.error(f"Retrieval failed: {e}")
         raise HTTPException(status_code=500, detail="Retrieval failed.")
+    return [{"text": c["text"], "metadata": c["meta"]} for c in pack_contexts(hits, qvec)]
 
-    contexts = [{"text": d, "metadata": m} for d, m in zip(docs, metas)]
-    if not contexts:
-        return AskOut(answer="I couldn't find anything in the current index.")
+def _answer_messages(question: str, contexts):
+    return [
+        {"role": "system", "content": RETRIEVAL_SYSTEM_PROMPT},
+        {"role": "user", "content": _build_prompt(question, contexts)},
+    ]
 
-    prompt = _build_prompt(payload.question, contexts)
+NO_CONTEXT_ANSWER = "I couldn't find anything in the current index."
+
+# --- Route ---
+@router.post("/ask", response_model=AskOut)
+async def ask(
+    payload: AskIn,
+    logger = Depends(get_logger),
+    openai_service: AsyncOpenAIService = Depends(get_async_openai_service),
+    retriever: Retriever = Depends(get_retriever),
+):
+    contexts = await _retrieve_contexts(payload, retriever, logger)
+    if not contexts:
+        return AskOut(answer=NO_CONTEXT_ANSWER)
 
     try:
-        answer = openai_service.chat(
-            messages=[
-                {"role": "system", "content": RETRIEVAL_SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
+        answer = await openai_service.chat(
+            messages=_answer_messages(payload.question, contexts),
             model=settings.OPENAI_CHAT_MODEL,
             temperature=0.1,
         )
@@ -99,3 +70,35 @@ def ask(
         raise HTTPException(status_code=500, detail="Chat completion failed.")
 
     return AskOut(answer=answer)
+
+@router.post("/ask/stream")
+async def ask_stream(
+    payload: AskIn,
+    logger = Depends(get_logger),
+    openai_service: AsyncOpenAIService = Depends(get_async_openai_service),
+    retriever: Retriever = Depends(get_retriever),
+):
+    """Streamed /ask: SSE `delta` events, then `done` with the full AskOut."""
+    contexts = await _retrieve_contexts(payload, retriever, logger)
+
+    async def events():
+        if not contexts:
+            yield _sse("delta", {"text": NO_CONTEXT_ANSWER})
+            yield _sse("done", AskOut(answer=NO_CONTEXT_ANSWER).model_dump())
+            return
+        parts = []
+        try:
+            async for delta in openai_service.chat_stream(
+                messages=_answer_messages(payload.question, contexts),
+                model=settings.OPENAI_CHAT_MODEL,
+                temperature=0.1,
+            ):
+                parts.append(delta)
+                yield _sse("delta", {"text": delta})
+        except Exception as e:
+            logger.error(f"Chat completion failed: {e}")
+            yield _sse("error", {"detail": "Chat completion failed."})
+            return
+        yield _sse("done", AskOut(answer="".join(parts)).model_dump())
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
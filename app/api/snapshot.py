@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import time
+from fastapi import APIRouter, Depends, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.background import BackgroundTask
+from app.core.logging import get_logger
+from app.repositories.vector_store import active_collection
+from app.core.deps import get_chroma_repository
+from app.repositories.chroma import ChromaRepository
+from app.services.snapshot import export_snapshot, import_snapshot
+
+router = APIRouter()
+
+def _temp_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="snapshot-", suffix=suffix)
+    os.close(fd)
+    return path
+
+@router.get("/snapshot")
+async def download_snapshot(
+    logger = Depends(lambda: get_logger(__name__)),
+    chroma_repo: ChromaRepository = Depends(get_chroma_repository),
+):
+    path = _temp_path(".zip")
+    try:
+        await run_in_threadpool(export_snapshot, chroma_repo, path)
+    except Exception as e:
+        os.remove(path)
+        logger.exception("snapshot.export.failed", error=str(e))
+        return JSONResponse({"ok": False, "msg": str(e)}, status_code=500)
+    name = f"{active_collection()}-{time.strftime('%Y%m%d-%H%M%S')}.snapshot.zip"
+    return FileResponse(path, media_type="application/zip", filename=name, background=BackgroundTask(os.remove, path))
+
+@router.post("/snapshot")
+async def upload_snapshot(
+    file: UploadFile = File(...),
+    force: bool = Form(False),
+    logger = Depends(lambda: get_logger(__name__)),
+    chroma_repo: ChromaRepository = Depends(get_chroma_repository),
+):
+    path = _temp_path(".zip")
+    try:
+        with open(path, "wb") as out:
+            await run_in_threadpool(shutil.copyfileobj, file.file, out, 1024 * 1024)
+        result = await run_in_threadpool(import_snapshot, chroma_repo, path, None, force)
+        return {"ok": True, **result}
+    except ValueError as e:
+        return JSONResponse({"ok": False, "msg": str(e)}, status_code=400)
+    except Exception as e:
+        logger.exception("snapshot.import.failed", filename=file.filename, error=str(e))
+        return JSONResponse({"ok": False, "msg": str(e)}, status_code=500)
+    finally:
+        os.remove(path)
@@ -0,0 +1,128 @@
+"""Maintenance commands that run against the configured collection without the server.
+
+Usage:
+    python -m app.cli export snapshot.zip
+    python -m app.cli import snapshot.zip [--force] [--batch 2000]
+    python -m app.cli reindex --dimensions 512 [--mode auto|truncate|reembed] [--no-switch] [--min-recall 0.9]
+    python -m app.cli activate flower_medicine
+
+Stop the server first (or point CHROMA_DIR at a copy): Chroma's files are
+not meant to be written by two processes at once. To reindex a running
+server without downtime use `POST /api/reindex` instead; a running server
+follows `activate` on its next call.
+"""
+import argparse
+import json
+import os
+import sys
+
+from app.core.logging import get_logger, setup_logging
+from app.core.settings import settings
+from app.repositories.chroma import ChromaRepository
+from app.repositories.vector_store import collection_exists, create_vector_store
+from app.services.lexical_index import LexicalIndex
+from app.services.openai import OpenAIService
+from app.services.reindex import MODES, lock_reindex, reindex
+from app.services.snapshot import export_snapshot, import_snapshot
+
+
+def open_repository() -> ChromaRepository:
+    lexical = None
+    if settings.RETRIEVAL_MODE == "hybrid":
+        lexical = LexicalIndex(settings.LEXICAL_INDEX_PATH or os.path.join(settings.CHROMA_DIR, "lexical.sqlite3"))
+    return ChromaRepository(
+        create_vector_store(), lexical=lexical, version_path=os.path.join(settings.CHROMA_DIR, "collection.version"),
+        reopen=lambda name: create_vector_store(collection=name),
+    )
+
+
+def close_repository(repo: ChromaRepository) -> None:
+    repo.close()
+    if repo.lexical is not None:
+        repo.lexical.close()
+
+
+def cmd_export(repo: ChromaRepository, args) -> dict:
+    manifest = export_snapshot(repo, args.path, args.part_rows)
+    return {"path": args.path, "rows": manifest["rows"], "parts": len(manifest["parts"]), "bytes": os.path.getsize(args.path)}
+
+
+def cmd_import(repo: ChromaRepository, args) -> dict:
+    def progress(done: int, total: int) -> None:
+        print(f"\r{done}/{total} rows", end="", file=sys.stderr, flush=True)
+
+    result = import_snapshot(repo, args.path, args.batch, args.force, progress)
+    print(file=sys.stderr)
+    return result
+
+
+def cmd_reindex(repo: ChromaRepository, args) -> dict:
+    def progress(done: int, total: int) -> None:
+        print(f"\r{done}/{total} rows", end="", file=sys.stderr, flush=True)
+
+    held = lock_reindex()
+    openai_service = OpenAIService(settings.OPENAI_API_KEY)
+    try:
+        result = reindex(repo, args.dimensions, args.mode, args.collection, openai_service,
+                         switch=not args.no_switch, min_recall=args.min_recall, progress=progress)
+    finally:
+        openai_service.close()
+        held.close()
+    print(file=sys.stderr)
+    return result
+
+
+def cmd_activate(repo: ChromaRepository, args) -> dict:
+    if not collection_exists(args.collection):
+        raise ValueError(f"Collection {args.collection} does not exist.")
+    store = create_vector_store(collection=args.collection)
+    if not store.count():
+        store.close()
+        raise ValueError(f"Collection {args.collection} is empty.")
+    repo.switch(store)  # closed with the repository
+    return {"collection": args.collection, "rows": store.count(), **store.embedding}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="write the collection to a snapshot file")
+    export.add_argument("path")
+    export.add_argument("--part-rows", type=int, default=None, help=f"default {settings.SNAPSHOT_PART_ROWS}")
+    export.set_defaults(run=cmd_export)
+
+    load = sub.add_parser("import", help="bulk-load a snapshot file into the collection")
+    load.add_argument("path")
+    load.add_argument("--batch", type=int, default=None, help=f"rows per upsert, default {settings.SNAPSHOT_IMPORT_BATCH}")
+    load.add_argument("--force", action="store_true", help="load even if the snapshot used another embedding model")
+    load.set_defaults(run=cmd_import)
+
+    rebuild = sub.add_parser("reindex", help="rebuild the collection at another embedding size and switch to it")
+    rebuild.add_argument("--dimensions", type=int, default=settings.OPENAI_EMBED_DIMENSIONS,
+                         help="0 = the model's full size; default OPENAI_EMBED_DIMENSIONS")
+    rebuild.add_argument("--mode", choices=MODES, default="auto")
+    rebuild.add_argument("--collection", default=None, help="target collection, default COLLECTION_NAME_<dimensions>")
+    rebuild.add_argument("--no-switch", action="store_true", help="build and measure recall, keep serving the old one")
+    rebuild.add_argument("--min-recall", type=float, default=0.0, help="do not switch below this recall@k")
+    rebuild.set_defaults(run=cmd_reindex)
+
+    activate = sub.add_parser("activate", help="serve another existing collection from the next server start")
+    activate.add_argument("collection")
+    activate.set_defaults(run=cmd_activate)
+
+    args = ap.parse_args()
+    setup_logging()
+    repo = open_repository()
+    try:
+        result = args.run(repo, args)
+    except ValueError as e:
+        get_logger(__name__).error("cli.failed", command=args.command, error=str(e))
+        sys.exit(1)
+    finally:
+        close_repository(repo)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
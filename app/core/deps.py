@@ -1,40 +1,75 @@
+from typing import TYPE_CHECKING
+
 from fastapi import Depends, Request
-from app.services.openai import OpenAIService
+from app.services.openai import OpenAIService, AsyncOpenAIService
 from app.core.settings import settings
 from app.services.planner import Planner
 from app.services.recommender import Recommender
 from app.services.retriever import Retriever
 from app.core.logging import get_logger as _get
-from app.services.chroma import ChromaService
 from app.repositories.chroma import ChromaRepository
 from app.services.ingest import IngestService
+from app.services.embedding_cache import EmbeddingCache
+from app.services.jobs import JobManager
+from app.services.rec_cache import RecommendationCache
+from app.services.prefetch import Prefetcher
+from app.services.fast_planner import FastPlanner
+from app.services.reindex import ReindexRunner
+
+if TYPE_CHECKING:  # chromadb is only imported when VECTOR_BACKEND=chroma
+    from app.services.chroma import ChromaService
 
 def get_logger(name: str = "app"):
     return _get(name)
 
-def get_chroma_service(request: Request) -> ChromaService:
+def get_chroma_service(request: Request) -> "ChromaService | None":
     return request.app.state.chroma_service
 
-def get_chroma_repository(
-    chroma_service: ChromaService = Depends(get_chroma_service)
-) -> ChromaRepository:
-    return ChromaRepository(chroma_service)
+# Clients below are created once in the app lifespan and shared by every request.
+
+def get_chroma_repository(request: Request) -> ChromaRepository:
+    return request.app.state.chroma_repository
+
+def get_reindexer(request: Request) -> ReindexRunner:
+    return request.app.state.reindexer
+
+def get_embedding_cache(request: Request) -> EmbeddingCache | None:
+    return request.app.state.embedding_cache
 
-def get_openai_service():
-    return OpenAIService(settings.OPENAI_API_KEY)
+def get_openai_service(request: Request) -> OpenAIService:
+    return request.app.state.openai_service
 
-def get_retriever(openai_service=Depends(get_openai_service), chroma_repository=Depends(get_chroma_repository)):
+def get_async_openai_service(request: Request) -> AsyncOpenAIService:
+    return request.app.state.async_openai_service
+
+def get_retriever(openai_service=Depends(get_async_openai_service), chroma_repository=Depends(get_chroma_repository)):
     return Retriever(openai_service, chroma_repository)
 
-def get_planner(openai_service=Depends(get_openai_service)):
-    return Planner(openai_service, settings.OPENAI_CHAT_MODEL)
+def get_fast_planner(request: Request) -> FastPlanner | None:
+    return request.app.state.fast_planner
+
+def get_planner(openai_service=Depends(get_async_openai_service), fast_planner=Depends(get_fast_planner)):
+    return Planner(openai_service, settings.OPENAI_CHAT_MODEL, fast=fast_planner)
+
+def get_recommendation_cache(request: Request) -> RecommendationCache | None:
+    return request.app.state.recommendation_cache
+
+def get_prefetcher(request: Request) -> Prefetcher:
+    return request.app.state.prefetcher
 
-def get_recommender(openai_service=Depends(get_openai_service), retriever=Depends(get_retriever)):
-    return Recommender(openai_service, settings.OPENAI_CHAT_MODEL, retriever)
+def get_recommender(
+    openai_service=Depends(get_async_openai_service),
+    retriever=Depends(get_retriever),
+    cache=Depends(get_recommendation_cache),
+):
+    return Recommender(openai_service, settings.OPENAI_CHAT_MODEL, retriever, cache)
 
 def get_ingest_service(
+    request: Request,
     chroma_repo: ChromaRepository = Depends(get_chroma_repository),
     openai_service: OpenAIService = Depends(get_openai_service),
 ) -> IngestService:
-    return IngestService(chroma_repo, openai_service)
+    return IngestService(chroma_repo, openai_service, request.app.state.manifest)
 
+def get_job_manager(request: Request) -> JobManager:
+    return request.app.state.job_manager
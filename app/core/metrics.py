@@ -0,0 +1,168 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.routing import Match
+
+# ASGI scope of the request being served; None for ingest jobs and other off-request work.
+scope_var: ContextVar[Optional[dict]] = ContextVar("metrics_scope", default=None)
+
+STAGE_SECONDS = Histogram(
+    "zenji_stage_seconds",
+    "Latency of internal stages (OpenAI calls, Chroma, PDF extraction).",
+    ["stage", "route", "model"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REQUEST_SECONDS = Histogram(
+    "zenji_http_request_seconds",
+    "HTTP request latency, including streamed bodies.",
+    ["route", "method", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+OPENAI_TOKENS = Counter(
+    "zenji_openai_tokens_total",
+    "Tokens reported in OpenAI usage fields.",
+    ["kind", "route", "model"],
+)
+
+
+def current_route() -> str:
+    """Route template of the request being served; "background" outside a request."""
+    scope = scope_var.get()
+    return "background" if scope is None else _route_template(scope)
+
+
+def observe(stage: str, seconds: float, model: str = "") -> None:
+    STAGE_SECONDS.labels(stage, current_route(), model).observe(seconds)
+
+
+@contextmanager
+def timed(stage: str, model: str = ""):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0, model)
+
+
+def timed_iter(items: Iterable[Any], stage: str) -> Iterator[Any]:
+    """Yield from `items`, observing only the time spent producing them (not the consumer's)."""
+    it = iter(items)
+    spent = 0.0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                spent += time.perf_counter() - t0
+                return
+            spent += time.perf_counter() - t0
+            yield item
+    finally:
+        observe(stage, spent)
+
+
+def record_usage(usage: Any, model: str) -> None:
+    """Count prompt/completion tokens from a Chat, Responses or Embeddings `usage` object."""
+    if usage is None:
+        return
+    route = current_route()
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+    if prompt:
+        OPENAI_TOKENS.labels("prompt", route, model).inc(prompt)
+    if completion:
+        OPENAI_TOKENS.labels("completion", route, model).inc(completion)
+
+
+class _StatsCollector:
+    """Exposes the numeric fields of a `stats()` dict as gauges, read at scrape time."""
+
+    def __init__(self, prefix: str, stats: Callable[[], Dict[str, Any]]):
+        self.prefix = prefix
+        self.stats = stats
+
+    def collect(self):
+        try:
+            data = self.stats() or {}
+        except Exception:
+            return
+        for name, value in _flatten(data):
+            yield GaugeMetricFamily(f"{self.prefix}_{name}", f"{self.prefix} {name.replace('_', ' ')}", value=value)
+
+
+def _flatten(data: Dict[str, Any], prefix: str = ""):
+    for key, value in data.items():
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+
+_registered: Dict[str, _StatsCollector] = {}
+
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    """Publish a component's stats() as gauges; re-registering a prefix replaces the source."""
+    if prefix in _registered:
+        _registered[prefix].stats = stats
+        return
+    _registered[prefix] = _StatsCollector(prefix, stats)
+    REGISTRY.register(_registered[prefix])
+
+
+class MetricsMiddleware:
+    """Times each request and exposes its route template to stage metrics via `scope_var`.
+
+    Plain ASGI, so streamed responses are timed to their last byte and the
+    route stays bound while the body is generated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = scope_var.set(scope)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.labels(_route_template(scope), scope["method"], str(status[0])).observe(
+                time.perf_counter() - t0
+            )
+            scope_var.reset(token)
+
+
+def _route_template(scope) -> str:
+    # Templates ("/api/ingest/jobs/{job_id}"), not raw paths, keep label cardinality bounded.
+    route = scope.get("route")  # set by FastAPI's router once it has matched the request
+    if route is not None:
+        return route.path
+    return _match_route(scope.get("app"), scope["type"], scope.get("method", ""), scope.get("path", ""))
+
+
+@lru_cache(maxsize=1024)
+def _match_route(app, kind: str, method: str, path: str) -> str:
+    # Requests FastAPI didn't route itself (mounts such as /static, 404s, or before routing).
+    probe = {"type": kind, "method": method, "path": path, "root_path": ""}
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(probe)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
@@ -2,13 +2,77 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     OPENAI_EMBED_MODEL: str = "text-embedding-3-small"
+    OPENAI_EMBED_DIMENSIONS: int = 0     # shortened text-embedding-3 vectors for new collections (0 = full size)
     OPENAI_CHAT_MODEL: str = "gpt-5-nano"
     CHROMA_DIR: str = "./chroma"
-    COLLECTION_NAME: str = "flower_medicine"
+    COLLECTION_NAME: str = "flower_medicine"  # until a reindex switches to another (<CHROMA_DIR>/active_collection.json)
+    VECTOR_BACKEND: str = "chroma"       # "chroma" (HNSW) | "numpy" (exact search over a memory-mapped file)
+    VECTOR_DIR: str = ""                 # numpy backend files; defaults to <CHROMA_DIR>/vectors
+    VECTOR_DTYPE: str = "float32"        # numpy backend storage: "float32" | "float16" (half the memory)
     TOP_K: int = 8
     CHUNK_CHARS: int = 1800
     CHUNK_OVERLAP: int = 250
+    CHUNKER: str = "tokens"              # "tokens" (sentence-aware, token budget) | "chars" (legacy fixed slices)
+    CHUNK_TOKENS: int = 400
+    CHUNK_TOKEN_OVERLAP: int = 50
+    CHUNK_SPAN_PAGES: bool = True
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = ""            # e.g. the benchmarks/fake_openai.py server; empty = api.openai.com
+    OPENAI_TIMEOUT: float = 60.0
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_MAX_CONNECTIONS: int = 20
+    OPENAI_MAX_KEEPALIVE: int = 10
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0
+    OPENAI_WARMUP: bool = True           # open connections and load the collection at startup
+    STARTUP_MODE: str = "eager"          # "eager" (listen once warm) | "background" (listen at once, warm up behind /api/ready)
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_PATH: str = ""          # defaults to <CHROMA_DIR>/embed_cache.sqlite3
+    EMBED_CACHE_MAX_ENTRIES: int = 50000
+    EMBED_BATCH_ENABLED: bool = True     # coalesce concurrent query embeddings into shared API calls
+    EMBED_BATCH_WINDOW_MS: float = 5
+    EMBED_BATCH_MAX_TEXTS: int = 256
+    EMBED_BATCH_MAX_TOKENS: int = 100000
+    INGEST_EXTRACT_WORKERS: int = 2      # PDF parsing processes
+    INGEST_EMBED_CONCURRENCY: int = 4    # embedding batches in flight
+    INGEST_EMBED_BATCH: int = 128        # chunks per embedding request
+    INGEST_UPSERT_BATCH: int = 512       # chunks per Chroma upsert
+    INGEST_QUEUE_SIZE: int = 8           # batches buffered between stages
+    INGEST_WINDOW: int = 256             # chunks embedded/upserted at a time for a single upload
+    MANIFEST_PATH: str = ""              # ingested-file manifest; defaults to <CHROMA_DIR>/manifest.sqlite3
+    JOBS_DIR: str = ""                   # ingest job checkpoints; defaults to <CHROMA_DIR>/jobs
+    SNAPSHOT_PART_ROWS: int = 5000       # rows per snapshot part (bounds memory on export and import)
+    SNAPSHOT_IMPORT_BATCH: int = 2000    # rows per upsert when loading a snapshot
+    REINDEX_BATCH: int = 500             # rows copied (and re-embedded) per step of a reindex
+    REINDEX_RECALL_SAMPLE: int = 200     # stored chunks used as queries to measure recall after a reindex
+    REINDEX_RECALL_K: int = 10
+    SESSION_BACKEND: str = "memory"      # "memory" (single process) | "sqlite" (shared across workers)
+    SESSION_DB_PATH: str = ""            # defaults to <CHROMA_DIR>/sessions.sqlite3
+    SESSION_CACHE_SIZE: int = 1000       # sessions kept in the local read-through cache
+    SESSION_WRITE_INTERVAL: float = 0.05 # seconds between write-back flushes
+    SESSION_TTL_SECONDS: float = 7200    # idle sessions expire after this long
+    SESSION_MAX_SESSIONS: int = 5000
+    SESSION_MAX_BYTES: int = 32 * 1024 * 1024
+    SESSION_MAX_TURNS: int = 60          # oldest turns beyond this are dropped
+    PLANNER_HISTORY_TOKENS: int = 1500   # budget for summary + verbatim turns in the planner prompt
+    PLANNER_RECENT_TURNS: int = 6        # newest turns always kept verbatim
+    PLANNER_SUMMARY_BATCH: int = 6       # older turns folded into the summary this many at a time
+    PLANNER_SUMMARY_MODEL: str = ""      # defaults to OPENAI_CHAT_MODEL
+    REC_CACHE_ENABLED: bool = True
+    REC_CACHE_TTL_SECONDS: float = 3600
+    REC_CACHE_MAX_ENTRIES: int = 1000
+    REC_CACHE_SIMILARITY: float = 0.0    # >0: reuse the closest cached slot set above this cosine (costs one embedding)
+    RETRIEVAL_MODE: str = "hybrid"       # "hybrid" (BM25 + vector, RRF) | "vector"
+    LEXICAL_INDEX_PATH: str = ""         # defaults to <CHROMA_DIR>/lexical.sqlite3
+    LEXICAL_FAST_PATH: bool = True       # answer confident rare-term lookups without embedding the query
+    LEXICAL_RARE_DF: float = 0.02        # a term is "rare" in at most this share of chunks
+    LEXICAL_MAX_QUERY_TERMS: int = 4     # longer queries always use the vector side too
+    RRF_K: int = 60
+    CONTEXT_TOKEN_BUDGET: int = 3000     # passages packed into one ask/recommend prompt
+    MMR_LAMBDA: float = 0.7              # 1.0 = pure relevance, lower = more diverse passages
+    FAST_PLANNER_ENABLED: bool = True    # handle plain yes/duration answers and safety keywords without the LLM
+    PREFETCH_TTL_SECONDS: float = 300    # speculative retrieval kept this long for the recommend turn
+    PREFETCH_MAX_SESSIONS: int = 1000
     LOG_LEVEL: str = "INFO"
     ENV: str = "prod"
 
@@ -1,5 +1,8 @@
-import uuid
-from typing import List, Dict, Any
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 from app.core.settings import settings
 import tiktoken
 
@@ -12,7 +15,7 @@ def _chunk_text(text: str, source_meta: Dict[str, Any]) -> List[Dict[str, Any]]:
         chunk = text[i:j]
         if chunk.strip():
             chunks.append({
-                "id": str(uuid.uuid4()),
+                "id": _chunk_id(chunk, source_meta.get("source", "")),
                 "text": chunk,
                 "metadata": source_meta.copy()
             })
@@ -21,6 +24,81 @@ def _chunk_text(text: str, source_meta: Dict[str, Any]) -> List[Dict[str, Any]]:
             break
     return chunks
 
+def _chunk_id(text: str, source: str) -> str:
+    """Deterministic chunk id: identical text from the same source always maps to the same id."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+# A sentence (ending in .!? before whitespace) or a paragraph, with its trailing whitespace.
+_SEGMENT_RE = re.compile(r"\S.*?(?:[.!?](?=\s)|\n[ \t]*\n|$)\s*", re.S)
+
+def _chunk_tokens(pages: Iterable[Tuple[int, str]], source_meta: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Token-budgeted chunker.
+
+    Each sentence/paragraph segment is tokenized exactly once and segments are
+    packed into windows of up to CHUNK_TOKENS, carrying whole trailing segments
+    worth up to CHUNK_TOKEN_OVERLAP into the next window. With CHUNK_SPAN_PAGES
+    a window may cross a page break; `page`/`page_end` record the range.
+    Chunks carry their token count so batching never re-tokenizes them.
+    """
+    enc = _get_encoding()
+    limit = settings.CHUNK_TOKENS
+    overlap = settings.CHUNK_TOKEN_OVERLAP
+    window: List[Tuple[int, str, int]] = []   # (page, text, tokens)
+    total = 0
+    fresh = False                             # window holds more than carried-over overlap
+
+    def emit():
+        text = "".join(seg for _, seg, _ in window)
+        meta = {**source_meta, "page": window[0][0], "page_end": window[-1][0], "tokens": total}
+        return {"id": _chunk_id(text, source_meta.get("source", "")), "text": text, "tokens": total, "metadata": meta}
+
+    def carry():
+        kept, n = [], 0
+        for seg in reversed(window):
+            if n + seg[2] > overlap:
+                break
+            kept.insert(0, seg)
+            n += seg[2]
+        return kept, n
+
+    for page, text in pages:
+        for m in _SEGMENT_RE.finditer(text):
+            toks = enc.encode(m.group(0))
+            pieces = (
+                [(m.group(0), len(toks))] if len(toks) <= limit
+                else [(enc.decode(toks[i:i + limit]), len(toks[i:i + limit])) for i in range(0, len(toks), limit)]
+            )
+            for seg, n in pieces:
+                if window and total + n > limit:
+                    if fresh:
+                        yield emit()
+                    window, total = carry()
+                    if total + n > limit:
+                        window, total = [], 0
+                    fresh = False
+                window.append((page, seg, n))
+                total += n
+                fresh = True
+        if not settings.CHUNK_SPAN_PAGES and window:
+            if fresh:
+                yield emit()
+            window, total, fresh = [], 0, False
+    if window and fresh:
+        yield emit()
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    try:
+        return tiktoken.encoding_for_model(settings.OPENAI_EMBED_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
 def _get_token_count(text: str) -> int:
-    enc = tiktoken.encoding_for_model(settings.OPENAI_EMBED_MODEL)
-    return len(enc.encode(text))
+    return len(_get_encoding().encode(text))
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Disable proxy buffering so Fly/nginx forward each frame immediately.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
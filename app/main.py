@@ -1,23 +1,175 @@
+import asyncio
+import os
+import time
 from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from asgi_correlation_id import CorrelationIdMiddleware
-from app.core.logging import setup_logging
+from app.core.logging import setup_logging, get_logger
 from app.core.bind_context import BindSessionMiddleware
+from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, generate_latest, register_stats
 from app.api.ingest import router as ingest_router
 from app.api.retrieval import router as retrieval_router
 from app.api.health import router as health_router
-from app.api.dialog import router as dialog_router
-from app.services.chroma import ChromaService
+from app.api.dialog import router as dialog_router, session_store
+from app.api.snapshot import router as snapshot_router
+from app.api.reindex import router as reindex_router
+from app.services.embedding_cache import EmbeddingCache
+from app.services.ingest import IngestService
+from app.services.jobs import JobManager
+from app.services.manifest import IngestManifest
+from app.services.openai import OpenAIService, AsyncOpenAIService
+from app.services.rec_cache import RecommendationCache
+from app.services.prefetch import Prefetcher
+from app.services.fast_planner import FastPlanner
+from app.services.reindex import ReindexRunner
+from app.services.lexical_index import LexicalIndex
+from app.repositories.chroma import ChromaRepository
+from app.repositories.vector_store import create_vector_store
+from app.core.settings import settings
+from app.core.utils import _get_encoding
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Setup phase
+    # Setup phase: cheap local state first; the slow parts run concurrently in _startup.
     setup_logging()
-    app.state.chroma_service = ChromaService()
+    logger = get_logger(__name__)
+    app.state.ready = asyncio.Event()
+    app.state.startup_error = None
+    app.state.startup_timings = {}
+    app.state.chroma_service = None
+    app.state.lexical_index = None
+    if settings.RETRIEVAL_MODE == "hybrid":
+        app.state.lexical_index = LexicalIndex(
+            settings.LEXICAL_INDEX_PATH or os.path.join(settings.CHROMA_DIR, "lexical.sqlite3")
+        )
+    # The store is attached by _startup; until then only calls that touch it wait.
+    app.state.chroma_repository = ChromaRepository(
+        lexical=app.state.lexical_index, version_path=os.path.join(settings.CHROMA_DIR, "collection.version"),
+        reopen=lambda name: create_vector_store(app.state.chroma_service, collection=name),
+    )
+    app.state.embedding_cache = None
+    if settings.EMBED_CACHE_ENABLED:
+        app.state.embedding_cache = EmbeddingCache(
+            settings.EMBED_CACHE_PATH or os.path.join(settings.CHROMA_DIR, "embed_cache.sqlite3"),
+            settings.EMBED_CACHE_MAX_ENTRIES,
+        )
+    app.state.openai_service = OpenAIService(settings.OPENAI_API_KEY, app.state.embedding_cache)
+    app.state.async_openai_service = AsyncOpenAIService(settings.OPENAI_API_KEY, app.state.embedding_cache)
+    app.state.recommendation_cache = RecommendationCache() if settings.REC_CACHE_ENABLED else None
+    app.state.prefetcher = Prefetcher()
+    app.state.fast_planner = FastPlanner() if settings.FAST_PLANNER_ENABLED else None
+    app.state.manifest = IngestManifest(
+        settings.MANIFEST_PATH or os.path.join(settings.CHROMA_DIR, "manifest.sqlite3")
+    )
+    app.state.job_manager = JobManager(
+        lambda: IngestService(app.state.chroma_repository, app.state.openai_service, app.state.manifest),
+        settings.JOBS_DIR or os.path.join(settings.CHROMA_DIR, "jobs"),
+    )
+    app.state.job_manager.start()
+    app.state.reindexer = ReindexRunner(app.state.chroma_repository, app.state.openai_service)
+    _register_metrics(app)
+    startup = asyncio.create_task(_startup(app, logger))
+    if settings.STARTUP_MODE != "background":
+        await startup
     yield
+    if not startup.done():
+        await asyncio.wait([startup])
+    app.state.job_manager.shutdown()
+    app.state.manifest.close()
+    app.state.chroma_repository.close()
+    session_store.close()
+    app.state.prefetcher.close()
+    app.state.openai_service.close()
+    await app.state.async_openai_service.close()
+    if app.state.embedding_cache:
+        app.state.embedding_cache.close()
+    if app.state.lexical_index:
+        app.state.lexical_index.close()
+
+async def _startup(app: FastAPI, logger):
+    """Open (and preload) the vector store, load the tokenizer and warm the API pool concurrently.
+
+    Awaited by the lifespan by default. With STARTUP_MODE=background the server
+    starts listening first: dialog turns that don't retrieve are served at once,
+    calls that touch the store block until it is attached, and /api/ready
+    reports when everything is warm.
+    """
+    t0 = time.perf_counter()
+    timings = app.state.startup_timings
+    try:
+        store, _, _ = await asyncio.gather(
+            _timed_step(timings, "vector_store", asyncio.to_thread(_open_vector_store, app)),
+            _timed_step(timings, "tokenizer", asyncio.to_thread(_get_encoding)),
+            _timed_step(timings, "openai_warmup", _warmup(app, logger)),
+        )
+        app.state.chroma_repository.attach(store)
+        _backfill_lexical(app, logger)
+    except Exception as e:
+        app.state.startup_error = str(e)
+        app.state.chroma_repository.fail(e)
+        logger.exception("startup.failed", error=str(e))
+        if settings.STARTUP_MODE != "background":
+            raise  # fail the lifespan as before; in background mode /api/ready reports it
+        return
+    finally:
+        app.state.ready.set()
+    timings["total"] = round(time.perf_counter() - t0, 3)
+    logger.info("startup.ready", mode=settings.STARTUP_MODE, collection_count=store.count(), **timings)
+
+async def _timed_step(timings: dict, name: str, awaitable):
+    t0 = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round(time.perf_counter() - t0, 3)
+
+def _open_vector_store(app: FastAPI):
+    if settings.VECTOR_BACKEND == "chroma":
+        from app.services.chroma import ChromaService
+
+        app.state.chroma_service = ChromaService()
+    store = create_vector_store(app.state.chroma_service)
+    dims = store.embedding.get("embed_dimensions")
+    if (settings.OPENAI_EMBED_DIMENSIONS or None) != dims:
+        # Queries follow the collection; the setting only applies to collections built from now on.
+        get_logger(__name__).warning("vector_store.dimensions_differ", collection=store.collection_name,
+                                     collection_dimensions=dims, configured=settings.OPENAI_EMBED_DIMENSIONS or None)
+    if settings.OPENAI_WARMUP:
+        store.preload()
+    return store
+
+def _backfill_lexical(app: FastAPI, logger):
+    """Index a collection that predates the lexical index, in the background."""
+    index, repo = app.state.lexical_index, app.state.chroma_repository
+    if index is None or index.count() or not repo.count():
+        return
+    logger.info("lexical.backfill.started")
+    app.state.lexical_backfill = asyncio.create_task(asyncio.to_thread(index.rebuild, repo.iter_documents()))
+
+def _register_metrics(app: FastAPI):
+    """Scrape-time gauges from the components' stats(); nothing is added to the request path."""
+    register_stats("zenji_sessions", session_store.stats)
+    register_stats("zenji_prefetch", app.state.prefetcher.stats)
+    if app.state.embedding_cache:
+        register_stats("zenji_embed_cache", app.state.embedding_cache.stats)
+    if app.state.recommendation_cache:
+        register_stats("zenji_rec_cache", app.state.recommendation_cache.stats)
+    if app.state.fast_planner:
+        register_stats("zenji_fast_planner", app.state.fast_planner.stats)
+    if app.state.async_openai_service.batcher:
+        register_stats("zenji_embed_batcher", app.state.async_openai_service.batcher.stats)
+
+async def _warmup(app: FastAPI, logger):
+    """Open the API connection pool so the first chat turn doesn't pay for DNS + TLS."""
+    if not settings.OPENAI_WARMUP:
+        return
+    try:
+        await asyncio.wait_for(app.state.async_openai_service.warmup(), timeout=settings.OPENAI_CONNECT_TIMEOUT * 2)
+    except Exception as e:
+        logger.warning("startup.warmup.failed", error=str(e))
 
 app = FastAPI(title="Zenji", lifespan=lifespan)
 app.add_middleware(CorrelationIdMiddleware, header_name="X-Request-ID")
@@ -26,6 +178,7 @@ app.add_middleware(
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 app.add_middleware(BindSessionMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/assets", StaticFiles(directory="static/assets"), name="assets")
 
@@ -33,6 +186,13 @@ app.include_router(ingest_router, prefix="/api")
 app.include_router(retrieval_router, prefix="/api")
 app.include_router(health_router, prefix="/api")
 app.include_router(dialog_router, prefix="/api")
+app.include_router(snapshot_router, prefix="/api")
+app.include_router(reindex_router, prefix="/api")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/", response_class=HTMLResponse)
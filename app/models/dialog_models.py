@@ -13,6 +13,8 @@ class SessionState(BaseModel):
     duration: Optional[Duration] = None
     goal: Optional[str] = None                         # <= 80 chars
     turns: List[dict] = Field(default_factory=list)    # [{"role": "user"|"assistant", "content": str}]
+    history_summary: Optional[str] = None              # rolling summary of turns marked "summarized"
+    history_summary_tokens: int = 0
 
 
 class DialogAction(BaseModel):
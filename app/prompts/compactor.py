@@ -0,0 +1,5 @@
+COMPACTOR_SYSTEM = """You maintain a running summary of an intake conversation between a user and Zenji, a flower-essence assistant.
+Update the current summary with the new turns. Keep every fact the user shared (feelings, situation, duration, goals, safety concerns) and what was already asked.
+Drop greetings and repetition. Reply with the updated summary only, at most 120 words."""
+
+COMPACTOR_TEMPLATE = """Current summary: {summary}\n\nNew turns:\n{turns}"""
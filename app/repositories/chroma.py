@@ -1,18 +1,219 @@
-from app.core.settings import settings
-from app.services.chroma import ChromaService
+import asyncio
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+from app.core.metrics import timed
+from app.repositories.vector_store import (
+    VectorStore, active_collection, active_collection_stamp, set_active_collection,
+)
+from app.services.lexical_index import LexicalIndex
 
 
 class ChromaRepository:
-    def __init__(
-        self, chroma_service: ChromaService, collection_name: str = settings.COLLECTION_NAME
-    ):
-        self.client = chroma_service.get_client()
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name, metadata={"hnsw:space": "cosine"}
-        )
+    """Chunk storage for ingest and retrieval, over a pluggable VectorStore (Chroma or NumPy)."""
+
+    def __init__(self, store: VectorStore | None = None, lexical: LexicalIndex | None = None,
+                 version_path: str | None = None, reopen: Callable[[str], VectorStore] | None = None):
+        self._store = store
+        self._error: Exception | None = None
+        self._attached = threading.Event()
+        if store is not None:
+            self._attached.set()
+        # Optional BM25 index mirrored on every write, for hybrid retrieval.
+        self.lexical = lexical
+        # Bumped on every write so caches built on query results can tell they are stale. With
+        # `version_path` the counter lives in that file, shared by every worker and CLI run on the host.
+        self._version = 0
+        self.version_path = version_path
+        # Next to it, `collection.lock` is held shared by writes and exclusively by `exclusive()`.
+        self._lock_file = None
+        if version_path:
+            os.makedirs(os.path.dirname(os.path.abspath(version_path)), exist_ok=True)
+            self._lock_file = open(os.path.join(os.path.dirname(os.path.abspath(version_path)), "collection.lock"), "a")
+        self._exclusive = 0
+        # Held by writes and by `switch`, so no write lands on a store that is being replaced.
+        self.write_lock = threading.RLock()
+        # With `reopen(name)`, a switch made by another process (a new active_collection.json) is
+        # followed on the next call. Replaced stores stay open until `close`: calls may still be using them.
+        self.reopen = reopen
+        self._pointer = active_collection_stamp() if reopen else None
+        self._reopen_lock = threading.Lock()
+        self._retired: list[VectorStore] = []
+
+    @property
+    def store(self) -> VectorStore:
+        """The vector store; blocks the calling thread until it is attached when opened in the background."""
+        self._attached.wait()
+        if self._error is not None:
+            raise RuntimeError(f"Vector store failed to open: {self._error}")
+        if self.reopen is not None and active_collection_stamp() != self._pointer:
+            self._follow_pointer()
+        return self._store
+
+    def _follow_pointer(self) -> None:
+        with self._reopen_lock:
+            stamp = active_collection_stamp()
+            if stamp == self._pointer:
+                return
+            name = active_collection()
+            if name != self._store.collection_name:
+                self._retired.append(self._store)
+                self._store = self.reopen(name)
+            self._pointer = stamp
+
+    @contextmanager
+    def exclusive(self):
+        """Pause writes in this process and, with `version_path`, in every process sharing it."""
+        with self.write_lock:
+            self._exclusive += 1
+            try:
+                if self._exclusive == 1 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                yield
+            finally:
+                self._exclusive -= 1
+                if self._exclusive == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _writing(self):
+        with self.write_lock:
+            if self._exclusive or self._lock_file is None:
+                yield
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def attach(self, store: VectorStore) -> None:
+        self._store = store
+        self._attached.set()
+
+    def fail(self, error: Exception) -> None:
+        self._error = error
+        self._attached.set()
+
+    @property
+    def version(self) -> int:
+        if self.version_path is None:
+            return self._version
+        try:
+            with open(self.version_path, "rb") as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _bump_version(self) -> None:
+        self._version += 1
+        if self.version_path is None:
+            return
+        fd = os.open(self.version_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            value = int(os.read(fd, 32) or 0) + 1
+            os.pwrite(fd, b"%020d" % value, 0)  # fixed width: readers never see a shorter, torn number
+        finally:
+            os.close(fd)
+
+    @property
+    def embed_dimensions(self) -> int | None:
+        """Length to request query and chunk embeddings at; None for the model's full size."""
+        return self.store.embedding.get("embed_dimensions")
+
+    def switch(self, store: VectorStore) -> VectorStore:
+        """Serve from `store` from now on and make it the active collection; returns the old store.
+
+        Other processes follow on their next call (see `reopen`). Callers catching up on writes
+        should hold `exclusive()` across the catch-up and the switch. The old store is closed by
+        `close`, not here: calls that fetched it before the switch may still be running.
+        """
+        with self.exclusive(), self._reopen_lock:
+            old, self._store = self._store, store
+            if old is not None:
+                self._retired.append(old)
+            set_active_collection(store.collection_name, store.embedding)
+            self._pointer = active_collection_stamp()
+            self._bump_version()
+        return old
 
     def upsert(self, **kwargs):
-        return self.collection.upsert(**kwargs)
+        try:
+            with self._writing(), timed("chroma.upsert"):
+                res = self.store.upsert(**kwargs)
+            if self.lexical is not None and kwargs.get("documents") is not None:
+                self.lexical.add(kwargs["ids"], kwargs["documents"], kwargs.get("metadatas"))
+            return res
+        finally:
+            self._bump_version()
 
     def query(self, **kwargs):
-        return self.collection.query(**kwargs)
+        with timed("chroma.query"):
+            return self.store.query(**kwargs)
+
+    def delete(self, ids, batch_size: int = 500):
+        try:
+            for i in range(0, len(ids), batch_size):
+                with self._writing():
+                    self.store.delete(ids=list(ids[i:i + batch_size]))
+                if self.lexical is not None:
+                    self.lexical.remove(list(ids[i:i + batch_size]))
+        finally:
+            self._bump_version()
+
+    def existing_ids(self, ids, batch_size: int = 500) -> set[str]:
+        """Subset of `ids` already stored; a primary-key lookup, no vector search."""
+        found = set()
+        for i in range(0, len(ids), batch_size):
+            res = self.store.get(ids=list(ids[i:i + batch_size]), include=[])
+            found.update(res.get("ids", []))
+        return found
+
+    def get_embeddings(self, ids) -> dict:
+        """id -> stored embedding, for hits that did not come from a vector query."""
+        if not ids:
+            return {}
+        res = self.store.get(ids=list(ids), include=["embeddings"])
+        return dict(zip(res["ids"], res["embeddings"]))
+
+    def count(self) -> int:
+        return self.store.count()
+
+    def iter_documents(self, batch_size: int = 1000):
+        """Yield (ids, documents, metadatas) pages of the whole collection."""
+        offset = 0
+        while True:
+            res = self.store.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            if not res["ids"]:
+                return
+            yield res["ids"], res["documents"], res["metadatas"]
+            offset += len(res["ids"])
+
+    def iter_records(self, batch_size: int = 1000):
+        """Yield {"ids", "embeddings", "documents", "metadatas"} pages of the whole collection."""
+        offset = 0
+        while True:
+            res = self.store.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            if not len(res["ids"]):
+                return
+            yield res
+            offset += len(res["ids"])
+
+    def close(self) -> None:
+        for store in self._retired:
+            store.close()
+        if self._store is not None:
+            self._store.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    # Both stores are synchronous (SQLite + HNSW or a mapped file); async callers go through a worker thread.
+    async def aupsert(self, **kwargs):
+        return await asyncio.to_thread(self.upsert, **kwargs)
+
+    async def aquery(self, **kwargs):
+        return await asyncio.to_thread(self.query, **kwargs)
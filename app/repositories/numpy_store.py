@@ -0,0 +1,339 @@
+import fcntl
+import json
+import operator
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.logging import get_logger
+from app.repositories.vector_store import DEFAULT_INCLUDE, VectorStore
+
+GROW_ROWS = 1024     # file grows by at least this many rows (or doubles)
+SCAN_BLOCK = 4096    # rows scored per matmul, bounds float16 → float32 temporaries
+MASK_CACHE = 64      # distinct `where` filters whose row masks are kept between writes
+
+_OPS = {
+    "$eq": operator.eq, "$ne": operator.ne,
+    "$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le,
+    "$in": lambda value, arg: value in arg, "$nin": lambda value, arg: value not in arg,
+}
+
+
+def match_where(where: dict, meta: dict) -> bool:
+    """Evaluate a Chroma `where` filter ($and/$or, $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin) on one metadata dict."""
+    for key, cond in where.items():
+        if key == "$and":
+            ok = all(match_where(c, meta) for c in cond)
+        elif key == "$or":
+            ok = any(match_where(c, meta) for c in cond)
+        else:
+            if key not in meta:
+                return False  # like Chroma, a missing field never matches (not even $ne)
+            if not isinstance(cond, dict):
+                cond = {"$eq": cond}
+            try:
+                ok = all(_OPS[op](meta[key], arg) for op, arg in cond.items())
+            except KeyError as e:
+                raise ValueError(f"Unsupported where operator: {e.args[0]}") from None
+            except TypeError:
+                ok = False  # e.g. $gt between a string and a number
+        if not ok:
+            return False
+    return True
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact cosine search over normalized vectors in a memory-mapped file.
+
+    `<path>/vectors.<dtype>` holds one row per chunk (rows freed by deletes are
+    reused); `<path>/rows.sqlite3` maps rows to ids, documents and metadata.
+    Ids and metadata live in memory for `where` filtering, documents are read
+    back only for returned hits. A query is one matrix-vector product plus
+    argpartition; the mapped file loads lazily, so opening a store is instant
+    and untouched pages cost no RSS.
+
+    Several processes (uvicorn workers, the CLI) may open the same store:
+    writes hold an exclusive lock on `<path>/writer.lock`, and every call
+    first checks SQLite's `data_version` and reloads the in-memory index if
+    another process has committed since.
+    """
+    name = "numpy"
+
+    def __init__(self, path: str, dtype: str = "float32", embedding: Optional[dict] = None):
+        self.logger = get_logger(__name__)
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = open(os.path.join(path, "writer.lock"), "a")
+        self._db = sqlite3.connect(os.path.join(path, "rows.sqlite3"), check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document TEXT, metadata TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        info = dict(self._db.execute("SELECT key, value FROM info").fetchall())
+        if embedding and "dim" not in info and "embed_model" not in info:
+            # Recorded once, when the store is new; a store that predates this keeps no record (full size).
+            info.update({k: str(v) for k, v in embedding.items()})
+            self._db.executemany("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                                 [(k, str(v)) for k, v in embedding.items()])
+            self._db.commit()
+        self.collection_name = os.path.basename(os.path.normpath(path))
+        self.embedding = {k: int(info[k]) if k == "embed_dimensions" else info[k]
+                          for k in ("embed_model", "embed_dimensions") if k in info}
+        if info.get("dtype", dtype) != dtype:
+            self.logger.warning("vector_store.dtype_mismatch", stored=info["dtype"], configured=dtype)
+        self.dtype = np.dtype(info.get("dtype", dtype))
+        self._file = os.path.join(path, f"vectors.{self.dtype.name}")
+        self._vectors: Optional[np.memmap] = None
+        self._load()
+
+    def _load(self) -> None:
+        """(Re)build the in-memory index from SQLite and remap the vector file."""
+        self._version = self._data_version()
+        dim = self._db.execute("SELECT value FROM info WHERE key = 'dim'").fetchone()
+        self.dim: Optional[int] = int(dim[0]) if dim else None
+        self._vectors = None
+        capacity = 0
+        if self.dim and os.path.exists(self._file):
+            capacity = os.path.getsize(self._file) // (self.dim * self.dtype.itemsize)
+            if capacity:
+                self._vectors = np.memmap(self._file, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._metas: List[Optional[dict]] = [None] * capacity
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._row: Dict[str, int] = {}
+        for row, cid, meta in self._db.execute("SELECT row, id, metadata FROM rows"):
+            if row >= capacity:
+                continue  # metadata committed for a row whose vector never reached the file
+            self._ids[row], self._metas[row] = cid, json.loads(meta) if meta else {}
+            self._alive[row] = True
+            self._row[cid] = row
+        # Rows [0, _size) have been used; free slots below it are refilled before the file grows.
+        self._size = int(np.flatnonzero(self._alive)[-1]) + 1 if self._row else 0
+        self._free = [r for r in range(self._size - 1, -1, -1) if not self._alive[r]]
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def _data_version(self) -> int:
+        # Changes whenever another connection commits to the database; our own commits leave it alone.
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self) -> None:
+        """Reload if another process has written since we last looked; call with `_lock` held."""
+        if self._data_version() != self._version:
+            self._load()
+
+    @contextmanager
+    def _write(self):
+        """Hold `_lock` and the cross-process writer lock, on an index that is up to date."""
+        with self._lock:
+            fcntl.flock(self._writer, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                yield
+            finally:
+                fcntl.flock(self._writer, fcntl.LOCK_UN)
+
+    # --- writes ------------------------------------------------------------
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        if embeddings is None:
+            raise ValueError("NumpyVectorStore.upsert needs embeddings")
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("embeddings must be one vector per id")
+        if len(set(ids)) != len(ids):
+            raise ValueError("upsert ids must be unique within a call")
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._write():
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                    [("dim", str(self.dim)), ("dtype", self.dtype.name)],
+                )
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimensionality {self.dim}")
+            rows = [self._row.get(cid) for cid in ids]
+            self._reserve(sum(r is None for r in rows))
+            rows = [r if r is not None else self._take_row() for r in rows]
+            # Vectors first: a crash before the commit leaves unreferenced rows, never ids without vectors.
+            self._vectors[rows] = vectors.astype(self.dtype)
+            self._vectors.flush()
+            metas = [json.dumps(m) if m is not None else None for m in (metadatas or [None] * len(ids))]
+            docs = documents or [None] * len(ids)
+            self._db.executemany(
+                "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET document = COALESCE(excluded.document, document), "
+                "metadata = COALESCE(excluded.metadata, metadata)",
+                list(zip(rows, ids, docs, metas)),
+            )
+            self._db.commit()
+            for row, cid, meta in zip(rows, ids, metadatas or [None] * len(ids)):
+                self._ids[row] = cid
+                if meta is not None or self._metas[row] is None:
+                    self._metas[row] = dict(meta or {})
+                self._alive[row] = True
+                self._row[cid] = row
+            self._masks.clear()
+
+    def delete(self, ids) -> None:
+        with self._write():
+            rows = [self._row.pop(cid) for cid in ids if cid in self._row]
+            if not rows:
+                return
+            self._db.executemany("DELETE FROM rows WHERE row = ?", [(r,) for r in rows])
+            self._db.commit()
+            for row in rows:
+                self._ids[row], self._metas[row] = None, None
+                self._alive[row] = False
+            self._free.extend(sorted(rows, reverse=True))
+            self._masks.clear()
+
+    def _reserve(self, new_rows: int) -> None:
+        """Grow the mapped file so `new_rows` more rows fit after the free slots are used."""
+        needed = self._size + max(new_rows - len(self._free), 0)
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, capacity + GROW_ROWS)
+        if os.path.exists(self._file):  # another writer may have grown it without committing a row there
+            capacity = max(capacity, os.path.getsize(self._file) // (self.dim * self.dtype.itemsize))
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = None
+        with open(self._file, "ab") as f:
+            f.truncate(capacity * self.dim * self.dtype.itemsize)  # zero-filled, sparse on most filesystems
+        self._vectors = np.memmap(self._file, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+        extra = capacity - len(self._alive)
+        self._ids.extend([None] * extra)
+        self._metas.extend([None] * extra)
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+
+    def _take_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self._size += 1
+        return self._size - 1
+
+    # --- reads -------------------------------------------------------------
+
+    def query(self, query_embeddings, n_results=10, where=None, include=DEFAULT_INCLUDE) -> dict:
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            self._sync()
+            if self.dim is not None and queries.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {queries.shape[1]} does not match collection dimensionality {self.dim}")
+            rows = np.flatnonzero(self._filter(where))
+            scores = self._scores(rows, queries)
+            picked = []
+            for col in scores.T:
+                k = min(n_results, len(rows))
+                top = np.argpartition(-col, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+                top = top[np.argsort(-col[top], kind="stable")]
+                picked.append((rows[top], 1.0 - col[top]))
+            return {
+                "ids": [[self._ids[r] for r in r_] for r_, _ in picked],
+                "distances": [d.tolist() for _, d in picked] if "distances" in include else None,
+                "metadatas": [[dict(self._metas[r]) for r in r_] for r_, _ in picked] if "metadatas" in include else None,
+                "documents": [self._documents(r_) for r_, _ in picked] if "documents" in include else None,
+                "embeddings": [self._vectors[r_].astype(np.float32) for r_, _ in picked]
+                if "embeddings" in include and self._vectors is not None else None,
+            }
+
+    def get(self, ids=None, include=("metadatas", "documents"), limit=None, offset=0) -> dict:
+        with self._lock:
+            self._sync()
+            if ids is not None:
+                rows = np.asarray([self._row[cid] for cid in ids if cid in self._row], dtype=np.int64)
+            else:
+                rows = np.flatnonzero(self._alive[:self._size])[offset or 0:]
+                rows = rows[:limit] if limit is not None else rows
+            return {
+                "ids": [self._ids[r] for r in rows],
+                "metadatas": [dict(self._metas[r]) for r in rows] if "metadatas" in include else None,
+                "documents": self._documents(rows) if "documents" in include else None,
+                "embeddings": self._vectors[rows].astype(np.float32)
+                if "embeddings" in include and self._vectors is not None else None,
+            }
+
+    def count(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._row)
+
+    def preload(self) -> None:
+        """Fault the used part of the mapped file into the page cache."""
+        with self._lock:
+            self._sync()
+            for start in range(0, self._size, SCAN_BLOCK):
+                self._vectors[start:start + SCAN_BLOCK].sum()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._db.close()
+            self._writer.close()
+
+    def _filter(self, where: Optional[dict]) -> np.ndarray:
+        """Mask over rows [0, _size) that are alive and match `where`; cached until the next write."""
+        alive = self._alive[:self._size]
+        if not where:
+            return alive
+        key = json.dumps(where, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (m is not None and match_where(where, m) for m in self._metas[:self._size]), dtype=bool, count=self._size
+            )
+            if len(self._masks) >= MASK_CACHE:
+                self._masks.clear()
+            self._masks[key] = mask
+        return mask
+
+    def _scores(self, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row in `rows` to every query, as a (rows, queries) float32 matrix."""
+        out = np.empty((len(rows), len(queries)), dtype=np.float32)
+        if not len(rows):
+            return out
+        contiguous = rows[-1] - rows[0] + 1 == len(rows)
+        for start in range(0, len(rows), SCAN_BLOCK):
+            if contiguous:  # a slice of the map: no gather copy for float32
+                first = rows[0] + start
+                block = self._vectors[first:first + min(SCAN_BLOCK, len(rows) - start)]
+            else:
+                block = self._vectors[rows[start:start + SCAN_BLOCK]]
+            out[start:start + len(block)] = block.astype(np.float32, copy=False) @ queries.T
+        return out
+
+    def _documents(self, rows: Sequence[int]) -> List[Optional[str]]:
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        found: Dict[int, Optional[str]] = {}
+        for start in range(0, len(rows), 500):
+            part = rows[start:start + 500]
+            found.update(self._db.execute(
+                f"SELECT row, document FROM rows WHERE row IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return [found.get(r) for r in rows]
+
+
+def import_collection(source: VectorStore, target: VectorStore, batch_size: int = 500) -> int:
+    """Copy every vector, document and metadata from `source` into `target`; returns rows copied."""
+    copied, offset = 0, 0
+    while True:
+        res = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        if not len(res["ids"]):
+            return copied
+        target.upsert(ids=res["ids"], embeddings=res["embeddings"], documents=res["documents"], metadatas=res["metadatas"])
+        copied += len(res["ids"])
+        offset += len(res["ids"])
@@ -0,0 +1,168 @@
+import json
+import os
+import time
+from typing import Optional, Sequence
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+
+DEFAULT_INCLUDE = ("metadatas", "documents", "distances")
+
+
+class VectorStore:
+    """Chunk vectors plus their documents and metadata, with cosine top-k search.
+
+    Mirrors the part of Chroma's collection API the repository uses and
+    returns Chroma-shaped dicts (`query`: one list per query embedding;
+    `get`: flat lists; fields not in `include` are None), so backends are
+    interchangeable behind ChromaRepository.
+
+    `embedding` is what the vectors were made with ({"embed_model",
+    "embed_dimensions"}), recorded when the collection is created; empty for
+    collections that predate it (full-size vectors).
+    """
+    name = ""
+    collection_name = ""
+    embedding: dict = {}
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        raise NotImplementedError
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[dict] = None,
+              include: Sequence[str] = DEFAULT_INCLUDE) -> dict:
+        raise NotImplementedError
+    def get(self, ids=None, include: Sequence[str] = ("metadatas", "documents"),
+            limit: Optional[int] = None, offset: int = 0) -> dict:
+        raise NotImplementedError
+    def delete(self, ids) -> None:
+        raise NotImplementedError
+    def count(self) -> int:
+        raise NotImplementedError
+    def preload(self) -> None:
+        """Bring the index into memory so the first query doesn't pay for it."""
+        self.count()
+    def close(self) -> None:
+        pass
+
+
+class ChromaVectorStore(VectorStore):
+    """A Chroma collection (SQLite + HNSW, approximate search)."""
+    name = "chroma"
+
+    def __init__(self, client, collection_name: str = settings.COLLECTION_NAME, embedding: Optional[dict] = None):
+        # Metadata only applies when the collection is created; an existing one keeps its own.
+        self.collection = client.get_or_create_collection(
+            name=collection_name, metadata={"hnsw:space": "cosine", **(embedding or {})}
+        )
+        self.collection_name = collection_name
+        meta = self.collection.metadata or {}
+        self.embedding = {k: meta[k] for k in ("embed_model", "embed_dimensions") if k in meta}
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=DEFAULT_INCLUDE) -> dict:
+        return self.collection.query(
+            query_embeddings=query_embeddings, n_results=n_results, where=where, include=list(include)
+        )
+
+    def get(self, ids=None, include=("metadatas", "documents"), limit=None, offset=0) -> dict:
+        return self.collection.get(ids=ids, include=list(include), limit=limit, offset=offset or None)
+
+    def delete(self, ids) -> None:
+        self.collection.delete(ids=list(ids))
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def preload(self) -> None:
+        # The HNSW segment is loaded on the first query, not when the client opens.
+        sample = self.collection.peek(1)
+        if len(sample["ids"]):
+            self.collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1, include=[])
+
+
+def new_collection_embedding() -> dict:
+    """Embedding settings recorded on collections created from now on."""
+    embedding = {"embed_model": settings.OPENAI_EMBED_MODEL}
+    if settings.OPENAI_EMBED_DIMENSIONS:
+        embedding["embed_dimensions"] = settings.OPENAI_EMBED_DIMENSIONS
+    return embedding
+
+
+def _pointer_path() -> str:
+    return os.path.join(settings.CHROMA_DIR, "active_collection.json")
+
+
+def active_collection() -> str:
+    """The collection the server reads: the last one switched to, else COLLECTION_NAME."""
+    try:
+        with open(_pointer_path(), encoding="utf-8") as f:
+            return json.load(f)["collection"]
+    except FileNotFoundError:
+        return settings.COLLECTION_NAME
+
+
+def active_collection_stamp() -> Optional[tuple]:
+    """Identity of the pointer file (inode, mtime); changes on every switch, None before the first."""
+    try:
+        st = os.stat(_pointer_path())
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def set_active_collection(name: str, embedding: Optional[dict] = None) -> None:
+    """Point the server at `name`; written to a temp file and renamed, so readers never see a partial pointer."""
+    os.makedirs(settings.CHROMA_DIR, exist_ok=True)
+    tmp = _pointer_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"collection": name, "embedding": embedding or {}, "switched_at": time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _pointer_path())
+
+
+def _numpy_path(collection: str) -> str:
+    return os.path.join(settings.VECTOR_DIR or os.path.join(settings.CHROMA_DIR, "vectors"), collection)
+
+
+def collection_exists(collection: str, chroma_service=None) -> bool:
+    """Whether `collection` exists in the VECTOR_BACKEND backend, without creating it."""
+    if settings.VECTOR_BACKEND == "numpy":
+        return os.path.exists(os.path.join(_numpy_path(collection), "rows.sqlite3"))
+    if chroma_service is None:
+        from app.services.chroma import ChromaService
+
+        chroma_service = ChromaService()
+    # Older chromadb returns Collection objects here, newer only names.
+    return collection in [getattr(c, "name", c) for c in chroma_service.get_client().list_collections()]
+
+
+def create_vector_store(chroma_service=None, collection: Optional[str] = None, embedding: Optional[dict] = None) -> VectorStore:
+    """Open `collection` (default: the active one) with the VECTOR_BACKEND backend ("chroma" | "numpy").
+
+    `embedding` is recorded if the collection is created (default: the current settings).
+    """
+    collection = collection or active_collection()
+    embedding = embedding or new_collection_embedding()
+    if settings.VECTOR_BACKEND == "numpy":
+        from app.repositories.numpy_store import NumpyVectorStore, import_collection
+
+        path = _numpy_path(collection)
+        if (collection == settings.COLLECTION_NAME and not os.path.exists(os.path.join(path, "rows.sqlite3"))
+                and os.path.exists(os.path.join(settings.CHROMA_DIR, "chroma.sqlite3"))):
+            # First start after switching backends: copy the existing Chroma collection once.
+            from app.services.chroma import ChromaService
+
+            chroma = ChromaVectorStore((chroma_service or ChromaService()).get_client(), collection, embedding)
+            if chroma.count():
+                store = NumpyVectorStore(path, settings.VECTOR_DTYPE, chroma.embedding)
+                copied = import_collection(chroma, store)
+                get_logger(__name__).info("vector_store.imported", source="chroma", collection=collection, rows=copied)
+                return store
+        return NumpyVectorStore(path, settings.VECTOR_DTYPE, embedding)
+    if chroma_service is None:
+        from app.services.chroma import ChromaService
+
+        chroma_service = ChromaService()
+    return ChromaVectorStore(chroma_service.get_client(), collection, embedding)
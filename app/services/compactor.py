@@ -0,0 +1,154 @@
+import asyncio
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.core.utils import _get_token_count
+from app.models.dialog_models import SessionState
+from app.prompts.compactor import COMPACTOR_SYSTEM, COMPACTOR_TEMPLATE
+from app.services.openai import AsyncOpenAIService
+
+SLOT_FIELDS = ("stage", "feelings", "context", "duration", "goal")
+FOLDED_MAX = 1000  # finished folds kept for sessions whose next turn hasn't come yet
+
+
+@dataclass
+class CompactedHistory:
+    payload: str        # JSON handed to the planner as "Session so far"
+    tokens_full: int    # tokens of every turn verbatim
+    tokens_sent: int    # tokens of summary + turns actually sent
+    turns_sent: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.tokens_full - self.tokens_sent, 0)
+
+
+def _turn_tokens(turn: dict) -> int:
+    """Token count of a turn, computed once and stored on the turn itself."""
+    if "tokens" not in turn:
+        turn["tokens"] = _get_token_count(turn.get("content") or "")
+    return turn["tokens"]
+
+
+class ConversationCompactor:
+    """Keeps the planner's view of a session within a fixed token budget.
+
+    The newest `recent_turns` always go in verbatim; older turns fill what
+    the summary and those leave of the budget. Older turns are folded, a
+    batch at a time, into `state.history_summary` and flagged `summarized`
+    so each turn is summarized once. The fold runs in the background once
+    the reply has gone out (`fold_later`) and is applied by the session's
+    next `compact`, so no turn waits for it. Token counts are cached on the
+    turns and summary, so a long session costs about the same per turn as a
+    short one.
+    """
+
+    def __init__(
+        self,
+        oa: AsyncOpenAIService,
+        model: Optional[str] = None,
+        budget: Optional[int] = None,
+        recent_turns: Optional[int] = None,
+        summary_batch: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.openai = oa
+        self.model = model or settings.PLANNER_SUMMARY_MODEL or settings.OPENAI_CHAT_MODEL
+        self.budget = budget or settings.PLANNER_HISTORY_TOKENS
+        self.recent_turns = recent_turns or settings.PLANNER_RECENT_TURNS
+        self.summary_batch = summary_batch or settings.PLANNER_SUMMARY_BATCH
+        # sid -> (summary, (role, content) of the turns it covers), waiting for the session's next turn.
+        self._folded: "OrderedDict[str, Tuple[str, List[Tuple[str, str]]]]" = OrderedDict()
+        self._folding: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def compact(self, state: SessionState, session_id: Optional[str] = None) -> CompactedHistory:
+        if session_id is not None:
+            self._apply(session_id, state)
+        turns = state.turns
+        tokens_full = sum(_turn_tokens(t) for t in turns)
+
+        recent = turns[-self.recent_turns:]
+        older = turns[:len(turns) - len(recent)]
+        # Older turns not yet summarized, newest first, in what the summary and recent turns leave.
+        room = self.budget - state.history_summary_tokens - sum(t["tokens"] for t in recent)
+        extra: List[dict] = []
+        for t in reversed(older):
+            if t.get("summarized") or t["tokens"] > room:
+                break
+            extra.append(t)
+            room -= t["tokens"]
+        keep = extra[::-1] + recent
+
+        payload = {k: getattr(state, k) for k in SLOT_FIELDS}
+        payload["history_summary"] = state.history_summary
+        payload["recent_turns"] = [{"role": t["role"], "content": t["content"]} for t in keep]
+        return CompactedHistory(
+            payload=json.dumps(payload, ensure_ascii=False),
+            tokens_full=tokens_full,
+            tokens_sent=state.history_summary_tokens + sum(t["tokens"] for t in keep),
+            turns_sent=len(keep),
+        )
+
+    def fold_later(self, session_id: str, state: SessionState) -> None:
+        """Fold the session's due older turns into its summary in the background."""
+        pending = self._due(state)
+        if not pending or session_id in self._folding:
+            return
+        self._folding.add(session_id)
+        task = asyncio.create_task(self._fold(session_id, state.history_summary, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _due(self, state: SessionState) -> List[dict]:
+        """Older turns to fold: a full batch, too many tokens, or any that no longer fit the budget."""
+        turns = state.turns
+        older = turns[:max(len(turns) - self.recent_turns, 0)]
+        pending = [t for t in older if not t.get("summarized")]
+        if not pending:
+            return []
+        tokens = sum(_turn_tokens(t) for t in pending)
+        room = self.budget - state.history_summary_tokens - sum(_turn_tokens(t) for t in turns[len(older):])
+        if len(pending) >= self.summary_batch or tokens > self.budget // 2 or tokens > room:
+            return pending
+        return []
+
+    async def _fold(self, session_id: str, summary: Optional[str], turns: List[dict]) -> None:
+        text = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        try:
+            folded = await self.openai.response(
+                model=self.model,
+                input=[
+                    {"role": "system", "content": COMPACTOR_SYSTEM},
+                    {"role": "user", "content": COMPACTOR_TEMPLATE.format(summary=summary or "(none)", turns=text)},
+                ],
+            )
+        except Exception as e:
+            # Leave the turns unsummarized; the budget still bounds the prompt and a later turn retries.
+            self.logger.warning("planner.compaction.failed", error=str(e), turns=len(turns))
+            return
+        finally:
+            self._folding.discard(session_id)
+        self._folded[session_id] = (folded.strip(), [(t["role"], t["content"]) for t in turns])
+        self._folded.move_to_end(session_id)
+        while len(self._folded) > FOLDED_MAX:
+            self._folded.popitem(last=False)
+
+    def _apply(self, session_id: str, state: SessionState) -> None:
+        """Adopt a finished fold if the session's first unsummarized turns are still the ones it covers."""
+        ready = self._folded.pop(session_id, None)
+        if ready is None:
+            return
+        summary, covered = ready
+        pending = [t for t in state.turns if not t.get("summarized")][:len(covered)]
+        if [(t["role"], t["content"]) for t in pending] != covered:
+            return  # trimmed or folded elsewhere meanwhile; a later turn folds again
+        state.history_summary = summary
+        state.history_summary_tokens = _get_token_count(summary)
+        for t in pending:
+            t["summarized"] = True
+        self.logger.info("planner.compaction.folded", turns=len(pending), summary_tokens=state.history_summary_tokens)
@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.settings import settings
+from app.core.utils import _get_token_count
+
+MIN_OVERLAP_CHARS = 20
+
+
+def _tokens(ctx: Dict[str, Any]) -> int:
+    # Chunks from the token chunker carry their count; older ones are counted here.
+    return (ctx.get("meta") or {}).get("tokens") or _get_token_count(ctx["text"])
+
+
+def mmr_order(embeddings: np.ndarray, query: Optional[Sequence[float]], lambda_: float) -> List[int]:
+    """Greedy maximal marginal relevance over all candidates, vectorized.
+
+    Relevance is cosine to the query, or the incoming rank when there is no
+    query vector (lexical-only hits).
+    """
+    if len(embeddings) < 2:
+        return list(range(len(embeddings)))
+    E = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    n = len(E)
+    if query is not None:
+        q = np.asarray(query, dtype=np.float32)
+        relevance = E @ (q / max(float(np.linalg.norm(q)), 1e-12))
+    else:
+        relevance = 1.0 - np.arange(n, dtype=np.float32) / n
+    pairwise = E @ E.T
+    order = [int(np.argmax(relevance))]
+    max_sim = pairwise[order[0]].copy()
+    remaining = np.ones(n, dtype=bool)
+    remaining[order[0]] = False
+    while remaining.any():
+        score = lambda_ * relevance - (1 - lambda_) * max_sim
+        score[~remaining] = -np.inf
+        best = int(np.argmax(score))
+        order.append(best)
+        remaining[best] = False
+        np.maximum(max_sim, pairwise[best], out=max_sim)
+    return order
+
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (0 if under MIN_OVERLAP_CHARS)."""
+    probe = b[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = a.find(probe, max(len(a) - len(b), 0))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(probe, start + 1)
+    return 0
+
+
+def _merge(block: Dict[str, Any], ctx: Dict[str, Any]) -> Optional[str]:
+    """Merged text when `ctx` overlaps, is contained in, or sits on the same page as `block`; else None."""
+    bm, cm = block["meta"], ctx["meta"] or {}
+    if bm.get("source") != cm.get("source"):
+        return None
+    b_first, b_last = bm.get("page"), bm.get("page_end") or bm.get("page")
+    c_first, c_last = cm.get("page"), cm.get("page_end") or cm.get("page")
+    if None in (b_first, c_first) or c_first > b_last + 1 or b_first > c_last + 1:
+        return None
+    a, b = block["text"], ctx["text"]
+    if b in a:
+        return a
+    if a in b:
+        return b
+    if _overlap(a, b):
+        return a + b[_overlap(a, b):]
+    if _overlap(b, a):
+        return b + a[_overlap(b, a):]
+    if c_first == b_first and c_last == b_last:
+        return a + "\n" + b  # same page, no overlap: one block, one source line
+    return None
+
+
+def pack_contexts(
+    contexts: List[Dict[str, Any]],
+    query_embedding: Optional[Sequence[float]] = None,
+    budget: Optional[int] = None,
+    lambda_: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Diversify candidates with MMR, merge overlapping/adjacent chunks, and fill a token budget.
+
+    `contexts` are retriever results ({"text", "meta", optional "embedding"}),
+    best first. Returns merged {"text", "meta"} blocks in selection order.
+    """
+    if not contexts:
+        return []
+    budget = budget or settings.CONTEXT_TOKEN_BUDGET
+    lambda_ = settings.MMR_LAMBDA if lambda_ is None else lambda_
+    order = list(range(len(contexts)))
+    if all(c.get("embedding") is not None for c in contexts):
+        embeddings = np.asarray([c["embedding"] for c in contexts], dtype=np.float32)
+        order = mmr_order(embeddings, query_embedding, lambda_)
+
+    blocks: List[Dict[str, Any]] = []
+    used = 0
+    for i in order:
+        ctx = contexts[i]
+        for block in blocks:
+            merged = _merge(block, ctx)
+            if merged is None:
+                continue
+            if merged != block["text"]:
+                tokens = _get_token_count(merged)
+                if used + tokens - block["tokens"] > budget:
+                    break
+                used += tokens - block["tokens"]
+                pages = [p for p in (block["meta"].get("page"), ctx["meta"].get("page")) if p is not None]
+                ends = [p for p in (block["meta"].get("page_end") or block["meta"].get("page"),
+                                    ctx["meta"].get("page_end") or ctx["meta"].get("page")) if p is not None]
+                block["text"], block["tokens"] = merged, tokens
+                block["meta"] = {**block["meta"], "page": min(pages), "page_end": max(ends)}
+            break
+        else:
+            tokens = _tokens(ctx)
+            if used + tokens <= budget:
+                blocks.append({"text": ctx["text"], "meta": dict(ctx.get("meta") or {}), "tokens": tokens})
+                used += tokens
+    return [{"text": b["text"], "meta": b["meta"]} for b in blocks]
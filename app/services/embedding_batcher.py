@@ -0,0 +1,119 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from openai import BadRequestError
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.core.utils import _get_token_count
+
+Vector = List[float]
+Sender = Callable[[List[str], str, Optional[int]], Awaitable[List[Vector]]]
+Group = Tuple[str, Optional[int]]  # (model, dimensions): texts only share a call within a group
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into shared API calls.
+
+    Texts for the same model and dimensions arriving within `window_ms` of
+    the first pending one are sent together, up to `max_texts` / `max_tokens`
+    per call. Identical texts already queued or in flight share one future.
+    Callers get their vectors in input order.
+    """
+
+    def __init__(
+        self,
+        send: Sender,
+        window_ms: Optional[float] = None,
+        max_texts: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.send = send
+        self.window = (settings.EMBED_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_texts = max_texts or settings.EMBED_BATCH_MAX_TEXTS
+        self.max_tokens = max_tokens or settings.EMBED_BATCH_MAX_TOKENS
+        self._inflight: Dict[Tuple[Group, str], "asyncio.Future[Vector]"] = {}  # (group, text) -> future
+        self._pending: Dict[Group, List[Tuple[str, int]]] = {}                  # group -> [(text, tokens)]
+        self._pending_tokens: Dict[Group, int] = {}
+        self._timers: Dict[Group, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+        self.requests = 0
+        self.texts = 0
+        self.deduplicated = 0
+        self.api_calls = 0
+
+    async def embed(self, texts: List[str], model: str, dimensions: Optional[int] = None) -> List[Vector]:
+        loop = asyncio.get_running_loop()
+        group = (model, dimensions)
+        futures = []
+        self.requests += 1
+        for text in texts:
+            self.texts += 1
+            key = (group, text)
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.deduplicated += 1
+            else:
+                fut = loop.create_future()
+                self._inflight[key] = fut
+                self._enqueue(group, text)
+            futures.append(fut)
+        # Shielded: one caller giving up must not cancel vectors others are waiting on.
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "deduplicated": self.deduplicated,
+            "api_calls": self.api_calls,
+            "texts_per_call": round((self.texts - self.deduplicated) / self.api_calls, 2) if self.api_calls else None,
+        }
+
+    def _enqueue(self, group: Group, text: str) -> None:
+        tokens = _get_token_count(text)
+        if self._pending.get(group) and self._pending_tokens[group] + tokens > self.max_tokens:
+            self._flush(group)
+        self._pending.setdefault(group, []).append((text, tokens))
+        self._pending_tokens[group] = self._pending_tokens.get(group, 0) + tokens
+        if len(self._pending[group]) >= self.max_texts or self._pending_tokens[group] >= self.max_tokens:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = asyncio.get_running_loop().call_later(self.window, self._flush, group)
+
+    def _flush(self, group: Group) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = [text for text, _ in self._pending.pop(group, [])]
+        self._pending_tokens.pop(group, None)
+        if batch:
+            task = asyncio.ensure_future(self._send(batch, group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[str], group: Group) -> None:
+        self.api_calls += 1
+        try:
+            vectors = await self.send(batch, *group)
+        except BadRequestError as e:
+            if len(batch) == 1:
+                return self._fail(batch, group, e)
+            # One caller's bad input must not fail everyone sharing the call: bisect to isolate it.
+            mid = len(batch) // 2
+            await asyncio.gather(self._send(batch[:mid], group), self._send(batch[mid:], group))
+            return
+        except Exception as e:
+            return self._fail(batch, group, e)
+        for text, vector in zip(batch, vectors):
+            fut = self._inflight.pop((group, text), None)
+            if fut is not None and not fut.done():
+                fut.set_result(vector)
+
+    def _fail(self, batch: List[str], group: Group, e: Exception) -> None:
+        self.logger.warning("embed.batch.failed", texts=len(batch), error=str(e))
+        for text in batch:
+            fut = self._inflight.pop((group, text), None)
+            if fut is not None and not fut.done():
+                fut.set_exception(e)
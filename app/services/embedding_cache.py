@@ -0,0 +1,124 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from time import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.logging import get_logger
+
+
+class EmbeddingCache:
+    """Content-addressed, disk-backed store of embedding vectors.
+
+    Entries are keyed by sha256(model, dimensions, text) and stored as packed
+    float32 blobs in SQLite. When the table grows past `max_entries` the least
+    recently used tenth is evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.logger = get_logger(__name__)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.logger.info("embed_cache.initialized", path=path, entries=self._count, max_entries=max_entries)
+
+    @staticmethod
+    def key(text: str, model: str, dimensions: Optional[int] = None) -> str:
+        h = hashlib.sha256()
+        h.update(f"{model}\0{dimensions or ''}\0".encode("utf-8"))
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def lookup(
+        self, texts: Sequence[str], model: str, dimensions: Optional[int] = None
+    ) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """Return (keys in input order, cached vectors by key, uncached texts by key).
+
+        Repeated texts share a key, so each miss is requested from the API only once.
+        """
+        keys = [self.key(t, model, dimensions) for t in texts]
+        found = self.get_many(keys)
+        missing: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in found:
+                missing.setdefault(k, t)
+        self.hits += len(keys) - sum(1 for k in keys if k in missing)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        out: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for k, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    out[k] = vec.tolist()
+                if rows:
+                    self._db.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time(), k) for k, _ in rows],
+                    )
+            self._db.commit()
+        return out
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        if not items:
+            return
+        now = time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vec, last_used) VALUES (?, ?, ?)",
+                [(k, array("f", v).tobytes(), now) for k, v in items.items()],
+            )
+            self._count += self._db.total_changes - before
+            if self._count > self.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        target = int(self.max_entries * 0.9)
+        n = self._count - target
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (n,)
+        )
+        self._count = target
+        self.evictions += n
+        self.logger.info("embed_cache.evicted", evicted=n, entries=self._count)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,158 @@
+import re
+import threading
+from collections import Counter
+from typing import Optional, Tuple
+
+from app.core.logging import get_logger
+from app.models.dialog_models import DialogAction, SessionState
+
+# Safety pre-screen. An un-negated CERTAIN phrase ends the dialog
+# without an LLM call. Anything else in the lexicon (idioms like "brush strokes"
+# or "beats me", negations like "I'm not suicidal") goes to the LLM planner with
+# a safety hint, so it decides from context.
+CRISIS_CERTAIN = [
+    r"suicid(e|al)", r"kill(ing)? myself", r"end(ing)? (my life|it all|my own life)", r"want(ed)? to die",
+    r"self[- ]?harm(ing)?", r"hurt(ing)? myself", r"cut(ting)? myself", r"no reason to live", r"better off dead",
+]
+CRISIS_POSSIBLE = [r"(being|been|getting) abused", r"(hits|beats|rapes?d?) me"]
+MEDICAL_CERTAIN = [
+    r"(took|taken|taking) an overdose", r"overdosed", r"(having|had) a (heart attack|stroke|seizure)",
+    r"chest pains?", r"bleeding (a lot|heavily)",
+]
+MEDICAL_POSSIBLE = [
+    r"overdos\w*", r"can'?t breathe", r"cannot breathe", r"seizures?", r"heart attack", r"strokes?",
+    r"faint(ed|ing)?", r"passed out", r"poison(ed|ing)?",
+]
+NEGATIONS = {"not", "never", "no", "don't", "dont", "didn't", "didnt", "isn't", "wasn't", "won't", "nor", "without"}
+AFFIRM_RE = re.compile(
+    r"^(yes|yeah|yep|yup|sure|ok|okay|please|go ahead|sounds good|do it|please do|absolutely|of course|"
+    r"that'?s right|correct|let'?s do it|yes please)( please| thanks| thank you)*$"
+)
+ACUTE_RE = re.compile(
+    r"\b(today|yesterday|tonight|last night|this morning|since this morning|this week|"
+    r"(past|last) (few|couple( of)?) days|(a )?(few|couple( of)?) days|recently|just started)\b"
+)
+PERSISTENT_RE = re.compile(
+    r"\b(weeks|months|years|a long time|long time|ages|ongoing|always|for a while|forever|chronic)\b"
+)
+_SAFETY_RES = [
+    (kind, certain, re.compile(r"\b(" + "|".join(patterns) + r")\b"))
+    for kind, certain, patterns in (
+        ("crisis", True, CRISIS_CERTAIN), ("medical", True, MEDICAL_CERTAIN),
+        ("crisis", False, CRISIS_POSSIBLE), ("medical", False, MEDICAL_POSSIBLE),
+    )
+]
+_NORMALIZE_RE = re.compile(r"[^\w\s']+")
+
+MAX_FAST_WORDS = 6  # longer messages may carry more slots than a rule can see
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_NORMALIZE_RE.sub(" ", text.lower().replace("’", "'")).split())
+
+
+def _negated(msg: str, start: int) -> bool:
+    return any(w in NEGATIONS for w in msg[:start].split()[-3:])
+
+
+def screen(msg: str) -> Optional[Tuple[str, bool, str]]:
+    """(kind, certain, phrase) for the strongest safety-lexicon hit in a normalized message, else None."""
+    possible = None
+    for kind, certain, pattern in _SAFETY_RES:
+        for m in pattern.finditer(msg):
+            if certain and not _negated(msg, m.start()):
+                return kind, True, m.group(0)
+            possible = possible or (kind, False, m.group(0))
+    return possible
+
+
+def _slot_summary(state: SessionState) -> str:
+    parts = []
+    if state.feelings:
+        parts.append(f"feelings: {', '.join(state.feelings)}")
+    if state.context:
+        parts.append(f"context: {state.context}")
+    if state.duration:
+        parts.append(f"duration: {state.duration}")
+    if state.goal:
+        parts.append(f"goal: {state.goal}")
+    return "; ".join(parts)
+
+
+class FastPlanner:
+    """Deterministic planner for unambiguous turns, tried before the LLM planner.
+
+    Rules: unambiguous safety phrases on every message, a plain yes at
+    `confirm`, and a bare duration answer at `ask_duration`. Anything else
+    returns None and goes to the LLM; `safety_hint` tells it about softer
+    safety-lexicon hits. Per-rule counters show how many round-trips it saves.
+    """
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.hits: Counter = Counter()
+        self.safety_deferred = 0
+
+    def plan(self, state: SessionState, user_msg: str) -> Optional[DialogAction]:
+        rule, action = self._match(state, _normalize(user_msg))
+        with self._lock:
+            self.turns += 1
+            if rule:
+                self.hits[rule] += 1
+        if rule:
+            self.logger.info("planner.fast_path", rule=rule, stage=action.stage)
+        return action
+
+    def safety_hint(self, user_msg: str) -> Optional[str]:
+        """Note for the LLM planner when the message touches the safety lexicon without a certain match."""
+        hit = screen(_normalize(user_msg))
+        if hit is None or hit[1]:
+            return None
+        with self._lock:
+            self.safety_deferred += 1
+        kind, _, phrase = hit
+        return (f"Safety check: the message contains \"{phrase}\", which may indicate a {kind} situation. "
+                f"Decide from context (negation, idiom, unrelated use) whether safety should be \"{kind}\".")
+
+    def stats(self) -> dict:
+        with self._lock:
+            handled = sum(self.hits.values())
+            return {
+                "turns": self.turns,
+                "handled": handled,
+                "llm_calls_saved_rate": round(handled / self.turns, 4) if self.turns else None,
+                "safety_deferred": self.safety_deferred,
+                "rules": {rule: {"hits": n, "hit_rate": round(n / self.turns, 4)} for rule, n in self.hits.items()},
+            }
+
+    def _match(self, state: SessionState, msg: str) -> Tuple[Optional[str], Optional[DialogAction]]:
+        hit = screen(msg)
+        if hit is not None:
+            kind, certain, _ = hit
+            if certain:
+                return f"safety_{kind}", DialogAction(stage="end", safety=kind, summary=_slot_summary(state))
+            return None, None  # the LLM decides, with a safety hint
+        if len(msg.split()) > MAX_FAST_WORDS:
+            return None, None
+
+        if state.stage == "confirm" and state.feelings and AFFIRM_RE.match(msg):
+            return "confirm_yes", DialogAction(stage="recommend", summary=_slot_summary(state))
+
+        if state.stage == "ask_duration":
+            acute, persistent = bool(ACUTE_RE.search(msg)), bool(PERSISTENT_RE.search(msg))
+            if acute != persistent:
+                duration = "acute" if acute else "persistent"
+                filled = state.model_copy(update={"duration": duration})
+                if not (filled.feelings and filled.context):
+                    return None, None
+                summary = _slot_summary(filled)
+                return f"duration_{duration}", DialogAction(
+                    stage="confirm",
+                    duration=duration,
+                    summary=summary,
+                    next_question=f"{summary[0].upper()}{summary[1:]}. Shall I suggest a few essences?",
+                    needed_slots=[] if filled.goal else ["goal"],
+                )
+        return None, None
@@ -1,13 +1,20 @@
-from io import BytesIO
+import os
+import threading
 from time import time
+from contextlib import closing
 from dataclasses import dataclass
-from typing import Optional, Sequence, Any
+from itertools import islice
+from typing import Callable, Collection, Iterable, Iterator, List, Optional, Sequence, Any, Union
 
-from pypdf import PdfReader
 from app.core.logging import get_logger
-from app.core.utils import _chunk_text, _get_token_count
+from app.core.metrics import timed, timed_iter
+from app.core.settings import settings
+from app.core.utils import _get_token_count
 from app.repositories.chroma import ChromaRepository
 from app.services.openai import OpenAIService
+from app.services.pdf import iter_chunks, pdf_to_chunks
+from app.services.ingest_pipeline import IngestPipeline, PipelineStats
+from app.services.manifest import IngestManifest, ManifestEntry, file_sha256
 
 @dataclass
 class IngestResult:
@@ -15,33 +22,39 @@ class IngestResult:
     error: Optional[str]
     status: int
     seconds: Optional[float]
+    files: Optional[int] = None
+    deleted: Optional[int] = None
+    cancelled: bool = False   # stopped by the cancel event before all input was processed
+
+def _windows(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while window := list(islice(it, size)):
+        yield window
 
 class IngestService:
-    def __init__(self, chroma_repo: ChromaRepository, openai_service: OpenAIService):
+    def __init__(
+        self,
+        chroma_repo: ChromaRepository,
+        openai_service: OpenAIService,
+        manifest: Optional[IngestManifest] = None,
+    ):
         self.logger = get_logger(__name__)
         self.chroma_repo = chroma_repo
         self.openai_service = openai_service
+        self.manifest = manifest
 
     def _pdf_to_texts(self, pdf_bytes: bytes, filename: str):
-        reader = PdfReader(BytesIO(pdf_bytes))
-        items = []
-        for p, page in enumerate(reader.pages, start=1):
-            try:
-                txt = page.extract_text() or ""
-            except Exception as e:
-                self.logger.warning("pdf.extract.error", filename=filename, page=p, error=str(e))
-                txt = ""
-            if txt.strip():
-                items.extend(_chunk_text(txt, {"source": filename, "page": p}))
-        return items
-
-    def _embed(self, texts):
+        with timed("ingest.pdf_to_texts"):
+            return pdf_to_chunks(pdf_bytes, filename)
+
+    def _embed(self, texts, tokens: Optional[Sequence[Optional[int]]] = None):
+        """Embed in request batches under the API's token cap; `tokens` skips re-tokenizing known counts."""
         MAX_TOKENS = 250000
         batches = []
         current_batch = []
         current_tokens = 0
-        for t in texts:
-            t_tokens = _get_token_count(t)
+        for i, t in enumerate(texts):
+            t_tokens = tokens[i] if tokens and tokens[i] is not None else _get_token_count(t)
             if current_tokens + t_tokens > MAX_TOKENS and current_batch:
                 batches.append(current_batch)
                 current_batch = []
@@ -51,81 +64,147 @@ class IngestService:
         if current_batch:
             batches.append(current_batch)
         out = []
+        dims = self.chroma_repo.embed_dimensions
         for batch in batches:
-            out.extend(self.openai_service.embed(batch))
+            out.extend(self.openai_service.embed(batch, dimensions=dims))
         return out
     
-    def _is_duplicate_chunk(self, chunk_embedding, chunk_text, source_meta):
-        results = self.chroma_repo.query(query_embeddings=[chunk_embedding], where={"source": source_meta.get("source")}, n_results=1)
-        docs = results.get("documents", [[]])[0] if results and results.get("documents") else []
-        return any(doc == chunk_text for doc in docs)
+    def _new_chunks(self, chunks):
+        """Drop chunks whose content-hash id is repeated in `chunks` or already stored."""
+        unique = list({c["id"]: c for c in chunks}.values())
+        existing = self.chroma_repo.existing_ids([c["id"] for c in unique])
+        return [c for c in unique if c["id"] not in existing]
+
+    def _store_chunks(self, chunks) -> List[str]:
+        """Embed and upsert only the chunks not yet in the collection; returns the ids stored."""
+        fresh = self._new_chunks(chunks)
+        if not fresh:
+            return []
+        embeddings = self._embed([c["text"] for c in fresh], [c.get("tokens") for c in fresh])
+        self.chroma_repo.upsert(
+            ids=[c["id"] for c in fresh],
+            documents=[c["text"] for c in fresh],
+            metadatas=[c["metadata"] for c in fresh],
+            embeddings=embeddings,
+        )
+        return [c["id"] for c in fresh]
+
+    def ingest_document(
+        self, pdf: Union[bytes, str], fname: str, cancel: Optional[threading.Event] = None
+    ) -> IngestResult:
+        """Ingest one PDF given as a file path (preferred) or raw bytes.
 
-    def ingest_document(self, data: bytes, fname: str) -> IngestResult:
+        Pages are extracted lazily and chunks are deduplicated, embedded and
+        upserted in windows of INGEST_WINDOW, so peak memory is bounded by the
+        window rather than by the size of the document. `cancel` is checked
+        between windows; a cancelled document is rolled back, so it is either
+        stored whole or not at all.
+        """
         t0 = time()
-        size_kb = round(len(data) / 1024, 2)
-        self.logger.info("ingest.pdf.start", filename=fname, size_kb=size_kb)
-        
-        chunks = self._pdf_to_texts(data, fname)
-        if not chunks:
+        size = len(pdf) if isinstance(pdf, bytes) else os.path.getsize(pdf)
+        self.logger.info("ingest.pdf.start", filename=fname, size_kb=round(size / 1024, 2))
+
+        seen = 0
+        stored_ids: List[str] = []
+        with closing(iter_chunks(pdf, fname)) as chunks:  # closes the file on an early return too
+            for window in _windows(timed_iter(chunks, "ingest.extract_chunk"), settings.INGEST_WINDOW):
+                if cancel is not None and cancel.is_set():
+                    if stored_ids:
+                        self.chroma_repo.delete(ids=stored_ids)
+                    self.logger.info("ingest.pdf.cancelled", filename=fname, rolled_back=len(stored_ids))
+                    return IngestResult(0, "Cancelled.", 200, time() - t0, cancelled=True)
+                seen += len(window)
+                stored_ids += self._store_chunks(window)
+        stored = len(stored_ids)
+        if not seen:
             self.logger.warning("ingest.pdf.no_text", filename=fname)
             return IngestResult(None, "No extractable text found.", 400, None)
-
-        embeddings = self._embed([c["text"] for c in chunks])
-
-        filtered = [
-            (c["id"], c["text"], c["metadata"], emb)
-            for c, emb in zip(chunks, embeddings)
-            if not self._is_duplicate_chunk(emb, c["text"], c["metadata"])
-        ]
-        
-        if not filtered:
+        if not stored:
             self.logger.info("ingest.pdf.duplicates", filename=fname)
             return IngestResult(None, "All chunks are duplicates.", 200, None)
-        
-        ids, docs, metas, vecs = zip(*filtered)
-        self.chroma_repo.upsert(ids=ids, documents=docs, metadatas=metas, embeddings=vecs)
 
         dt = time() - t0
-        self.logger.info("ingest.pdf.done", filename=fname, chunks=len(docs), seconds=round(dt,2))
-        return IngestResult(list(docs), None, 200, dt)
+        self.logger.info("ingest.pdf.done", filename=fname, chunks=stored, seconds=round(dt,2))
+        return IngestResult(stored, None, 200, dt)
 
-    def ingest_folder(self, path: str) -> IngestResult:
+    def ingest_folder(
+        self,
+        path: str,
+        sync: bool = False,
+        skip: Collection[str] = (),
+        on_file_done: Optional[Callable[[str, List[str]], None]] = None,
+        on_file_failed: Optional[Callable[[str], None]] = None,
+        on_progress: Optional[Callable[[PipelineStats], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> IngestResult:
+        """Ingest every PDF under `path`.
+
+        With `sync`, only files that are new or changed since the manifest last
+        saw them are processed, and chunks of removed or replaced files are
+        deleted from the collection.
+        """
         import glob
-        import os
         import pathlib
         t0 = time()
-        pdfs = glob.glob(str(pathlib.Path(path) / "**/*.pdf"), recursive=True)
-        self.logger.info("ingest.folder.start", path=path, pdf_count=len(pdfs))
-        total_chunks = 0
-        files_done = 0
-        for pdf_path in pdfs:
-            try:
-                with open(pdf_path, "rb") as f:
-                    pdf_bytes = f.read()
-                fname = os.path.basename(pdf_path)
-                chunks = self._pdf_to_texts(pdf_bytes, fname)
-                if not chunks:
-                    self.logger.warning("ingest.folder.no_text", filename=fname)
-                    continue
-                ids = []
-                docs = []
-                metas = []
-                embeddings = self._embed([c["text"] for c in chunks])
-                for c, emb in zip(chunks, embeddings):
-                    if not self._is_duplicate_chunk(emb, c["text"], c["metadata"]):
-                        ids.append(c["id"])
-                        docs.append(c["text"])
-                        metas.append(c["metadata"])
-                if not docs:
-                    self.logger.info("ingest.folder.duplicates", filename=fname)
-                    continue
-                vecs = [emb for c, emb in zip(chunks, embeddings) if not self._is_duplicate_chunk(emb, c["text"], c["metadata"])]
-                self.chroma_repo.upsert(ids=ids, documents=docs, metadatas=metas, embeddings=vecs)
-                total_chunks += len(docs)
-                files_done += 1
-                self.logger.info("ingest.folder.file_done", filename=fname, chunks=len(docs))
-            except Exception as e:
-                self.logger.exception("ingest.folder.failed", filename=pdf_path, error=str(e))
+        pdfs = glob.glob(str(pathlib.Path(os.path.abspath(path)) / "**/*.pdf"), recursive=True)
+        todo = [p for p in pdfs if p not in skip]
+        deleted = 0
+        if sync and self.manifest:
+            todo, deleted = self._sync_plan(path, pdfs, todo)
+        self.logger.info("ingest.folder.start", path=path, pdf_count=len(pdfs), todo=len(todo), sync=sync)
+
+        def file_done(pdf_path: str, chunk_ids: List[str]) -> None:
+            nonlocal deleted
+            if self.manifest:
+                deleted += self._record_file(pdf_path, chunk_ids)
+            if on_file_done:
+                on_file_done(pdf_path, chunk_ids)
+
+        pipeline = IngestPipeline(
+            self, on_file_done=file_done, on_file_failed=on_file_failed, on_progress=on_progress, cancel=cancel
+        )
+        stats = pipeline.run(todo)
         dt = time() - t0
-        self.logger.info("ingest.folder.done", files_done=files_done, total_chunks=total_chunks, seconds=round(dt,2))
-        return IngestResult(total_chunks, None, 200, dt)
\ No newline at end of file
+        self.logger.info(
+            "ingest.folder.done",
+            files_done=stats.files_done, files_failed=stats.files_failed,
+            total_chunks=stats.chunks_stored, deleted_chunks=deleted, seconds=round(dt,2),
+        )
+        return IngestResult(stats.chunks_stored, None, 200, dt, files=stats.files_done, deleted=deleted, cancelled=stats.cancelled)
+
+    def _sync_plan(self, folder: str, pdfs: List[str], todo: List[str]) -> tuple[List[str], int]:
+        """Split `todo` down to new/changed files and drop chunks of files that disappeared."""
+        known = self.manifest.under(folder)
+        deleted = 0
+        for gone in set(known) - set(pdfs):
+            deleted += self._delete_chunks(known[gone].chunk_ids, owner=gone)
+            self.manifest.remove(gone)
+            self.logger.info("ingest.sync.removed", filename=gone)
+        changed = []
+        for pdf_path in todo:
+            entry = known.get(pdf_path)
+            st = os.stat(pdf_path)
+            if entry and entry.size == st.st_size and entry.mtime == st.st_mtime:
+                continue
+            if entry and entry.sha256 == file_sha256(pdf_path):
+                self.manifest.touch(pdf_path, st.st_size, st.st_mtime)
+                continue
+            changed.append(pdf_path)
+        self.logger.info("ingest.sync.plan", unchanged=len(todo) - len(changed), changed=len(changed), removed=deleted)
+        return changed, deleted
+
+    def _record_file(self, pdf_path: str, chunk_ids: List[str]) -> int:
+        """Store the file's new chunk set in the manifest; returns how many stale chunks were deleted."""
+        previous = self.manifest.get(pdf_path)
+        st = os.stat(pdf_path)
+        self.manifest.put(ManifestEntry(pdf_path, st.st_size, st.st_mtime, file_sha256(pdf_path), list(chunk_ids)))
+        if not previous:
+            return 0
+        stale = set(previous.chunk_ids) - set(chunk_ids)
+        return self._delete_chunks(stale, owner=pdf_path) if stale else 0
+
+    def _delete_chunks(self, chunk_ids, owner: str) -> int:
+        ids = set(chunk_ids) - self.manifest.referenced_ids(exclude=owner)
+        if ids:
+            self.chroma_repo.delete(ids=list(ids))
+        return len(ids)
@@ -0,0 +1,258 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from time import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.logging import get_logger
+from app.core.metrics import observe
+from app.core.settings import settings
+from app.services.pdf import extract_file
+
+_DONE = object()
+
+
+@dataclass
+class PipelineStats:
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    pages_done: int = 0
+    chunks_stored: int = 0
+    chunks_skipped: int = 0
+    cancelled: bool = False   # cancel dropped work before every file was processed
+    started: float = field(default_factory=time)
+
+
+@dataclass
+class _Batch:
+    path: str
+    chunks: List[Dict[str, Any]]
+
+
+@dataclass
+class _FileState:
+    chunk_ids: List[str]
+    pending: int
+    failed: bool = False
+    dropped: bool = False     # abandoned on cancel rather than failed; retried when the job resumes
+
+
+class IngestPipeline:
+    """Extract → embed → upsert, with the three stages running concurrently.
+
+    PDFs are parsed in a process pool, new chunks are embedded by a pool of
+    threads and written to Chroma by a single upsert thread that groups
+    batches. Stages are joined by bounded queues, so at most `queue_size`
+    embed batches and `queue_size` embedded batches are held in memory.
+
+    `service` is the IngestService providing `_new_chunks`, `_embed` and
+    `chroma_repo`. `on_file_done(path, chunk_ids)` fires once every chunk of a
+    file is stored, `on_file_failed(path)` when a file fails (not when it was
+    dropped on cancel) and `on_progress(stats)` after each file or flushed batch.
+    Setting `cancel` stops scheduling new work; in-flight batches are dropped
+    and their files counted as failed.
+    """
+
+    def __init__(
+        self,
+        service,
+        extract_workers: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        embed_batch: Optional[int] = None,
+        upsert_batch: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        on_file_done: Optional[Callable[[str, List[str]], None]] = None,
+        on_file_failed: Optional[Callable[[str], None]] = None,
+        on_progress: Optional[Callable[[PipelineStats], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.service = service
+        self.extract_workers = extract_workers or settings.INGEST_EXTRACT_WORKERS
+        self.embed_workers = embed_workers or settings.INGEST_EMBED_CONCURRENCY
+        self.embed_batch = embed_batch or settings.INGEST_EMBED_BATCH
+        self.upsert_batch = upsert_batch or settings.INGEST_UPSERT_BATCH
+        queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        self.on_file_done = on_file_done
+        self.on_file_failed = on_file_failed
+        self.on_progress = on_progress
+        self.cancel = cancel or threading.Event()
+        self.stats = PipelineStats()
+        self._embed_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._upsert_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._files: Dict[str, _FileState] = {}
+        self._lock = threading.Lock()
+
+    def run(self, paths: Sequence[str]) -> PipelineStats:
+        self.stats = PipelineStats(files_total=len(paths))
+        self._progress()
+        embedders = [
+            threading.Thread(target=self._embed_stage, name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.embed_workers)
+        ]
+        upserter = threading.Thread(target=self._upsert_stage, name="ingest-upsert", daemon=True)
+        for t in embedders + [upserter]:
+            t.start()
+        try:
+            self._extract_stage(paths)
+        finally:
+            for _ in embedders:
+                self._embed_q.put(_DONE)
+            for t in embedders:
+                t.join()
+            self._upsert_q.put(_DONE)
+            upserter.join()
+        return self.stats
+
+    # --- Stage 1: PDF parsing in worker processes ---
+    def _extract_stage(self, paths: Sequence[str]) -> None:
+        # spawn, not fork: the parent holds Chroma/HTTP threads that must not be duplicated.
+        ctx = multiprocessing.get_context("spawn")
+        todo = list(paths)
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=self.extract_workers, mp_context=ctx) as pool:
+            while (todo or in_flight) and not self.cancel.is_set():
+                while todo and len(in_flight) < self.extract_workers * 2:
+                    path = todo.pop(0)
+                    in_flight[pool.submit(extract_file, path, os.path.basename(path))] = path
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    path = in_flight.pop(fut)
+                    try:
+                        extracted = fut.result()
+                        observe("ingest.extract_chunk", extracted["seconds"])
+                        self._schedule(path, extracted["chunks"], extracted["pages"])
+                    except Exception as e:
+                        self.logger.exception("ingest.pipeline.extract_failed", filename=path, error=str(e))
+                        self._file_failed(path)
+            for fut in in_flight:
+                fut.cancel()
+            if todo or in_flight:
+                self.stats.cancelled = True
+
+    def _schedule(self, path: str, chunks: List[Dict[str, Any]], pages: int) -> None:
+        with self._lock:
+            self.stats.pages_done += pages
+        if not chunks:
+            self.logger.warning("ingest.folder.no_text", filename=os.path.basename(path))
+        fresh = self.service._new_chunks(chunks) if chunks else []
+        batches = [fresh[i:i + self.embed_batch] for i in range(0, len(fresh), self.embed_batch)]
+        with self._lock:
+            self.stats.chunks_skipped += len({c["id"] for c in chunks}) - len(fresh)
+            self._files[path] = _FileState([c["id"] for c in chunks], len(batches))
+        if not batches:
+            if chunks:
+                self.logger.info("ingest.folder.duplicates", filename=os.path.basename(path))
+            self._batch_finished(path, ok=True)
+            return
+        for batch in batches:
+            # Blocks while the embed queue is full, which throttles extraction.
+            self._embed_q.put(_Batch(path, batch))
+
+    # --- Stage 2: embedding, several batches in flight ---
+    def _embed_stage(self) -> None:
+        while True:
+            batch = self._embed_q.get()
+            if batch is _DONE:
+                return
+            if self.cancel.is_set():
+                self._batch_finished(batch.path, ok=False, dropped=True)
+                continue
+            try:
+                vecs = self.service._embed([c["text"] for c in batch.chunks], [c.get("tokens") for c in batch.chunks])
+            except Exception as e:
+                self.logger.exception("ingest.pipeline.embed_failed", filename=batch.path, error=str(e))
+                self._batch_finished(batch.path, ok=False)
+                continue
+            self._upsert_q.put((batch, vecs))
+
+    # --- Stage 3: grouped upserts from one writer ---
+    def _upsert_stage(self) -> None:
+        buffered = []
+        size = 0
+        while True:
+            try:
+                item = self._upsert_q.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                self._flush(buffered)
+                return
+            if item is not None:
+                buffered.append(item)
+                size += len(item[0].chunks)
+            if buffered and (size >= self.upsert_batch or item is None):
+                self._flush(buffered)
+                buffered, size = [], 0
+
+    def _flush(self, buffered) -> None:
+        if not buffered:
+            return
+        if self.cancel.is_set():
+            for batch, _ in buffered:
+                self._batch_finished(batch.path, ok=False, dropped=True)
+            return
+        chunks = [c for batch, _ in buffered for c in batch.chunks]
+        try:
+            self.service.chroma_repo.upsert(
+                ids=[c["id"] for c in chunks],
+                documents=[c["text"] for c in chunks],
+                metadatas=[c["metadata"] for c in chunks],
+                embeddings=[v for _, vecs in buffered for v in vecs],
+            )
+            ok = True
+        except Exception as e:
+            self.logger.exception("ingest.pipeline.upsert_failed", chunks=len(chunks), error=str(e))
+            ok = False
+        for batch, _ in buffered:
+            if ok:
+                with self._lock:
+                    self.stats.chunks_stored += len(batch.chunks)
+            self._batch_finished(batch.path, ok=ok)
+
+    # --- Per-file bookkeeping ---
+    def _batch_finished(self, path: str, ok: bool, dropped: bool = False) -> None:
+        with self._lock:
+            state = self._files[path]
+            state.pending -= 1
+            state.failed = state.failed or not ok
+            state.dropped = state.dropped or dropped
+            self.stats.cancelled = self.stats.cancelled or dropped
+            finished = state.pending <= 0
+            if finished:
+                del self._files[path]
+                if state.failed:
+                    self.stats.files_failed += 1
+                else:
+                    self.stats.files_done += 1
+        if not finished:
+            return
+        if not state.failed:
+            self.logger.info("ingest.folder.file_done", filename=os.path.basename(path), chunks=len(state.chunk_ids))
+            if self.on_file_done:
+                self._callback(self.on_file_done, path, state.chunk_ids)
+        elif not state.dropped and self.on_file_failed:
+            self._callback(self.on_file_failed, path)
+        self._progress()
+
+    def _file_failed(self, path: str) -> None:
+        with self._lock:
+            self.stats.files_failed += 1
+        if self.on_file_failed:
+            self._callback(self.on_file_failed, path)
+        self._progress()
+
+    def _progress(self) -> None:
+        if self.on_progress:
+            self._callback(self.on_progress, self.stats)
+
+    def _callback(self, fn, *args) -> None:
+        # Callbacks run on stage threads; an exception there must not stall the queues.
+        try:
+            fn(*args)
+        except Exception as e:
+            self.logger.exception("ingest.pipeline.callback_failed", error=str(e))
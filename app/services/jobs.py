@@ -0,0 +1,301 @@
+import fcntl
+import json
+import os
+import queue
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from time import sleep, time
+from typing import Callable, Dict, List, Optional
+
+from app.core.logging import get_logger
+from app.services.ingest import IngestResult, IngestService
+from app.services.ingest_pipeline import PipelineStats
+
+POLL_SECONDS = 1.0  # how often the leader looks for jobs queued or cancelled by other workers
+
+
+@dataclass
+class IngestJob:
+    id: str
+    kind: str                      # "pdf" | "folder"
+    target: str                    # spooled upload path or folder path
+    filename: Optional[str] = None
+    sync: bool = False             # folder jobs: only new/changed files, prune removed ones
+    status: str = "queued"         # queued | running | done | failed | cancelled
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    pages_done: int = 0
+    chunks_done: int = 0
+    completed_files: List[str] = field(default_factory=list)
+    failed_files: List[str] = field(default_factory=list)  # not retried on resume
+    created: float = field(default_factory=time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[dict] = None  # IngestResult, once finished
+
+    def report(self) -> dict:
+        """Public view: counters plus throughput and ETA, without the checkpoint file list."""
+        out = asdict(self)
+        out.pop("completed_files")
+        out.pop("failed_files")
+        elapsed = ((self.finished or time()) - self.started) if self.started else 0.0
+        processed = self.files_done + self.files_failed
+        out["elapsed_seconds"] = round(elapsed, 2)
+        out["chunks_per_second"] = round(self.chunks_done / elapsed, 2) if elapsed else None
+        out["files_per_second"] = round(processed / elapsed, 3) if elapsed else None
+        remaining = max(self.files_total - processed, 0)
+        out["eta_seconds"] = (
+            round(remaining * elapsed / processed, 1)
+            if self.status == "running" and processed else None
+        )
+        return out
+
+
+class JobManager:
+    """Runs ingest jobs one at a time on a background thread.
+
+    Each job is checkpointed to `<jobs_dir>/<id>.json`. Jobs still queued or
+    running at shutdown are picked up again on the next start. Folder jobs
+    skip the files they had already completed or failed.
+
+    With several workers sharing `jobs_dir`, only the one holding
+    `<jobs_dir>/manager.lock` (the leader) runs jobs. The others write new
+    jobs and cancel requests (`<id>.cancel`) to the directory, the leader
+    picks them up within POLL_SECONDS, and job status is read back from the
+    checkpoints.
+    """
+
+    def __init__(self, service_factory: Callable[[], IngestService], jobs_dir: str):
+        self.logger = get_logger(__name__)
+        self.service_factory = service_factory
+        self.jobs_dir = jobs_dir
+        self.uploads_dir = os.path.join(jobs_dir, "uploads")
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        self._jobs: Dict[str, IngestJob] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._worker, name="ingest-jobs", daemon=True)
+        self._watcher = threading.Thread(target=self._watch, name="ingest-jobs-watch", daemon=True)
+        self._lock_file = open(os.path.join(jobs_dir, "manager.lock"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.leader = True
+        except OSError:
+            self.leader = False
+        if self.leader:
+            self._load()
+
+    def start(self) -> None:
+        if self.leader:
+            self._thread.start()
+            self._watcher.start()
+
+    def shutdown(self) -> None:
+        # Interrupt the running job without marking it cancelled, so it resumes on restart.
+        self._stopping = True
+        for ev in self._cancel.values():
+            ev.set()
+        self._queue.put(None)
+        if self._thread.is_alive():
+            self._thread.join(timeout=30)
+        self._lock_file.close()
+
+    def upload_path(self, job_id: str) -> str:
+        return os.path.join(self.uploads_dir, f"{job_id}.pdf")
+
+    def new_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def submit_pdf(self, job_id: str, filename: str) -> IngestJob:
+        return self._submit(IngestJob(id=job_id, kind="pdf", target=self.upload_path(job_id), filename=filename, files_total=1))
+
+    def submit_folder(self, path: str, sync: bool = False) -> IngestJob:
+        return self._submit(IngestJob(id=self.new_id(), kind="folder", target=path, sync=sync))
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id) if self.leader and job_id in self._jobs else self._read(f"{job_id}.json")
+
+    def list(self) -> List[IngestJob]:
+        if self.leader:
+            self._scan()
+            jobs = list(self._jobs.values())
+        else:
+            jobs = [j for j in map(self._read, os.listdir(self.jobs_dir)) if j is not None]
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        if not self.leader:
+            job = self.get(job_id)
+            if not job or job.status not in ("queued", "running"):
+                return False
+            open(os.path.join(self.jobs_dir, f"{job_id}.cancel"), "w").close()
+            self.logger.info("ingest.job.cancel_requested", job_id=job_id)
+            return True
+        job = self._jobs.get(job_id)
+        if not job or job.status not in ("queued", "running"):
+            return False
+        if job.status == "queued":
+            self._finish(job, "cancelled")
+        else:
+            self._cancel[job_id].set()
+        self.logger.info("ingest.job.cancel", job_id=job_id)
+        return True
+
+    def _submit(self, job: IngestJob) -> IngestJob:
+        if not self.leader:
+            self._checkpoint(job)  # the leader's watcher queues it
+            self.logger.info("ingest.job.queued", job_id=job.id, kind=job.kind, target=job.target, leader=False)
+            return job
+        with self._lock:
+            self._jobs[job.id] = job
+            self._cancel[job.id] = threading.Event()
+        self._checkpoint(job)
+        self._queue.put(job.id)
+        self.logger.info("ingest.job.queued", job_id=job.id, kind=job.kind, target=job.target)
+        return job
+
+    def _read(self, name: str) -> Optional[IngestJob]:
+        if not name.endswith(".json"):
+            return None
+        try:
+            with open(os.path.join(self.jobs_dir, name), encoding="utf-8") as f:
+                return IngestJob(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning("ingest.job.load_failed", file=name, error=str(e))
+            return None
+
+    def _watch(self) -> None:
+        while not self._stopping:
+            sleep(POLL_SECONDS)
+            try:
+                self._scan()
+            except Exception as e:
+                self.logger.exception("ingest.job.scan_failed", error=str(e))
+
+    def _scan(self) -> None:
+        """Leader: queue jobs submitted by other workers and apply their cancel requests."""
+        names = sorted(os.listdir(self.jobs_dir))
+        for name in names:
+            if name.endswith(".json") and name[:-5] not in self._jobs:
+                job = self._read(name)
+                if job is not None and job.status == "queued":
+                    with self._lock:
+                        if job.id in self._jobs:
+                            continue
+                        self._jobs[job.id] = job
+                        self._cancel[job.id] = threading.Event()
+                    self._queue.put(job.id)
+        for name in names:
+            if name.endswith(".cancel"):
+                os.remove(os.path.join(self.jobs_dir, name))
+                self.cancel(name[:-7])
+
+    def _load(self) -> None:
+        for name in sorted(os.listdir(self.jobs_dir)):
+            job = self._read(name)
+            if job is None:
+                continue
+            self._jobs[job.id] = job
+            self._cancel[job.id] = threading.Event()
+            if job.status in ("queued", "running"):
+                job.status = "queued"
+                self._queue.put(job.id)
+                self.logger.info("ingest.job.resumed", job_id=job.id, completed_files=len(job.completed_files))
+
+    def _checkpoint(self, job: IngestJob) -> None:
+        # Called from the worker and from pipeline stage threads; one writer at a time on the tmp file.
+        path = os.path.join(self.jobs_dir, f"{job.id}.json")
+        tmp = path + ".tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(job), f)
+            os.replace(tmp, path)
+
+    def _finish(self, job: IngestJob, status: str, result: Optional[IngestResult] = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.finished = time()
+        job.error = error
+        if result is not None:
+            job.result = asdict(result)
+        self._checkpoint(job)
+        if job.kind == "pdf" and status in ("done", "failed", "cancelled") and os.path.exists(job.target):
+            os.remove(job.target)
+        self.logger.info("ingest.job.finished", job_id=job.id, status=status, chunks=job.chunks_done)
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None or self._stopping:
+                return
+            job = self._jobs.get(job_id)
+            if not job or job.status != "queued":
+                continue
+            job.status = "running"
+            job.started = job.started or time()
+            self._checkpoint(job)
+            try:
+                result = self._run(job, self._cancel[job.id])
+            except Exception as e:
+                self.logger.exception("ingest.job.failed", job_id=job.id, error=str(e))
+                self._finish(job, "failed", error=str(e))
+                continue
+            if result.cancelled:
+                if self._stopping:
+                    # Interrupted by shutdown: stays "running" on disk and resumes on the next start.
+                    self._checkpoint(job)
+                    return
+                self._finish(job, "cancelled", result)
+            elif result.error and result.status >= 400:
+                self._finish(job, "failed", result, result.error)
+            else:
+                self._finish(job, "done", result)
+
+    def _run(self, job: IngestJob, cancel: threading.Event) -> IngestResult:
+        service = self.service_factory()
+        if job.kind == "pdf":
+            result = service.ingest_document(job.target, job.filename or os.path.basename(job.target), cancel)
+            job.files_done = 1 if not (result.cancelled or result.error and result.status >= 400) else 0
+            job.chunks_done = result.count or 0
+            return result
+
+        last_save = [0.0]
+        base_files = len(job.completed_files)
+        base_failed = len(job.failed_files)
+        base_chunks = job.chunks_done
+        base_pages = job.pages_done
+
+        def on_file_done(path: str, chunk_ids: List[str]) -> None:
+            with self._lock:
+                job.completed_files.append(path)
+            self._checkpoint(job)
+
+        def on_file_failed(path: str) -> None:
+            with self._lock:
+                job.failed_files.append(path)
+
+        def on_progress(stats: PipelineStats) -> None:
+            job.files_total = base_files + base_failed + stats.files_total
+            job.files_done = base_files + stats.files_done
+            job.files_failed = base_failed + stats.files_failed
+            job.pages_done = base_pages + stats.pages_done
+            job.chunks_done = base_chunks + stats.chunks_stored
+            if time() - last_save[0] > 1.0:
+                last_save[0] = time()
+                self._checkpoint(job)
+
+        return service.ingest_folder(
+            job.target,
+            sync=job.sync,
+            skip=set(job.completed_files) | set(job.failed_files),
+            on_file_done=on_file_done,
+            on_file_failed=on_file_failed,
+            on_progress=on_progress,
+            cancel=cancel,
+        )
@@ -0,0 +1,181 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its me my of on or "
+    "should so that the their them then there these they this to was what when where which who why will "
+    "with you your about any some tell take use used".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower().replace("'s", "")) if t not in STOPWORDS and len(t) > 1]
+
+
+@dataclass
+class LexicalHit:
+    id: str
+    score: float
+    text: str
+    meta: Dict[str, Any]
+
+
+@dataclass
+class LexicalResult:
+    hits: List[LexicalHit]
+    confident: bool  # a rare-term lookup the lexical side can answer alone
+
+
+def _where_matcher(where: Optional[dict]):
+    """Predicate for flat equality filters ({"source": "x"} or {"source": {"$eq": "x"}}); None if unsupported."""
+    if not where:
+        return lambda meta: True
+    wanted = {}
+    for key, cond in where.items():
+        if key.startswith("$"):
+            return None
+        if isinstance(cond, dict):
+            if set(cond) != {"$eq"}:
+                return None
+            cond = cond["$eq"]
+        wanted[key] = cond
+    return lambda meta: all(meta.get(k) == v for k, v in wanted.items())
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk documents, persisted in SQLite.
+
+    Kept in step with the vector collection by ChromaRepository (every
+    upsert/delete goes through both). Queries run locally, so exact-name
+    lookups need no embedding call.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.logger = get_logger(__name__)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, length INTEGER NOT NULL, text TEXT NOT NULL, meta TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS postings_id ON postings(id)")
+        self._db.commit()
+
+    def add(self, ids: Sequence[str], documents: Sequence[str], metadatas: Optional[Sequence[dict]] = None) -> None:
+        metadatas = metadatas or [{}] * len(ids)
+        with self._lock:
+            self._remove(ids)
+            for cid, text, meta in zip(ids, documents, metadatas):
+                counts = Counter(tokenize(text or ""))
+                self._db.execute(
+                    "INSERT INTO docs (id, length, text, meta) VALUES (?, ?, ?, ?)",
+                    (cid, sum(counts.values()), text or "", json.dumps(meta or {}, ensure_ascii=False)),
+                )
+                self._db.executemany(
+                    "INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)",
+                    [(term, cid, tf) for term, tf in counts.items()],
+                )
+            self._db.commit()
+
+    def remove(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._remove(ids)
+            self._db.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query: str, k: int, where: Optional[dict] = None) -> Optional[LexicalResult]:
+        """Top-k BM25 hits, or None when `where` uses operators this index cannot evaluate."""
+        matches = _where_matcher(where)
+        if matches is None:
+            return None
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return LexicalResult([], False)
+        marks = ",".join("?" * len(terms))
+        with self._lock:
+            n_docs, avg_len = self._db.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            if not n_docs:
+                return LexicalResult([], False)
+            df = dict(self._db.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({marks}) GROUP BY term", terms
+            ).fetchall())
+            rows = self._db.execute(
+                f"SELECT p.term, p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id WHERE p.term IN ({marks})",
+                terms,
+            ).fetchall()
+
+        idf = {t: math.log(1 + (n_docs - n + 0.5) / (n + 0.5)) for t, n in df.items()}
+        scores: Dict[str, float] = {}
+        found: Dict[str, set] = {}
+        for term, cid, tf, length in rows:
+            norm = tf + self.k1 * (1 - self.b + self.b * length / (avg_len or 1))
+            scores[cid] = scores.get(cid, 0.0) + idf[term] * tf * (self.k1 + 1) / norm
+            found.setdefault(cid, set()).add(term)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        hits: List[LexicalHit] = []
+        for batch_start in range(0, len(ranked), 200):
+            if len(hits) >= k:
+                break
+            batch = ranked[batch_start:batch_start + 200]
+            with self._lock:
+                docs = {
+                    r[0]: (r[1], json.loads(r[2]))
+                    for r in self._db.execute(
+                        f"SELECT id, text, meta FROM docs WHERE id IN ({','.join('?' * len(batch))})", batch
+                    )
+                }
+            for cid in batch:
+                if cid in docs and matches(docs[cid][1]):
+                    hits.append(LexicalHit(cid, scores[cid], *docs[cid]))
+                    if len(hits) >= k:
+                        break
+
+        # Confident: a short query naming rare terms, and the best hit contains all of them.
+        rare_cutoff = max(1.0, n_docs * settings.LEXICAL_RARE_DF)
+        rare = {t for t, n in df.items() if n <= rare_cutoff}
+        confident = bool(
+            rare and hits and len(terms) <= settings.LEXICAL_MAX_QUERY_TERMS and rare <= found[hits[0].id]
+        )
+        if confident:
+            hits = [h for h in hits if rare <= found[h.id]]
+        return LexicalResult(hits, confident)
+
+    def rebuild(self, batches: Iterable[tuple]) -> int:
+        """Index every (ids, documents, metadatas) batch, e.g. from ChromaRepository.iter_documents()."""
+        total = 0
+        for ids, documents, metadatas in batches:
+            self.add(ids, documents, metadatas)
+            total += len(ids)
+        self.logger.info("lexical.rebuilt", documents=total)
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _remove(self, ids: Sequence[str]) -> None:
+        rows = [(i,) for i in ids]
+        self._db.executemany("DELETE FROM postings WHERE id = ?", rows)
+        self._db.executemany("DELETE FROM docs WHERE id = ?", rows)
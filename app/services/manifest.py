@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.core.logging import get_logger
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    chunk_ids: List[str]
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    """Persisted record of ingested files: (path, size, mtime, sha256) → chunk ids.
+
+    Lets folder sync skip files that have not changed and find the chunks
+    that belong to files that were removed or replaced.
+    """
+
+    def __init__(self, path: str):
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+            "sha256 TEXT NOT NULL, chunk_ids TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, size, mtime, sha256, chunk_ids FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def under(self, folder: str) -> Dict[str, ManifestEntry]:
+        prefix = os.path.join(os.path.abspath(folder), "")
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, size, mtime, sha256, chunk_ids FROM files WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+        return {r[0]: self._entry(r) for r in rows}
+
+    def put(self, entry: ManifestEntry) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, sha256, chunk_ids) VALUES (?, ?, ?, ?, ?)",
+                (entry.path, entry.size, entry.mtime, entry.sha256, json.dumps(entry.chunk_ids)),
+            )
+            self._db.commit()
+
+    def touch(self, path: str, size: int, mtime: float) -> None:
+        with self._lock:
+            self._db.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?", (size, mtime, path))
+            self._db.commit()
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._db.commit()
+
+    def referenced_ids(self, exclude: str = "") -> set[str]:
+        """Chunk ids owned by any file other than `exclude` (ids can be shared between same-named files)."""
+        with self._lock:
+            rows = self._db.execute("SELECT chunk_ids FROM files WHERE path != ?", (exclude,)).fetchall()
+        return {i for (ids,) in rows for i in json.loads(ids)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _entry(row) -> ManifestEntry:
+        return ManifestEntry(row[0], row[1], row[2], row[3], json.loads(row[4]))
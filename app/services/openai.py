@@ -1,22 +1,74 @@
-from openai import OpenAI
+import asyncio
+from typing import Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from app.core.metrics import record_usage, timed
 from app.core.settings import settings
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+
+
+def _pool_options() -> dict:
+    """Keep-alive pool and timeouts shared by the sync and async HTTP clients."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+    }
+
+
+def _dimensions(dimensions: Optional[int]) -> dict:
+    # Only sent when set: older embedding models reject the parameter.
+    return {"dimensions": dimensions} if dimensions else {}
 
 
 class OpenAIService:
-    def __init__(self, api_key: str = ""):
+    def __init__(self, api_key: str = "", cache: Optional[EmbeddingCache] = None):
         self.api_key = api_key or settings.OPENAI_API_KEY
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            http_client=DefaultHttpxClient(**_pool_options()),
+        )
+        self.cache = cache
 
-    def embed(self, texts, model=None):
+    def warmup(self):
+        """Open a pooled connection (DNS + TLS) before the first real request needs it."""
+        self.client.models.list()
+
+    def close(self):
+        self.client.close()
+
+    def embed(self, texts, model=None, dimensions: Optional[int] = None):
+        """Embed `texts`; `dimensions` shortens text-embedding-3 vectors (None = the model's full size)."""
         model = model or settings.OPENAI_EMBED_MODEL
-        response = self.client.embeddings.create(model=model, input=texts)
+        if self.cache is None:
+            return self._embed(texts, model, dimensions)
+        keys, found, missing = self.cache.lookup(texts, model, dimensions)
+        if missing:
+            fresh = dict(zip(missing, self._embed(list(missing.values()), model, dimensions)))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def _embed(self, texts, model, dimensions=None):
+        with timed("openai.embed", model):
+            response = self.client.embeddings.create(model=model, input=texts, **_dimensions(dimensions))
+        record_usage(response.usage, model)
         return [d.embedding for d in response.data]
 
     def chat(self, messages, model=None, **kwargs):
         model = model or settings.OPENAI_CHAT_MODEL
-        response = self.client.chat.completions.create(
-            model=model, messages=messages, **kwargs
-        )
+        with timed("openai.chat", model):
+            response = self.client.chat.completions.create(
+                model=model, messages=messages, **kwargs
+            )
+        record_usage(response.usage, model)
         return response.choices[0].message.content
 
     def response(
@@ -24,14 +76,113 @@ class OpenAIService:
     ):
         model = model or settings.OPENAI_CHAT_MODEL
         response = None
-        if schema:
-            response = self.client.responses.parse(
-                model=model, input=input, text_format=schema, **kwargs
-            )
-        else:
-            response = self.client.responses.create(
-                model=model, input=input, **kwargs
-            )
+        with timed("openai.response", model):
+            if schema:
+                response = self.client.responses.parse(
+                    model=model, input=input, text_format=schema, **kwargs
+                )
+            else:
+                response = self.client.responses.create(
+                    model=model, input=input, **kwargs
+                )
+        record_usage(response.usage, model)
         return response.output_text
 
     # Add more OpenAI API wrappers as needed
+
+
+class AsyncOpenAIService:
+    """Same surface as OpenAIService, but awaitable so routes never block the event loop."""
+
+    def __init__(self, api_key: str = "", cache: Optional[EmbeddingCache] = None):
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(**_pool_options()),
+        )
+        self.cache = cache
+        # Sits behind the cache: only misses are coalesced into shared API calls.
+        self.batcher = EmbeddingBatcher(self._create_embeddings) if settings.EMBED_BATCH_ENABLED else None
+
+    async def warmup(self):
+        await self.client.models.list()
+
+    async def close(self):
+        await self.client.close()
+
+    async def embed(self, texts, model=None, dimensions: Optional[int] = None):
+        model = model or settings.OPENAI_EMBED_MODEL
+        if self.cache is None:
+            return await self._embed(texts, model, dimensions)
+        keys, found, missing = await asyncio.to_thread(self.cache.lookup, texts, model, dimensions)
+        if missing:
+            fresh = dict(zip(missing, await self._embed(list(missing.values()), model, dimensions)))
+            await asyncio.to_thread(self.cache.put_many, fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    async def _embed(self, texts, model, dimensions=None):
+        if self.batcher is not None:
+            return await self.batcher.embed(texts, model, dimensions)
+        return await self._create_embeddings(texts, model, dimensions)
+
+    async def _create_embeddings(self, texts, model, dimensions=None):
+        with timed("openai.embed", model):
+            response = await self.client.embeddings.create(model=model, input=texts, **_dimensions(dimensions))
+        record_usage(response.usage, model)
+        return [d.embedding for d in response.data]
+
+    async def chat(self, messages, model=None, **kwargs):
+        model = model or settings.OPENAI_CHAT_MODEL
+        with timed("openai.chat", model):
+            response = await self.client.chat.completions.create(
+                model=model, messages=messages, **kwargs
+            )
+        record_usage(response.usage, model)
+        return response.choices[0].message.content
+
+    async def response(
+        self, input, model=None, schema=None, **kwargs
+    ):
+        model = model or settings.OPENAI_CHAT_MODEL
+        response = None
+        with timed("openai.response", model):
+            if schema:
+                response = await self.client.responses.parse(
+                    model=model, input=input, text_format=schema, **kwargs
+                )
+            else:
+                response = await self.client.responses.create(
+                    model=model, input=input, **kwargs
+                )
+        record_usage(response.usage, model)
+        return response.output_text
+
+    async def chat_stream(self, messages, model=None, **kwargs):
+        """Yield content deltas from a streamed chat completion as they arrive."""
+        model = model or settings.OPENAI_CHAT_MODEL
+        with timed("openai.chat_stream", model):
+            stream = await self.client.chat.completions.create(
+                model=model, messages=messages, stream=True,
+                stream_options={"include_usage": True}, **kwargs
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    record_usage(chunk.usage, model)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def response_stream(self, input, model=None, **kwargs):
+        """Yield output text deltas from a streamed Responses API call."""
+        model = model or settings.OPENAI_CHAT_MODEL
+        with timed("openai.response_stream", model):
+            stream = await self.client.responses.create(
+                model=model, input=input, stream=True, **kwargs
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    record_usage(event.response.usage, model)
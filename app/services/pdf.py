@@ -0,0 +1,73 @@
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple, Union
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.core.utils import _chunk_text, _chunk_tokens
+
+# Kept free of OpenAI/Chroma imports: the ingest pipeline runs these functions in worker processes.
+# pypdf is imported on first use, so it stays out of server startup.
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+logger = get_logger(__name__)
+
+
+@contextmanager
+def _open_reader(pdf: Union[bytes, str]) -> Iterator["PdfReader"]:
+    from pypdf import PdfReader
+    if isinstance(pdf, bytes):
+        yield PdfReader(BytesIO(pdf))
+        return
+    # pypdf copies a path's whole file into memory; given an open handle it seeks and reads
+    # only the objects each page needs, so the document stays on disk.
+    with open(pdf, "rb") as fh:
+        yield PdfReader(fh)
+
+
+def pdf_to_chunks(pdf: Union[bytes, str], filename: str) -> List[Dict[str, Any]]:
+    """Extract and chunk every page of a PDF given as raw bytes or a file path."""
+    with _open_reader(pdf) as reader:
+        return list(_iter_reader_chunks(reader, filename))
+
+
+def iter_chunks(pdf: Union[bytes, str], filename: str) -> Iterator[Dict[str, Any]]:
+    """Lazily yield chunks page by page, so only the current page's text is held.
+
+    A path stays open until the generator is exhausted or closed.
+    """
+    with _open_reader(pdf) as reader:
+        yield from _iter_reader_chunks(reader, filename)
+
+
+def iter_page_texts(reader: "PdfReader", filename: str) -> Iterator[Tuple[int, str]]:
+    for p, page in enumerate(reader.pages, start=1):
+        try:
+            txt = page.extract_text() or ""
+        except Exception as e:
+            logger.warning("pdf.extract.error", filename=filename, page=p, error=str(e))
+            txt = ""
+        if txt.strip():
+            yield p, txt
+
+
+def _iter_reader_chunks(reader: "PdfReader", filename: str) -> Iterator[Dict[str, Any]]:
+    if settings.CHUNKER == "tokens":
+        yield from _chunk_tokens(iter_page_texts(reader, filename), {"source": filename})
+        return
+    for p, txt in iter_page_texts(reader, filename):
+        yield from _chunk_text(txt, {"source": filename, "page": p})
+
+
+def extract_file(path: str, filename: str) -> Dict[str, Any]:
+    """Process-pool entry point: chunks, the page count for progress reporting and the time taken.
+
+    Metrics recorded in a worker process would be lost, so the parent observes `seconds`.
+    """
+    t0 = time.perf_counter()
+    with _open_reader(path) as reader:
+        chunks = list(_iter_reader_chunks(reader, filename))
+        pages = len(reader.pages)
+    return {"chunks": chunks, "pages": pages, "seconds": time.perf_counter() - t0}
@@ -2,19 +2,47 @@ from app.models.dialog_models import DialogAction, SessionState
 from app.prompts.planner import PLANNER_SYSTEM, PLANNER_FEWSHOT
 from pydantic import ValidationError
 
-from app.services.openai import OpenAIService
+from app.core.logging import get_logger
+from app.services.compactor import ConversationCompactor
+from app.services.fast_planner import FastPlanner
+from app.services.openai import AsyncOpenAIService
 
 class Planner:
-    def __init__(self, oa: OpenAIService, model: str):
+    def __init__(
+        self,
+        oa: AsyncOpenAIService,
+        model: str,
+        compactor: ConversationCompactor | None = None,
+        fast: FastPlanner | None = None,
+    ):
+        self.logger = get_logger(__name__)
         self.openai = oa
         self.model = model
+        self.compactor = compactor or ConversationCompactor(oa)
+        self.fast = fast
 
-    def plan(self, state: SessionState, user_msg: str) -> DialogAction:
+    async def plan(self, state: SessionState, user_msg: str, session_id: str | None = None) -> DialogAction:
+        if self.fast is not None:
+            action = self.fast.plan(state, user_msg)
+            if action is not None:
+                return action
+        history = self.compactor.compact(state, session_id)
+        self.logger.info(
+            "planner.compaction",
+            tokens_full=history.tokens_full,
+            tokens_sent=history.tokens_sent,
+            tokens_saved=history.tokens_saved,
+            turns_sent=history.turns_sent,
+            turns_total=len(state.turns),
+        )
         msgs = [{"role":"system","content":PLANNER_SYSTEM}] + PLANNER_FEWSHOT + [
-            {"role":"user","content":f"Session so far: {state.model_dump_json()}"},
+            {"role":"user","content":f"Session so far: {history.payload}"},
             {"role":"user","content":user_msg},
         ]
-        response = self.openai.response(
+        hint = self.fast.safety_hint(user_msg) if self.fast is not None else None
+        if hint:
+            msgs.append({"role":"system","content":hint})
+        response = await self.openai.response(
             model=self.model,
             schema=DialogAction,
             input=msgs,
@@ -0,0 +1,91 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Awaitable, List, Optional
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+
+
+@dataclass
+class _Prefetch:
+    key: str
+    version: int
+    task: "asyncio.Task[List[dict]]"
+    started: float
+
+
+class Prefetcher:
+    """Speculative retrieval per session, started before the user confirms.
+
+    `start` launches retrieval for a slot key in the background; `take`
+    returns its contexts on the recommend turn if the slots and the
+    collection version are unchanged, otherwise None so the caller
+    retrieves as usual. Held in process memory next to the session id.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.logger = get_logger(__name__)
+        self.max_entries = max_entries or settings.PREFETCH_MAX_SESSIONS
+        self.ttl_seconds = ttl_seconds or settings.PREFETCH_TTL_SECONDS
+        self._entries: "OrderedDict[str, _Prefetch]" = OrderedDict()  # sid -> prefetch; oldest first
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+
+    def start(self, sid: str, key: str, version: int, retrieval: Awaitable[List[dict]]) -> bool:
+        current = self._entries.get(sid)
+        if current and current.key == key and current.version == version and not self._failed(current):
+            retrieval.close()  # already in flight or done for these slots
+            return False
+        self._drop(sid)
+        self._entries[sid] = _Prefetch(key, version, asyncio.ensure_future(retrieval), monotonic())
+        self.started += 1
+        self._evict()
+        self.logger.info("prefetch.started", session_id=sid, key=key)
+        return True
+
+    async def take(self, sid: str, key: Optional[str], version: int) -> Optional[List[dict]]:
+        entry = self._entries.pop(sid, None)
+        if entry is None:
+            return None
+        if entry.key != key or entry.version != version or monotonic() - entry.started > self.ttl_seconds:
+            entry.task.cancel()
+            self.discarded += 1
+            return None
+        ready = entry.task.done()
+        try:
+            contexts = await entry.task
+        except Exception as e:
+            self.logger.warning("prefetch.failed", session_id=sid, error=str(e))
+            self.discarded += 1
+            return None
+        self.used += 1
+        self.logger.info("prefetch.used", session_id=sid, key=key, ready=ready)
+        return contexts
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._entries), "started": self.started, "used": self.used, "discarded": self.discarded}
+
+    def close(self) -> None:
+        for sid in list(self._entries):
+            self._drop(sid)
+
+    @staticmethod
+    def _failed(entry: _Prefetch) -> bool:
+        return entry.task.done() and (entry.task.cancelled() or entry.task.exception() is not None)
+
+    def _drop(self, sid: str) -> None:
+        entry = self._entries.pop(sid, None)
+        if entry is not None:
+            entry.task.cancel()
+
+    def _evict(self) -> None:
+        now = monotonic()
+        while self._entries:
+            sid, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - entry.started <= self.ttl_seconds:
+                break
+            self._drop(sid)
+            self.discarded += 1
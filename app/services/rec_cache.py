@@ -0,0 +1,143 @@
+import re
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.settings import settings
+from app.models.dialog_models import SessionState
+
+_WORD_RE = re.compile(r"[a-z]{3,}")
+_GOAL_STOPWORDS = {
+    "and", "the", "for", "with", "more", "feel", "feeling", "want", "some", "get", "bit",
+    "less", "about", "into", "able", "just", "like", "would", "help", "need", "again",
+}
+
+
+def goal_bucket(goal: Optional[str]) -> str:
+    """Coarse goal key: sorted distinct content words, so "calm & confidence" == "confidence and calm"."""
+    words = {w for w in _WORD_RE.findall((goal or "").lower()) if w not in _GOAL_STOPWORDS}
+    return " ".join(sorted(words))
+
+
+def slot_key(state: SessionState) -> Optional[str]:
+    """Normalized intake outcome, or None when there are no feelings to key on."""
+    feelings = sorted({f.strip().lower() for f in state.feelings if f.strip()})
+    if not feelings:
+        return None
+    return f"{','.join(feelings)}|{state.duration or ''}|{goal_bucket(state.goal)}"
+
+
+def slot_text(state: SessionState) -> str:
+    """Readable slot summary embedded for similarity matching."""
+    return (
+        f"feelings: {', '.join(sorted({f.strip().lower() for f in state.feelings}))}; "
+        f"duration: {state.duration or 'unknown'}; goal: {goal_bucket(state.goal) or 'unspecified'}"
+    )
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+class RecommendationCache:
+    """In-process cache of generated recommendations keyed on normalized session slots.
+
+    Entries expire after `ttl_seconds` and are dropped as soon as the
+    collection version they were built against changes (any upsert or
+    delete). With `similarity` > 0, a miss on the exact key falls back to the
+    closest cached slot embedding with the same duration above that cosine;
+    slot embeddings are kept normalized in one matrix, so that is a single
+    matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        similarity: Optional[float] = None,
+    ):
+        self.max_entries = max_entries or settings.REC_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.REC_CACHE_TTL_SECONDS
+        self.similarity = settings.REC_CACHE_SIMILARITY if similarity is None else similarity
+        # key -> (text, created, version, duration, normalized slot embedding or None); LRU first
+        self._entries: "OrderedDict[str, Tuple[str, float, int, str, Optional[np.ndarray]]]" = OrderedDict()
+        # Stacked slot embeddings and their keys, rebuilt lazily after a put.
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str, version: int) -> Optional[str]:
+        with self._lock:
+            entry = self._live(key, version)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def has(self, key: str, version: int) -> bool:
+        """Membership check that does not count as a lookup."""
+        with self._lock:
+            return self._live(key, version) is not None
+
+    def get_similar(self, vector: List[float], duration: str, version: int) -> Optional[str]:
+        with self._lock:
+            if self._matrix is None:
+                self._matrix_keys = [k for k, e in self._entries.items() if e[4] is not None]
+                self._matrix = (np.stack([self._entries[k][4] for k in self._matrix_keys]) if self._matrix_keys
+                                else np.zeros((0, len(vector)), dtype=np.float32))
+            if not len(self._matrix_keys):
+                return None
+            scores = self._matrix @ _unit(vector)
+            above = np.flatnonzero(scores >= self.similarity)
+            for i in above[np.argsort(-scores[above])]:
+                key = self._matrix_keys[i]
+                entry = self._live(key, version)
+                if entry is None or entry[4] is None or entry[3] != duration:
+                    continue
+                self._entries.move_to_end(key)
+                self.similar_hits += 1
+                return entry[0]
+            return None
+
+    def miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, text: str, version: int, duration: str = "", vector: Optional[List[float]] = None) -> None:
+        with self._lock:
+            self._entries[key] = (text, monotonic(), version, duration, _unit(vector) if vector is not None else None)
+            self._entries.move_to_end(key)
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.similar_hits) / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+            }
+
+    def _live(self, key: str, version: int):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] != version or monotonic() - entry[1] > self.ttl_seconds:
+            del self._entries[key]
+            self.invalidations += entry[2] != version
+            return None
+        return entry
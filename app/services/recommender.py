@@ -1,23 +1,107 @@
+from typing import List, Optional, Tuple
+
 from app.prompts.recommender import RECOMMENDER_SYSTEM
+from app.core.logging import get_logger
 from app.core.settings import settings
-from app.services.openai import OpenAIService
+from app.models.dialog_models import SessionState
+from app.services.context_packer import pack_contexts
+from app.services.openai import AsyncOpenAIService
+from app.services.rec_cache import RecommendationCache, slot_key, slot_text
 from app.services.retriever import Retriever
 
 class Recommender:
-    def __init__(self, oa: OpenAIService, model: str, retriever: Retriever):
+    def __init__(self, oa: AsyncOpenAIService, model: str, retriever: Retriever, cache: RecommendationCache | None = None):
+        self.logger = get_logger(__name__)
         self.openai = oa
         self.model = model
         self.retriever = retriever
+        self.cache = cache
+
+    def cache_key(self, state: Optional[SessionState]) -> Optional[str]:
+        """Cache key for this session, or None when its recommendation is not shared.
+
+        Sessions with free-text context are never cached: their recommendation is
+        generated from the planner's summary, which carries that context, and must
+        not be served to another session.
+        """
+        if self.cache is None or state is None or (state.context or "").strip():
+            return None
+        return slot_key(state)
+
+    def summary_for(self, summary: str, state: Optional[SessionState]) -> str:
+        """What the recommendation is generated from: the slots alone when it is cached, else `summary`."""
+        if self.cache_key(state) is not None:
+            return slot_text(state)
+        return summary
+
+    async def contexts(self, summary: str, k: int = 12) -> List[dict]:
+        """Retrieved passages, diversified and packed into CONTEXT_TOKEN_BUDGET."""
+        hits, qvec = await self.retriever.search(summary, k=min(settings.TOP_K*2, k), fast_path=False)
+        return pack_contexts(hits, qvec)
 
-    def recommend(self, summary: str, k: int = 12) -> str:
-        ctx = self.retriever.retrieve(summary, k=min(settings.TOP_K*2, k))
+    async def _build_input(self, summary: str, k: int, ctx: Optional[List[dict]] = None):
+        if ctx is None:
+            ctx = await self.contexts(summary, k)
         ctx_text = "\n\n".join([
             f"{c['text']}\n(Source: {c['meta'].get('source','')}{', p.'+str(c['meta'].get('page')) if c['meta'].get('page') else ''})"
             for c in ctx
         ])
         prompt = f"User summary: {summary}\n\nContext passages:\n{ctx_text}\n\nNow produce recommendations as per the system format."
-        response = self.openai.response(
+        return [{"role":"system","content":RECOMMENDER_SYSTEM},{"role":"user","content":prompt}]
+
+    async def _lookup(self, state: Optional[SessionState]) -> Tuple[Optional[str], Optional[str], Optional[List[float]]]:
+        """Cached text for these slots, plus the key and slot embedding to store a fresh one under."""
+        key = self.cache_key(state)
+        if key is None:
+            return None, None, None
+        version = self.retriever.chroma_repo.version
+        text = self.cache.get(key, version)
+        if text is not None:
+            self.logger.info("recommend.cache.hit", key=key)
+            return text, key, None
+        vector = None
+        if self.cache.similarity > 0:
+            vector = (await self.openai.embed([slot_text(state)]))[0]
+            text = self.cache.get_similar(vector, state.duration or "", version)
+            if text is not None:
+                self.logger.info("recommend.cache.similar_hit", key=key)
+                return text, key, vector
+        self.cache.miss()
+        return None, key, vector
+
+    def _store(self, key: Optional[str], state: Optional[SessionState], text: str, version: int, vector) -> None:
+        if self.cache is not None and key and text:
+            self.cache.put(key, text, version, state.duration or "", vector)
+
+    async def recommend(
+        self, summary: str, k: int = 12, state: Optional[SessionState] = None, contexts: Optional[List[dict]] = None
+    ) -> str:
+        summary = self.summary_for(summary, state)
+        cached, key, vector = await self._lookup(state)
+        if cached is not None:
+            return cached
+        version = self.retriever.chroma_repo.version
+        response = await self.openai.response(
             model=self.model,
-            input=[{"role":"system","content":RECOMMENDER_SYSTEM},{"role":"user","content":prompt}],
+            input=await self._build_input(summary, k, contexts),
         )
+        self._store(key, state, response, version, vector)
         return response
+
+    async def recommend_stream(
+        self, summary: str, k: int = 12, state: Optional[SessionState] = None, contexts: Optional[List[dict]] = None
+    ):
+        summary = self.summary_for(summary, state)
+        cached, key, vector = await self._lookup(state)
+        if cached is not None:
+            yield cached
+            return
+        version = self.retriever.chroma_repo.version
+        parts = []
+        async for delta in self.openai.response_stream(
+            model=self.model,
+            input=await self._build_input(summary, k, contexts),
+        ):
+            parts.append(delta)
+            yield delta
+        self._store(key, state, "".join(parts), version, vector)
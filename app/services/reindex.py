@@ -0,0 +1,284 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import IO, Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.repositories.chroma import ChromaRepository
+from app.repositories.vector_store import VectorStore, create_vector_store
+
+MODES = ("auto", "truncate", "reembed")
+
+logger = get_logger(__name__)
+
+
+def _all_ids(store: VectorStore, batch_size: int) -> List[str]:
+    ids, offset = [], 0
+    while True:
+        page = store.get(include=[], limit=batch_size, offset=offset)["ids"]
+        if not len(page):
+            return ids
+        ids.extend(page)
+        offset += len(page)
+
+
+def _truncate(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    # text-embedding-3 vectors are trained so that a prefix, renormalized, is a valid shorter embedding.
+    short = np.asarray(vectors, dtype=np.float32)[:, :dimensions]
+    return short / np.maximum(np.linalg.norm(short, axis=1, keepdims=True), 1e-12)
+
+
+def sync_collection(
+    source: VectorStore,
+    target: VectorStore,
+    convert: Callable[[dict], Any],
+    batch_size: int,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, int]:
+    """Make `target` hold exactly `source`'s ids: copy the missing ones through `convert`, drop the stale ones.
+
+    Chunk ids are content hashes, so an id present in both holds the same
+    text and is skipped. Only missing rows are read in full, which makes a
+    second pass (the catch-up before switching) cheap, and an interrupted
+    copy resumable.
+    """
+    source_ids = _all_ids(source, batch_size)
+    target_ids = set(_all_ids(target, batch_size))
+    missing = [i for i in source_ids if i not in target_ids]
+    stale = list(target_ids.difference(source_ids))
+    for i in range(0, len(missing), batch_size):
+        res = source.get(ids=missing[i:i + batch_size], include=["embeddings", "documents", "metadatas"])
+        if len(res["ids"]):
+            target.upsert(ids=res["ids"], embeddings=convert(res), documents=res["documents"], metadatas=res["metadatas"])
+        if progress:
+            progress(min(i + batch_size, len(missing)), len(missing))
+    for i in range(0, len(stale), batch_size):
+        target.delete(ids=stale[i:i + batch_size])
+    return {"copied": len(missing), "deleted": len(stale)}
+
+
+def _neighbours(store: VectorStore, vector, k: int, own: str) -> set:
+    res = store.query(query_embeddings=[vector], n_results=k + 1, include=[])
+    return set([i for i in res["ids"][0] if i != own][:k])
+
+
+def measure_recall(source: VectorStore, target: VectorStore, sample: int, k: int, seed: int = 0) -> Dict[str, Any]:
+    """Recall@k of `target` against `source`, using stored chunks as queries.
+
+    Each sampled chunk's own vector queries its collection (the chunk itself
+    is left out of both result lists); recall is the share of the source's
+    top-k that the target also returns. Query times are per query, over the
+    whole sample.
+    """
+    ids = _all_ids(source, 1000)
+    if not ids:
+        return {"recall": None, "k": k, "queries": 0}
+    rng = np.random.default_rng(seed)
+    picked = [ids[i] for i in rng.choice(len(ids), size=min(sample, len(ids)), replace=False)]
+    src = source.get(ids=picked, include=["embeddings"])
+    dst = target.get(ids=picked, include=["embeddings"])
+    src_vectors = dict(zip(src["ids"], src["embeddings"]))
+    dst_vectors = dict(zip(dst["ids"], dst["embeddings"]))
+    picked = [i for i in picked if i in src_vectors and i in dst_vectors]
+    timings = {}
+    found = {}
+    for name, store, vectors in (("source", source, src_vectors), ("target", target, dst_vectors)):
+        t0 = time.perf_counter()
+        found[name] = [_neighbours(store, vectors[i], k, i) for i in picked]
+        timings[name] = round((time.perf_counter() - t0) * 1000 / max(len(picked), 1), 3)
+    recalls = [len(a & b) / len(a) for a, b in zip(found["source"], found["target"]) if a]
+    return {
+        "recall": round(float(np.mean(recalls)), 4) if recalls else None,
+        "k": k,
+        "queries": len(picked),
+        "query_ms": timings,
+        "bytes_per_vector": {"source": _vector_bytes(source, src_vectors), "target": _vector_bytes(target, dst_vectors)},
+    }
+
+
+def _vector_bytes(store: VectorStore, vectors: dict) -> Optional[int]:
+    if not vectors:
+        return None
+    dim = len(next(iter(vectors.values())))
+    return dim * (store.dtype.itemsize if hasattr(store, "dtype") else 4)
+
+
+def reindex(
+    repo: ChromaRepository,
+    dimensions: Optional[int] = None,
+    mode: str = "auto",
+    collection: Optional[str] = None,
+    openai_service=None,
+    chroma_service=None,
+    switch: bool = True,
+    min_recall: float = 0.0,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Build the collection at `dimensions` (None or 0: full size) next to the active one, then switch to it.
+
+    `truncate` slices and renormalizes the stored vectors (no API calls; only
+    for text-embedding-3 models, and only to a smaller size); `reembed` sends
+    every chunk to the embeddings API at the new size; `auto` truncates when
+    it can. The active collection keeps serving throughout. Before switching,
+    writes are paused in every worker (`repo.exclusive()`) for a catch-up
+    pass, so chunks ingested meanwhile are carried over, and the other
+    workers follow the switch on their next call; a batch embedded at the old size
+    but written after the switch is rejected by the new collection and fails
+    like any other write. The switch is skipped when recall@k falls below
+    `min_recall`. The old collection stays on disk; `python -m app.cli
+    activate NAME` switches back.
+    """
+    batch_size = batch_size or settings.REINDEX_BATCH
+    dimensions = dimensions or None
+    if mode not in MODES:
+        raise ValueError(f"Unknown reindex mode {mode!r}; expected one of {', '.join(MODES)}.")
+    source = repo.store
+    model = source.embedding.get("embed_model", settings.OPENAI_EMBED_MODEL)
+    sample = source.get(include=["embeddings"], limit=1)
+    source_dim = len(sample["embeddings"][0]) if len(sample["ids"]) else None
+    can_truncate = (
+        model.startswith("text-embedding-3") and dimensions is not None
+        and source_dim is not None and dimensions <= source_dim
+    )
+    if mode == "auto":
+        mode = "truncate" if can_truncate else "reembed"
+    if mode == "truncate" and not can_truncate:
+        raise ValueError(f"Cannot truncate {model} vectors of size {source_dim} to {dimensions}; use reembed.")
+    if mode == "reembed" and openai_service is None:
+        raise ValueError("Re-embedding needs an OpenAI service.")
+    if mode == "reembed" and model != settings.OPENAI_EMBED_MODEL:
+        logger.warning("reindex.model_change", source=model, target=settings.OPENAI_EMBED_MODEL)
+        model = settings.OPENAI_EMBED_MODEL
+
+    collection = collection or f"{settings.COLLECTION_NAME}_{dimensions or 'full'}"
+    if collection == source.collection_name:
+        raise ValueError(f"Collection {collection} is the one being served.")
+    embedding = {"embed_model": model, **({"embed_dimensions": dimensions} if dimensions else {})}
+    target = create_vector_store(chroma_service, collection=collection, embedding=embedding)
+    if target.embedding and target.embedding != embedding:
+        target.close()
+        raise ValueError(f"Collection {collection} already exists with {target.embedding}.")
+
+    def convert(res: dict):
+        if mode == "truncate":
+            return _truncate(res["embeddings"], dimensions)
+        return openai_service.embed(list(res["documents"]), model=model, dimensions=dimensions)
+
+    t0 = time.perf_counter()
+    logger.info("reindex.started", source=source.collection_name, target=collection, mode=mode, dimensions=dimensions)
+    result: Dict[str, Any] = {"source": source.collection_name, "target": collection, "mode": mode,
+                              "dimensions": dimensions, "switched": False}
+    try:
+        result.update(sync_collection(source, target, convert, batch_size, progress))
+        result.update(measure_recall(source, target, settings.REINDEX_RECALL_SAMPLE, settings.REINDEX_RECALL_K))
+        result["rows"] = target.count()
+        if result["recall"] is not None and result["recall"] < min_recall:
+            logger.warning("reindex.recall_too_low", recall=result["recall"], min_recall=min_recall)
+        elif switch:
+            with repo.exclusive():
+                result["caught_up"] = sync_collection(source, target, convert, batch_size)
+                repo.switch(target)
+            result["switched"] = True
+    finally:
+        if not result["switched"]:
+            target.close()
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    logger.info("reindex.finished", **{k: v for k, v in result.items() if k not in ("query_ms", "bytes_per_vector")})
+    return result
+
+
+def lock_reindex(state_dir: Optional[str] = None) -> IO:
+    """Take `<state_dir>/reindex.lock` (default CHROMA_DIR), held by whichever process is reindexing.
+
+    Returns the open lock file; closing it releases the lock. Raises
+    RuntimeError if another worker or CLI run holds it.
+    """
+    state_dir = state_dir or settings.CHROMA_DIR
+    os.makedirs(state_dir, exist_ok=True)
+    f = open(os.path.join(state_dir, "reindex.lock"), "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        raise RuntimeError("A reindex is already running.") from None
+    return f
+
+
+class ReindexRunner:
+    """Runs one reindex at a time in a background thread, for the API.
+
+    One at a time across workers and CLI runs too (`lock_reindex`). The
+    running reindex writes its state to `<state_dir>/reindex.json`, which
+    every worker serves.
+    """
+
+    def __init__(self, repo: ChromaRepository, openai_service=None, state_dir: Optional[str] = None):
+        self.repo = repo
+        self.openai_service = openai_service
+        self.state_dir = state_dir or settings.CHROMA_DIR
+        self._state_path = os.path.join(self.state_dir, "reindex.json")
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Dict[str, Any] = {}
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"status": "idle"}
+        if state.get("status") == "running" and not self.running():
+            return {**state, "status": "failed", "error": "Interrupted."}  # its process died
+        return state
+
+    def running(self) -> bool:
+        """Whether a reindex is running in any process."""
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        try:
+            lock_reindex(self.state_dir).close()
+        except RuntimeError:
+            return True
+        return False
+
+    def start(self, chroma_service=None, **params) -> Dict[str, Any]:
+        """Start `reindex(repo, **params)`; raises RuntimeError if one is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("A reindex is already running.")
+            held = lock_reindex(self.state_dir)
+            self._state = {"status": "running", "params": params, "done": 0, "total": None, "started_at": time.time()}
+            self._save()
+            self._thread = threading.Thread(target=self._run, args=(chroma_service, params, held),
+                                            name="reindex", daemon=True)
+            self._thread.start()
+            return self._state
+
+    def _save(self) -> None:
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self._state_path)
+
+    def _progress(self, done: int, total: int) -> None:
+        self._state.update(done=done, total=total)
+        self._save()
+
+    def _run(self, chroma_service, params: Dict[str, Any], held: IO) -> None:
+        try:
+            result = reindex(self.repo, openai_service=self.openai_service, chroma_service=chroma_service,
+                             progress=self._progress, **params)
+            self._state.update(status="finished", result=result)
+        except Exception as e:
+            logger.exception("reindex.failed", error=str(e))
+            self._state.update(status="failed", error=str(e))
+        finally:
+            self._save()
+            held.close()
@@ -1,19 +1,75 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
 from fastapi import HTTPException
 
-from app.services.openai import OpenAIService
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.services.openai import AsyncOpenAIService
 from app.repositories.chroma import ChromaRepository
 
 class Retriever:
-    def __init__(self, oa: OpenAIService, chroma_repo: ChromaRepository):
+    def __init__(self, oa: AsyncOpenAIService, chroma_repo: ChromaRepository):
+        self.logger = get_logger(__name__)
         self.openai = oa
         self.chroma_repo = chroma_repo
 
-    def retrieve(self, summary: str, k: int = 12):
-        qvecs = self.openai.embed([summary])
+    async def retrieve(self, summary: str, k: int = 12, where: Optional[dict] = None, fast_path: bool = True):
+        return (await self.search(summary, k, where, fast_path))[0]
+
+    async def search(
+        self, query: str, k: int = 12, where: Optional[dict] = None, fast_path: bool = True
+    ) -> Tuple[List[dict], Optional[List[float]]]:
+        """Hybrid retrieval: BM25 and vector results fused by reciprocal rank.
+
+        Returns `{"id", "text", "meta", "embedding"}` hits best first, plus the
+        query embedding (None when it was never computed). With `fast_path`, a
+        confident lexical hit (a short query naming rare terms) is returned
+        without embedding the query at all.
+        """
+        lexical = None
+        if settings.RETRIEVAL_MODE == "hybrid" and self.chroma_repo.lexical is not None:
+            lexical = await asyncio.to_thread(self.chroma_repo.lexical.search, query, k, where)
+            if lexical is not None and lexical.confident and fast_path and settings.LEXICAL_FAST_PATH:
+                self.logger.info("retrieve.lexical_only", hits=len(lexical.hits))
+                hits = [{"id": h.id, "text": h.text, "meta": h.meta} for h in lexical.hits]
+                return await self._with_embeddings(hits), None
+
+        dims = await asyncio.to_thread(getattr, self.chroma_repo, "embed_dimensions")
+        qvecs = await self.openai.embed([query], dimensions=dims)
         if not qvecs:
             raise HTTPException(status_code=500, detail="Failed to embed question.")
         qvec = qvecs[0]
-        res = self.chroma_repo.query(query_embeddings=[qvec], n_results=k)
+        res = await self.chroma_repo.aquery(
+            query_embeddings=[qvec], n_results=k, where=where or None,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        ids = res.get("ids", [[]])[0]
         docs = res.get("documents", [[]])[0]
         metas = res.get("metadatas", [[]])[0]
-        return [{"text": d, "meta": m} for d, m in zip(docs, metas)]
+        embeddings = res.get("embeddings")
+        embeddings = embeddings[0] if embeddings is not None else [None] * len(ids)
+        vector_hits = [
+            {"id": i, "text": d, "meta": m, "embedding": e} for i, d, m, e in zip(ids, docs, metas, embeddings)
+        ]
+        if not lexical or not lexical.hits:
+            return vector_hits, qvec
+
+        fused: Dict[str, float] = {}
+        found: Dict[str, dict] = {}
+        ranked_lists = (vector_hits, [{"id": h.id, "text": h.text, "meta": h.meta} for h in lexical.hits])
+        for ranked in ranked_lists:
+            for rank, hit in enumerate(ranked):
+                fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (settings.RRF_K + rank + 1)
+                found.setdefault(hit["id"], hit)
+        top = [found[cid] for cid in sorted(fused, key=fused.get, reverse=True)[:k]]
+        return await self._with_embeddings(top), qvec
+
+    async def _with_embeddings(self, hits: List[dict]) -> List[dict]:
+        missing = [h["id"] for h in hits if h.get("embedding") is None]
+        if missing:
+            stored = await asyncio.to_thread(self.chroma_repo.get_embeddings, missing)
+            for h in hits:
+                if h.get("embedding") is None:
+                    h["embedding"] = stored.get(h["id"])
+        return hits
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import zipfile
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.repositories.chroma import ChromaRepository
+
+FORMAT = "zenji-snapshot"
+VERSION = 1
+
+logger = get_logger(__name__)
+
+
+def export_snapshot(repo: ChromaRepository, path: str, part_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Write the whole collection to a columnar zip snapshot at `path`; returns its manifest.
+
+    Rows are read and written one part at a time, so memory stays at one
+    part. Each part is `part-NNNNN/vectors.npy` (float16, stored as-is)
+    plus deflated `ids.json`, `documents.json` and `metadatas.json`
+    columns; `manifest.json` is written last. Writes to `<path>.tmp` and
+    renames, so a failed export never leaves a truncated snapshot behind.
+    """
+    part_rows = part_rows or settings.SNAPSHOT_PART_ROWS
+    t0 = time.perf_counter()
+    parts, rows, dim = [], 0, None
+    tmp = path + ".tmp"
+    with zipfile.ZipFile(tmp, "w") as zf:
+        for res in repo.iter_records(part_rows):
+            vectors = np.asarray(res["embeddings"], dtype=np.float32)
+            dim = vectors.shape[1]
+            name = f"part-{len(parts):05d}"
+            with zf.open(f"{name}/vectors.npy", "w") as f:
+                np.lib.format.write_array(f, vectors.astype(np.float16), allow_pickle=False)
+            for column, values in (("ids", res["ids"]), ("documents", res["documents"]),
+                                   ("metadatas", [m or None for m in res["metadatas"]])):
+                zf.writestr(f"{name}/{column}.json", json.dumps(values, ensure_ascii=False),
+                            compress_type=zipfile.ZIP_DEFLATED)
+            parts.append({"name": name, "rows": len(res["ids"])})
+            rows += len(res["ids"])
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "collection": repo.store.collection_name,
+            "embed_model": repo.store.embedding.get("embed_model", settings.OPENAI_EMBED_MODEL),
+            "embed_dimensions": repo.embed_dimensions,
+            "dim": dim,
+            "dtype": "float16",
+            "rows": rows,
+            "parts": parts,
+            "created_at": time.time(),
+        }
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+    os.replace(tmp, path)
+    logger.info("snapshot.exported", path=path, rows=rows, parts=len(parts), bytes=os.path.getsize(path),
+                seconds=round(time.perf_counter() - t0, 3))
+    return manifest
+
+
+def read_manifest(zf: zipfile.ZipFile, force: bool = False, dimensions: Optional[int] = None) -> Dict[str, Any]:
+    try:
+        manifest = json.loads(zf.read("manifest.json"))
+    except KeyError:
+        raise ValueError("Not a snapshot: manifest.json is missing.") from None
+    if manifest.get("format") != FORMAT or manifest.get("version", 0) > VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')} v{manifest.get('version')}.")
+    if manifest["embed_model"] != settings.OPENAI_EMBED_MODEL and not force:
+        # Vectors from another model are not comparable with this server's query embeddings.
+        raise ValueError(
+            f"Snapshot was embedded with {manifest['embed_model']}, this server uses {settings.OPENAI_EMBED_MODEL}."
+        )
+    if manifest.get("embed_dimensions") != dimensions and not force:
+        raise ValueError(
+            f"Snapshot vectors have {manifest.get('embed_dimensions') or 'full'} dimensions, "
+            f"the collection uses {dimensions or 'full'}."
+        )
+    return manifest
+
+
+def import_snapshot(
+    repo: ChromaRepository,
+    path: str,
+    batch_size: Optional[int] = None,
+    force: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Bulk-load a snapshot into the collection, streaming one part at a time.
+
+    Upserts in `batch_size` rows, so existing chunks with the same ids are
+    replaced and loading twice is harmless. Documents go through the
+    repository, so the lexical index is filled as well. `progress(done,
+    total)` is called after every batch.
+    """
+    batch_size = batch_size or settings.SNAPSHOT_IMPORT_BATCH
+    t0 = time.perf_counter()
+    loaded = 0
+    try:
+        zf = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ValueError("Not a snapshot: the file is not a zip archive.") from None
+    with zf:
+        manifest = read_manifest(zf, force, repo.embed_dimensions)
+        for part in manifest["parts"]:
+            name = part["name"]
+            with zf.open(f"{name}/vectors.npy") as f:
+                vectors = np.lib.format.read_array(f, allow_pickle=False)
+            ids = json.loads(zf.read(f"{name}/ids.json"))
+            documents = json.loads(zf.read(f"{name}/documents.json"))
+            metadatas = json.loads(zf.read(f"{name}/metadatas.json"))
+            if not (len(vectors) == len(ids) == len(documents) == len(metadatas)):
+                raise ValueError(f"Snapshot part {name} is inconsistent.")
+            for i in range(0, len(ids), batch_size):
+                repo.upsert(
+                    ids=ids[i:i + batch_size],
+                    embeddings=vectors[i:i + batch_size].astype(np.float32),
+                    documents=documents[i:i + batch_size],
+                    metadatas=metadatas[i:i + batch_size],
+                )
+                loaded += len(ids[i:i + batch_size])
+                if progress:
+                    progress(loaded, manifest["rows"])
+    seconds = round(time.perf_counter() - t0, 3)
+    logger.info("snapshot.imported", path=path, rows=loaded, seconds=seconds)
+    return {"rows": loaded, "collection_count": repo.count(), "embed_model": manifest["embed_model"], "seconds": seconds}
@@ -0,0 +1,14 @@
+import os
+
+from app.core.settings import settings
+from app.sessions.sessions import SessionStore
+from app.sessions.sessions_kv import KVSessionStore, SQLiteKV
+from app.sessions.sessions_memory import MemoryStore
+
+
+def create_session_store() -> SessionStore:
+    """Pick the session backend from SESSION_BACKEND ("memory" | "sqlite")."""
+    if settings.SESSION_BACKEND == "sqlite":
+        path = settings.SESSION_DB_PATH or os.path.join(settings.CHROMA_DIR, "sessions.sqlite3")
+        return KVSessionStore(SQLiteKV(path))
+    return MemoryStore()
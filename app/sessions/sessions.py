@@ -8,3 +8,12 @@ class SessionStore:
         raise NotImplementedError
     def new(self) -> str:
         raise NotImplementedError
+    # Async request handlers go through these; stores doing I/O run it on a worker thread.
+    async def aget(self, sid: str) -> Optional[SessionState]:
+        return self.get(sid)
+    async def anew(self) -> str:
+        return self.new()
+    def stats(self) -> dict:
+        return {}
+    def close(self) -> None:
+        pass
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from time import sleep, time
+from typing import Dict, Optional, Tuple
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.models.dialog_models import SessionState
+from app.sessions.sessions import SessionStore
+
+Fields = Dict[str, str]  # SessionState field name -> JSON-encoded value
+
+
+class KVBackend:
+    """Shared key-value storage for sessions, addressed per field (a hash per session).
+
+    `rev` is an opaque revision token written with every change; readers
+    compare it to decide whether a locally cached copy is still current.
+    """
+    def load(self, sid: str, min_updated: float) -> Optional[Tuple[Fields, str]]:
+        raise NotImplementedError
+    def revision(self, sid: str, min_updated: float) -> Optional[str]:
+        raise NotImplementedError
+    def save(self, sid: str, fields: Fields, rev: str) -> None:
+        raise NotImplementedError
+    def purge(self, before: float) -> int:
+        raise NotImplementedError
+    def close(self) -> None:
+        pass
+
+
+class SQLiteKV(KVBackend):
+    """Local stand-in for an external KV service; shared by all workers on one machine."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, rev TEXT NOT NULL, updated REAL NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_fields ("
+            "sid TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (sid, field))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        self._db.commit()
+
+    def load(self, sid: str, min_updated: float) -> Optional[Tuple[Fields, str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rev FROM sessions WHERE sid = ? AND updated >= ?", (sid, min_updated)
+            ).fetchone()
+            if not row:
+                return None
+            fields = dict(self._db.execute("SELECT field, value FROM session_fields WHERE sid = ?", (sid,)).fetchall())
+        return fields, row[0]
+
+    def revision(self, sid: str, min_updated: float) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rev FROM sessions WHERE sid = ? AND updated >= ?", (sid, min_updated)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid: str, fields: Fields, rev: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (sid, rev, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET rev = excluded.rev, updated = excluded.updated",
+                (sid, rev, time()),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO session_fields (sid, field, value) VALUES (?, ?, ?)",
+                [(sid, k, v) for k, v in fields.items()],
+            )
+            self._db.commit()
+
+    def purge(self, before: float) -> int:
+        with self._lock:
+            sids = [r[0] for r in self._db.execute("SELECT sid FROM sessions WHERE updated < ?", (before,))]
+            self._db.executemany("DELETE FROM session_fields WHERE sid = ?", [(s,) for s in sids])
+            self._db.executemany("DELETE FROM sessions WHERE sid = ?", [(s,) for s in sids])
+            self._db.commit()
+        return len(sids)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class KVSessionStore(SessionStore):
+    """SessionStore on a shared KV backend, so any worker or machine can serve any session.
+
+    `set` diffs the state against the last known copy and queues only the
+    changed fields; a writer thread flushes them every SESSION_WRITE_INTERVAL
+    seconds. `get` serves from a small local LRU after checking the backend
+    revision (or straight from it while this process still has unflushed
+    writes), and only reloads fields when another process changed them.
+    """
+
+    def __init__(self, backend: KVBackend, cache_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.logger = get_logger(__name__)
+        self.backend = backend
+        self.cache_size = cache_size or settings.SESSION_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or settings.SESSION_TTL_SECONDS
+        self.max_turns = settings.SESSION_MAX_TURNS
+        self._cache: "OrderedDict[str, Tuple[Fields, str]]" = OrderedDict()  # sid -> (fields, rev)
+        self._pending: Dict[str, Tuple[Fields, str]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fields_written = 0
+        self._writer = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+        self._writer.start()
+
+    def get(self, sid: str) -> SessionState | None:
+        with self._lock:
+            cached = self._cache.get(sid)
+            pending = sid in self._pending
+        if cached and (pending or self.backend.revision(sid, time() - self.ttl_seconds) == cached[1]):
+            self.cache_hits += 1
+            with self._lock:
+                if sid in self._cache:
+                    self._cache.move_to_end(sid)
+            return self._decode(cached[0])
+        self.cache_misses += 1
+        loaded = self.backend.load(sid, time() - self.ttl_seconds)
+        with self._lock:
+            if sid in self._pending and sid in self._cache:
+                # A local `set` landed while loading; its unflushed fields are newer than the backend's.
+                return self._decode(self._cache[sid][0])
+        if not loaded:
+            return None
+        self._remember(sid, *loaded)
+        return self._decode(loaded[0])
+
+    async def aget(self, sid: str) -> SessionState | None:
+        return await asyncio.to_thread(self.get, sid)
+
+    async def anew(self) -> str:
+        return await asyncio.to_thread(self.new)
+
+    def set(self, sid: str, state: SessionState) -> None:
+        if len(state.turns) > self.max_turns:
+            state.turns = state.turns[-self.max_turns:]
+        fields = {k: json.dumps(v, ensure_ascii=False) for k, v in state.model_dump(mode="json").items()}
+        rev = uuid.uuid4().hex
+        with self._lock:
+            previous = self._cache.get(sid, ({}, ""))[0]
+            changed = {k: v for k, v in fields.items() if previous.get(k) != v}
+            queued = self._pending.get(sid, ({}, ""))[0]
+            self._pending[sid] = ({**queued, **changed}, rev)
+        self._remember(sid, fields, rev)
+        self._wake.set()
+
+    def new(self) -> str:
+        sid = str(uuid.uuid4())
+        fields = {k: json.dumps(v) for k, v in SessionState().model_dump(mode="json").items()}
+        rev = uuid.uuid4().hex
+        # Written synchronously: the next request may land on another worker.
+        self.backend.save(sid, fields, rev)
+        self._remember(sid, fields, rev)
+        return sid
+
+    def flush(self) -> None:
+        # Entries stay pending until their save commits, so `get` keeps trusting the local copy meanwhile.
+        with self._lock:
+            pending = dict(self._pending)
+        for sid, (fields, rev) in pending.items():
+            try:
+                self.backend.save(sid, fields, rev)
+                self.fields_written += len(fields)
+            except Exception as e:
+                self.logger.exception("session.write_failed", session_id=sid, error=str(e))
+                continue  # retried on the next flush
+            with self._lock:
+                # A `set` during the save queued a newer revision (including these fields); keep that one.
+                if self._pending.get(sid, (None, None))[1] == rev:
+                    del self._pending[sid]
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        self.backend.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "cached_sessions": len(self._cache),
+                "pending_writes": len(self._pending),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "fields_written": self.fields_written,
+            }
+
+    def _remember(self, sid: str, fields: Fields, rev: str) -> None:
+        with self._lock:
+            self._cache[sid] = (fields, rev)
+            self._cache.move_to_end(sid)
+            excess = len(self._cache) - self.cache_size
+            if excess > 0:
+                # Never drop a session whose latest fields are only held locally.
+                for old in [k for k in self._cache if k not in self._pending][:excess]:
+                    del self._cache[old]
+
+    def _write_loop(self) -> None:
+        last_purge = time()
+        while not self._closed:
+            self._wake.wait(timeout=60)
+            if self._closed:
+                return
+            # Coalesce a burst of set() calls into one write per session.
+            sleep(settings.SESSION_WRITE_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            if time() - last_purge > 600:
+                last_purge = time()
+                purged = self.backend.purge(time() - self.ttl_seconds)
+                if purged:
+                    self.logger.info("session.purged", sessions=purged)
+
+    @staticmethod
+    def _decode(fields: Fields) -> SessionState:
+        return SessionState.model_validate({k: json.loads(v) for k, v in fields.items()})
@@ -1,17 +1,94 @@
+import threading
 import uuid
+import zlib
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+
+from app.core.settings import settings
 from app.models.dialog_models import SessionState
 from app.sessions.sessions import SessionStore
 
 class MemoryStore(SessionStore):
-    _db: dict[str, SessionState] = {}
+    """In-process session store with idle-TTL and LRU eviction.
+
+    Each session is kept as zlib-compressed JSON, so its footprint is the
+    blob length and the store can enforce a hard byte cap alongside the
+    session-count cap. `get` hands out a fresh SessionState; callers persist
+    changes with `set`, as the dialog routes already do.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_turns: Optional[int] = None,
+    ):
+        self.max_sessions = max_sessions or settings.SESSION_MAX_SESSIONS
+        self.max_bytes = max_bytes or settings.SESSION_MAX_BYTES
+        self.ttl_seconds = ttl_seconds or settings.SESSION_TTL_SECONDS
+        self.max_turns = max_turns or settings.SESSION_MAX_TURNS
+        self._db: "OrderedDict[str, tuple[bytes, float]]" = OrderedDict()  # sid -> (blob, last access); LRU first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = {"ttl": 0, "lru": 0}
 
     def get(self, sid: str) -> SessionState | None:
-        return self._db.get(sid)
+        with self._lock:
+            entry = self._db.get(sid)
+            if entry is None:
+                return None
+            blob, seen = entry
+            now = monotonic()
+            if now - seen > self.ttl_seconds:
+                self._drop(sid, "ttl")
+                return None
+            self._db[sid] = (blob, now)
+            self._db.move_to_end(sid)
+        return SessionState.model_validate_json(zlib.decompress(blob))
 
     def set(self, sid: str, state: SessionState) -> None:
-        self._db[sid] = state
+        if len(state.turns) > self.max_turns:
+            state.turns = state.turns[-self.max_turns:]
+        blob = zlib.compress(state.model_dump_json().encode("utf-8"))
+        with self._lock:
+            old = self._db.get(sid)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._db[sid] = (blob, monotonic())
+            self._db.move_to_end(sid)
+            self._bytes += len(blob)
+            self._evict()
 
     def new(self) -> str:
         sid = str(uuid.uuid4())
-        self._db[sid] = SessionState()
+        self.set(sid, SessionState())
         return sid
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._db),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": dict(self.evictions),
+            }
+
+    def _evict(self) -> None:
+        # Oldest access is first, so expired sessions are always at the head.
+        now = monotonic()
+        while self._db:
+            sid, (_, seen) = next(iter(self._db.items()))
+            if now - seen <= self.ttl_seconds:
+                break
+            self._drop(sid, "ttl")
+        while len(self._db) > self.max_sessions or (self._bytes > self.max_bytes and len(self._db) > 1):
+            self._drop(next(iter(self._db)), "lru")
+
+    def _drop(self, sid: str, reason: str) -> None:
+        blob, _ = self._db.pop(sid)
+        self._bytes -= len(blob)
+        self.evictions[reason] += 1
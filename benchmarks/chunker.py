@@ -0,0 +1,75 @@
+"""Compare the legacy character chunker with the token-aware chunker.
+
+Usage:
+    python -m benchmarks.chunker /path/to/pdfs [--repeat 3]
+
+For each chunker this reports the number of chunks, the embedding tokens they
+cost, the mean chunk size and wall time. The legacy timing includes the extra
+tokenization pass that batching used to do per chunk; the token chunker
+returns counts with its chunks.
+"""
+import argparse
+import glob
+import os
+import statistics
+from time import perf_counter
+
+from pypdf import PdfReader
+
+from app.core.settings import settings
+from app.core.utils import _chunk_text, _chunk_tokens, _get_encoding, _get_token_count
+from app.services.pdf import iter_page_texts
+
+
+def _legacy(docs):
+    chunks = []
+    for name, pages in docs:
+        for p, txt in pages:
+            chunks.extend(_chunk_text(txt, {"source": name, "page": p}))
+    tokens = [_get_token_count(c["text"]) for c in chunks]
+    return chunks, tokens
+
+
+def _token_aware(docs):
+    chunks = []
+    for name, pages in docs:
+        chunks.extend(_chunk_tokens(pages, {"source": name}))
+    return chunks, [c["tokens"] for c in chunks]
+
+
+def _run(label, fn, docs, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        chunks, tokens = fn(docs)
+        times.append(perf_counter() - t0)
+    total = sum(tokens)
+    print(
+        f"{label:<12} chunks={len(chunks):>6}  embed_tokens={total:>9}  "
+        f"mean_tokens={total / max(len(chunks), 1):>7.1f}  "
+        f"seconds={statistics.median(times):.3f} (median of {repeat})"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("folder")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pdfs = sorted(glob.glob(os.path.join(args.folder, "**/*.pdf"), recursive=True))
+    docs = []
+    for path in pdfs:
+        name = os.path.basename(path)
+        docs.append((name, list(iter_page_texts(PdfReader(path), name))))
+    _get_encoding()  # load the BPE before timing
+    print(f"{len(pdfs)} PDFs, {sum(len(p) for _, p in docs)} pages with text")
+    print(f"legacy: CHUNK_CHARS={settings.CHUNK_CHARS} CHUNK_OVERLAP={settings.CHUNK_OVERLAP}")
+    print(f"tokens: CHUNK_TOKENS={settings.CHUNK_TOKENS} CHUNK_TOKEN_OVERLAP={settings.CHUNK_TOKEN_OVERLAP} "
+          f"CHUNK_SPAN_PAGES={settings.CHUNK_SPAN_PAGES}")
+    _run("chars", _legacy, docs, args.repeat)
+    _run("tokens", _token_aware, docs, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
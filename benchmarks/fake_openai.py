@@ -0,0 +1,223 @@
+"""Local stand-in for the OpenAI embeddings, chat and responses endpoints.
+
+Usage:
+    python -m benchmarks.fake_openai [--port 9100] [--embed-ms 40] [--ttft-ms 300] [--tps 80]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1 (any
+OPENAI_API_KEY works). Latencies are simulated with asyncio.sleep, so one
+process serves many concurrent requests:
+
+- embeddings: `--embed-ms` per call plus `--embed-ms-per-input` per text; vectors
+  are deterministic per text, so cache and dedup behaviour match production.
+- chat / responses: `--ttft-ms` before the first token, then `--tps` tokens per
+  second. Streams emit one delta per token; non-streamed calls wait for all of them.
+- structured output (the planner): a DialogAction that walks feelings → context →
+  duration → confirm → recommend as the conversation grows.
+
+`--jitter` adds up to that fraction of random extra latency to every call.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+ANSWER = (
+    "Suggested essences\n- Mimulus — for known fears and worry about specific things.\n"
+    "- Elm — for feeling overwhelmed by responsibility.\n- White Chestnut — for repetitive thoughts.\n"
+    "Blend idea: Mimulus, Elm and White Chestnut together.\n"
+    "Usage: four drops four times a day. This is not medical advice."
+)
+PLANNER_SCRIPT = [
+    {"stage": "ask_context", "next_question": "What seems to be behind it?", "feelings": ["anxious"],
+     "needed_slots": ["context", "duration"]},
+    {"stage": "ask_duration", "next_question": "How long has this been going on?", "context": "work deadlines",
+     "needed_slots": ["duration"]},
+    {"stage": "confirm", "next_question": "Shall I suggest a few essences?", "duration": "persistent",
+     "summary": "feelings: anxious; context: work deadlines; duration: persistent", "needed_slots": []},
+    {"stage": "recommend", "summary": "feelings: anxious; context: work deadlines; duration: persistent",
+     "needed_slots": []},
+]
+
+app = FastAPI(title="fake-openai")
+cfg = argparse.Namespace(embed_ms=40.0, embed_ms_per_input=0.5, ttft_ms=300.0, tps=80.0, jitter=0.2, dims=1536)
+counters: Dict[str, int] = {"embeddings": 0, "embedded_texts": 0, "chat": 0, "responses": 0}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _text_of(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for m in messages or []:
+        content = m.get("content", "")
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    return "\n".join(parts)
+
+
+async def _sleep(ms: float) -> None:
+    await asyncio.sleep(ms * (1 + random.random() * cfg.jitter) / 1000)
+
+
+def _vector(text: str, dims: int) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dims).astype(np.float32)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def _planner_reply(input_messages: Any) -> str:
+    """Scripted DialogAction: one stage further for every user turn in the session payload."""
+    turns = 0
+    for m in input_messages or []:
+        content = m.get("content", "") if isinstance(m, dict) else ""
+        if isinstance(content, str) and content.startswith("Session so far: "):
+            try:
+                session = json.loads(content[len("Session so far: "):])
+                turns = sum(1 for t in session.get("recent_turns", session.get("turns", [])) if t.get("role") == "user")
+            except ValueError:
+                pass
+    step = PLANNER_SCRIPT[min(max(turns - 1, 0), len(PLANNER_SCRIPT) - 1)]
+    return json.dumps({"safety": "ok", **step})
+
+
+def _answer_tokens() -> List[str]:
+    words = ANSWER.split(" ")
+    return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+
+def _usage(prompt: int, completion: int, responses_api: bool) -> Dict[str, Any]:
+    if responses_api:
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion,
+                "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}}
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def _sse(data: Dict[str, Any], event: str = "") -> str:
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "fake", "object": "model", "created": 0, "owned_by": "bench"}]}
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    counters["embeddings"] += 1
+    counters["embedded_texts"] += len(inputs)
+    await _sleep(cfg.embed_ms + cfg.embed_ms_per_input * len(inputs))
+    dims = body.get("dimensions") or cfg.dims
+    tokens = sum(_tokens(t) for t in inputs)
+    return {
+        "object": "list",
+        "model": body.get("model", "fake"),
+        "data": [{"object": "embedding", "index": i, "embedding": _vector(t, dims)} for i, t in enumerate(inputs)],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat(request: Request):
+    body = await request.json()
+    counters["chat"] += 1
+    prompt = _tokens(_text_of(body.get("messages")))
+    tokens = _answer_tokens()
+    cid, model, created = f"chatcmpl-{uuid.uuid4().hex}", body.get("model", "fake"), int(time.time())
+    if not body.get("stream"):
+        await _sleep(cfg.ttft_ms + 1000 * len(tokens) / cfg.tps)
+        return {
+            "id": cid, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": ANSWER}}],
+            "usage": _usage(prompt, len(tokens), False),
+        }
+
+    async def events():
+        await _sleep(cfg.ttft_ms)
+        base = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model}
+        for tok in tokens:
+            yield _sse({**base, "choices": [{"index": 0, "delta": {"content": tok}, "finish_reason": None}]})
+            await asyncio.sleep(1 / cfg.tps)
+        yield _sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield _sse({**base, "choices": [], "usage": _usage(prompt, len(tokens), False)})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def _response_object(rid: str, model: str, text: str, prompt: int, completion: int) -> Dict[str, Any]:
+    return {
+        "id": rid, "object": "response", "created_at": int(time.time()), "model": model, "status": "completed",
+        "output": [{
+            "type": "message", "id": f"msg_{rid}", "status": "completed", "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+        "usage": _usage(prompt, completion, True),
+    }
+
+
+@app.post("/v1/responses")
+async def responses(request: Request):
+    body = await request.json()
+    counters["responses"] += 1
+    rid, model = f"resp_{uuid.uuid4().hex}", body.get("model", "fake")
+    prompt = _tokens(_text_of(body.get("input")))
+    structured = ((body.get("text") or {}).get("format") or {}).get("type") == "json_schema"
+    text = _planner_reply(body.get("input")) if structured else ANSWER
+    completion = _tokens(text)
+    if not body.get("stream"):
+        await _sleep(cfg.ttft_ms + 1000 * completion / cfg.tps)
+        return _response_object(rid, model, text, prompt, completion)
+
+    async def events():
+        await _sleep(cfg.ttft_ms)
+        seq = 0
+        for tok in _answer_tokens():
+            seq += 1
+            yield _sse({"type": "response.output_text.delta", "delta": tok, "item_id": f"msg_{rid}",
+                        "output_index": 0, "content_index": 0, "logprobs": [], "sequence_number": seq},
+                       "response.output_text.delta")
+            await asyncio.sleep(1 / cfg.tps)
+        yield _sse({"type": "response.completed", "sequence_number": seq + 1,
+                    "response": _response_object(rid, model, text, prompt, completion)}, "response.completed")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--embed-ms", type=float, default=cfg.embed_ms)
+    ap.add_argument("--embed-ms-per-input", type=float, default=cfg.embed_ms_per_input)
+    ap.add_argument("--ttft-ms", type=float, default=cfg.ttft_ms, help="latency before the first generated token")
+    ap.add_argument("--tps", type=float, default=cfg.tps, help="generated tokens per second")
+    ap.add_argument("--jitter", type=float, default=cfg.jitter)
+    ap.add_argument("--dims", type=int, default=cfg.dims)
+    args = ap.parse_args()
+    for key in vars(cfg):
+        setattr(cfg, key, getattr(args, key))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Load-test a running Zenji server and report throughput, latency percentiles and stage breakdowns.
+
+Usage:
+    python -m benchmarks.load --url http://127.0.0.1:8000 chat   --users 20 --iterations 5
+    python -m benchmarks.load --url http://127.0.0.1:8000 ask    --concurrency 20 --requests 200 [--questions q.txt]
+    python -m benchmarks.load --url http://127.0.0.1:8000 replay log.jsonl --concurrency 20 [--speed 1.0]
+    python -m benchmarks.load --url http://127.0.0.1:8000 ingest doc.pdf [--requests 3]
+
+Run the server against benchmarks/fake_openai.py (OPENAI_BASE_URL) for
+repeatable numbers without API cost or variance.
+
+Replay logs are JSONL, one request per line:
+    {"method": "POST", "path": "/api/chat", "body": {...}, "session": "u1", "offset": 0.25}
+`session` names a dialog: its first use creates a real session and every
+body's "session_id" is rewritten to it. `offset` (seconds from start,
+optional) is honoured, scaled by --speed; without it requests go as fast as
+--concurrency allows. Any workload can write such a log with --record.
+
+Stage breakdowns come from the server's /metrics, scraped before and after.
+`--json` prints the report as JSON for CI comparisons.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+DIALOG = [
+    "I feel anxious and overwhelmed.",
+    "Mostly work deadlines piling up.",
+    "For a few weeks now.",
+    "yes",
+]
+QUESTIONS = [
+    "What is Mimulus for?",
+    "Which essence helps with feeling overwhelmed by responsibility?",
+    "What does Rescue Remedy contain?",
+    "How is White Chestnut used for repetitive thoughts?",
+    "Which essences are suggested for grief?",
+]
+
+
+class Recorder:
+    """Per-route latencies and errors, plus the optional replay log."""
+
+    def __init__(self, record_path: Optional[str] = None):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.record = open(record_path, "w", encoding="utf-8") if record_path else None
+
+    async def call(self, client: httpx.AsyncClient, method: str, path: str, label: str = "",
+                   session: str = "", **kwargs) -> Optional[httpx.Response]:
+        label = label or f"{method} {path}"
+        if self.record and "json" in kwargs:
+            entry = {"method": method, "path": path, "body": kwargs["json"],
+                     "offset": round(time.perf_counter() - self.started, 3)}
+            if session:
+                entry["session"] = session
+            self.record.write(json.dumps(entry) + "\n")
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, path, **kwargs)
+            if path.endswith("/stream"):
+                await resp.aread()  # time to the last event, not just the headers
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - t0)
+        if resp.status_code >= 400:
+            self.errors[label] += 1
+        return resp
+
+    def close(self):
+        if self.record:
+            self.record.close()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _stage_totals(metrics_text: str) -> Dict[tuple, List[float]]:
+    """(stage, route, model) -> [sum, count] of zenji_stage_seconds."""
+    out: Dict[tuple, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name != "zenji_stage_seconds":
+            continue
+        for sample in family.samples:
+            key = (sample.labels["stage"], sample.labels["route"], sample.labels["model"])
+            if sample.name.endswith("_sum"):
+                out[key][0] += sample.value
+            elif sample.name.endswith("_count"):
+                out[key][1] += sample.value
+    return out
+
+
+async def _scrape(client: httpx.AsyncClient) -> Dict[tuple, List[float]]:
+    try:
+        resp = await client.get("/metrics")
+        return _stage_totals(resp.text) if resp.status_code == 200 else {}
+    except httpx.HTTPError:
+        return {}
+
+
+# --- Workloads ---
+
+async def _chat_user(client: httpx.AsyncClient, rec: Recorder, user: int, iterations: int, stream: bool):
+    path = "/api/chat/stream" if stream else "/api/chat"
+    for it in range(iterations):
+        resp = await rec.call(client, "POST", "/api/session")
+        if resp is None or resp.status_code != 200:
+            continue
+        sid = resp.json()["session_id"]
+        for turn, message in enumerate(DIALOG):
+            await rec.call(client, "POST", path, f"POST {path} turn {turn + 1}", session=f"u{user}-{it}",
+                           json={"session_id": sid, "message": message}, headers={"X-Session-ID": sid})
+
+
+async def run_chat(client, rec, args):
+    await asyncio.gather(*(_chat_user(client, rec, u, args.iterations, args.stream) for u in range(args.users)))
+
+
+async def run_ask(client, rec, args):
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    path = "/api/ask/stream" if args.stream else "/api/ask"
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(questions[i % len(questions)])
+
+    async def worker():
+        while not queue.empty():
+            await rec.call(client, "POST", path, json={"question": queue.get_nowait()})
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run_replay(client, rec, args):
+    with open(args.log, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    sessions: Dict[str, asyncio.Future] = {}
+    locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+    sem = asyncio.Semaphore(args.concurrency)
+    t0 = time.perf_counter()
+
+    async def session_for(name: str) -> Optional[str]:
+        if name not in sessions:
+            sessions[name] = asyncio.get_running_loop().create_future()
+            resp = await rec.call(client, "POST", "/api/session")
+            sessions[name].set_result(resp.json()["session_id"] if resp is not None and resp.status_code == 200 else None)
+        return await sessions[name]
+
+    async def send(entry: Dict[str, Any]):
+        if "offset" in entry and args.speed > 0:
+            await asyncio.sleep(max(0.0, entry["offset"] / args.speed - (time.perf_counter() - t0)))
+        body = dict(entry.get("body") or {})
+        name = entry.get("session")
+        # Turns of one dialog stay in order; different dialogs run concurrently.
+        async with (locks[name] if name else asyncio.Semaphore(1)):
+            if name:
+                sid = await session_for(name)
+                if sid is None:
+                    return
+                body["session_id"] = sid
+            async with sem:
+                await rec.call(client, entry.get("method", "POST"), entry["path"], json=body)
+
+    await asyncio.gather(*(send(e) for e in entries))
+
+
+async def run_ingest(client, rec, args):
+    name = os.path.basename(args.pdf)
+    for _ in range(args.requests):
+        with open(args.pdf, "rb") as f:
+            resp = await rec.call(client, "POST", "/api/ingest/pdf", files={"file": (name, f, "application/pdf")})
+        if resp is None or resp.status_code != 202:
+            continue
+        job_id = resp.json()["job_id"]
+        t0 = time.perf_counter()
+        while True:
+            job = (await client.get(f"/api/ingest/jobs/{job_id}")).json()
+            if job["status"] not in ("queued", "running"):
+                break
+            await asyncio.sleep(0.2)
+        rec.latencies["ingest job (queued → finished)"].append(time.perf_counter() - t0)
+        if job["status"] != "done":
+            rec.errors["ingest job (queued → finished)"] += 1
+
+
+# --- Report ---
+
+def build_report(rec: Recorder, wall: float, before: Dict, after: Dict) -> Dict[str, Any]:
+    routes = {}
+    for label, values in sorted(rec.latencies.items()):
+        routes[label] = {
+            "count": len(values),
+            "errors": rec.errors.get(label, 0),
+            "rps": round(len(values) / wall, 2),
+            "p50_ms": round(_percentile(values, 50) * 1000, 1),
+            "p90_ms": round(_percentile(values, 90) * 1000, 1),
+            "p99_ms": round(_percentile(values, 99) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+            "mean_ms": round(statistics.fmean(values) * 1000, 1),
+        }
+    stages = []
+    for key, (total, count) in after.items():
+        prev_total, prev_count = before.get(key, (0.0, 0.0))
+        calls = count - prev_count
+        if calls > 0:
+            stage, route, model = key
+            stages.append({"stage": stage, "route": route, "model": model, "calls": int(calls),
+                           "mean_ms": round((total - prev_total) / calls * 1000, 1),
+                           "total_s": round(total - prev_total, 3)})
+    stages.sort(key=lambda s: -s["total_s"])
+    total_requests = sum(len(v) for v in rec.latencies.values())
+    return {"wall_seconds": round(wall, 2), "requests": total_requests,
+            "throughput_rps": round(total_requests / wall, 2), "routes": routes, "stages": stages}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['requests']} requests in {report['wall_seconds']}s  ({report['throughput_rps']} req/s)\n")
+    print(f"{'route':<40} {'n':>6} {'err':>5} {'rps':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for label, r in report["routes"].items():
+        print(f"{label[:40]:<40} {r['count']:>6} {r['errors']:>5} {r['rps']:>7} "
+              f"{r['p50_ms']:>8} {r['p90_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}")
+    if report["stages"]:
+        print(f"\n{'stage':<26} {'route':<22} {'model':<24} {'calls':>6} {'mean ms':>9} {'total s':>9}")
+        for s in report["stages"]:
+            print(f"{s['stage']:<26} {s['route'][:22]:<22} {s['model'][:24]:<24} {s['calls']:>6} "
+                  f"{s['mean_ms']:>9} {s['total_s']:>9}")
+
+
+async def amain(args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        rec = Recorder(args.record)
+        before = await _scrape(client)
+        t0 = time.perf_counter()
+        try:
+            await WORKLOADS[args.workload](client, rec, args)
+        finally:
+            rec.close()
+        wall = time.perf_counter() - t0
+        after = await _scrape(client)
+    return build_report(rec, wall, before, after)
+
+
+WORKLOADS = {"chat": run_chat, "ask": run_ask, "replay": run_replay, "ingest": run_ingest}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--record", help="also write the requests sent as a replay log")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    sub = ap.add_subparsers(dest="workload", required=True)
+
+    chat = sub.add_parser("chat", help="scripted multi-turn dialogs")
+    chat.add_argument("--users", type=int, default=10)
+    chat.add_argument("--iterations", type=int, default=3, help="dialogs per user")
+    chat.add_argument("--stream", action="store_true")
+
+    ask = sub.add_parser("ask", help="single-shot questions")
+    ask.add_argument("--concurrency", type=int, default=10)
+    ask.add_argument("--requests", type=int, default=100)
+    ask.add_argument("--questions", help="file with one question per line")
+    ask.add_argument("--stream", action="store_true")
+
+    replay = sub.add_parser("replay", help="replay a JSONL request log")
+    replay.add_argument("log")
+    replay.add_argument("--concurrency", type=int, default=10)
+    replay.add_argument("--speed", type=float, default=0.0, help="honour offsets at this speed-up; 0 = as fast as possible")
+
+    ingest = sub.add_parser("ingest", help="upload a PDF and wait for its job")
+    ingest.add_argument("pdf")
+    ingest.add_argument("--requests", type=int, default=1)
+
+    args = ap.parse_args()
+    report = asyncio.run(amain(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Measure cold start: process start → listening → first chat turn served → /api/ready.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--port 8021] [--json]
+    python -m benchmarks.startup --env STARTUP_MODE=background --env VECTOR_BACKEND=numpy
+
+Each run spawns a fresh `uvicorn app.main:app` from the current directory
+(override with --cmd, `{port}` is substituted), so OS page cache effects
+are included after the first run only. Point OPENAI_BASE_URL at
+benchmarks/fake_openai.py to keep API latency out of the numbers.
+
+Reported (median over runs, seconds from spawn):
+- listening: /api/health answers
+- first_chat: a new session's first /api/chat turn has been answered
+- ready: /api/ready returns 200
+- the server's own `startup.ready` step timings (vector_store, tokenizer, openai_warmup)
+- import time of `app.main` per top-level package, from `python -X importtime`
+"""
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def _wait(client: httpx.Client, path: str, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def _first_chat(client: httpx.Client) -> None:
+    sid = client.post("/api/session").json()["session_id"]
+    resp = client.post("/api/chat", json={"session_id": sid, "message": "I feel anxious and overwhelmed."},
+                       headers={"X-Session-ID": sid})
+    resp.raise_for_status()
+
+
+def run_once(cmd: List[str], env: Dict[str, str], port: int, timeout: float) -> Dict[str, Any]:
+    lines: List[str] = []
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    reader = threading.Thread(target=lambda: lines.extend(proc.stdout), daemon=True)
+    reader.start()
+    result: Dict[str, Any] = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = t0 + timeout
+            listening = _wait(client, "/api/health", deadline)
+            if listening is None:
+                raise RuntimeError("server did not start:\n" + "".join(lines[-20:]))
+            result["listening"] = listening - t0
+            _first_chat(client)
+            result["first_chat"] = time.perf_counter() - t0
+            ready = _wait(client, "/api/ready", deadline)
+            result["ready"] = ready - t0 if ready else None
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        reader.join(timeout=5)
+    for line in lines:
+        if "startup.ready" in line:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            result["steps"] = {k: event[k] for k in ("vector_store", "tokenizer", "openai_warmup", "total") if k in event}
+    return result
+
+
+def import_breakdown(env: Dict[str, str], top: int) -> Dict[str, Any]:
+    """Self time of every module imported by `import app.main`, summed per top-level package."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         env=env, capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError("import app.main failed:\n" + out.stderr[-2000:])
+    per_package: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1e6
+        if not name.startswith("  "):  # top-level import: its cumulative time counts once
+            total += int(cumulative_us) / 1e6
+    ranked = sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {"total": round(total, 3), "packages": {k: round(v, 3) for k, v in ranked}}
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def median(values):
+        values = [v for v in values if v is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    summary = {key: median(r.get(key) for r in runs) for key in ("listening", "first_chat", "ready")}
+    steps = {k for r in runs for k in r.get("steps", {})}
+    summary["steps"] = {k: median(r.get("steps", {}).get(k) for r in runs) for k in sorted(steps)}
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--port", type=int, default=8021)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--cmd", help="server command; default: uvicorn app.main:app on --port")
+    ap.add_argument("--env", action="append", default=[], help="KEY=VALUE for the server, repeatable")
+    ap.add_argument("--top", type=int, default=10, help="packages shown in the import breakdown")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args()
+
+    # JSON logs carry the step timings; the current directory must be importable for app.main.
+    env = {**os.environ, "ENV": "prod", "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+    env.update(kv.split("=", 1) for kv in args.env)
+    cmd = (shlex.split(args.cmd.format(port=args.port)) if args.cmd else
+           [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"])
+
+    runs = [run_once(cmd, env, args.port, args.timeout) for _ in range(args.runs)]
+    report = {"runs": runs, "median": summarize(runs), "imports": import_breakdown(env, args.top)}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    med = report["median"]
+    print(f"\n{'phase':<14} {'median s':>9}   ({args.runs} runs)")
+    for key in ("listening", "first_chat", "ready"):
+        print(f"{key:<14} {med[key] if med[key] is not None else '-':>9}")
+    if med["steps"]:
+        print(f"\n{'startup step':<14} {'median s':>9}   (concurrent; total is their wall time)")
+        for key, value in med["steps"].items():
+            print(f"{key:<14} {value:>9}")
+    print(f"\n{'import':<14} {'self s':>9}   (import app.main: {report['imports']['total']}s)")
+    for pkg, seconds in report["imports"]["packages"].items():
+        print(f"{pkg:<14} {seconds:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import { ArrowUp } from "lucide-react";
-import { chatStep } from "../lib/api";
+import { chatStream } from "../lib/api";
 import { useEffect, useState, useCallback, useRef } from "react";
 import { Button } from "./ui/button.tsx";
 import {
@@ -71,13 +71,26 @@ export default function Conversation() {
     setInput("");
     push("user", text);
     setBusy(true);
+    let started = false;
+    const appendDelta = (delta: string) => {
+      if (!started) {
+        started = true;
+        setBusy(false);
+        push("bot", delta);
+        return;
+      }
+      setMessages((m) => [
+        ...m.slice(0, -1),
+        { role: "bot", text: m[m.length - 1].text + delta },
+      ]);
+    };
     try {
-      const j: ChatOut = await chatStep(sessionId, text);
+      const j: ChatOut = await chatStream(sessionId, text, appendDelta);
       if (j.error) {
         setError(j.error);
         return;
       }
-      push("bot", j.reply || "");
+      if (!started) push("bot", j.reply || "");
     } catch (err: unknown) {
       if (err instanceof Error) {
         setError(err.message);
@@ -1,6 +1,6 @@
 import { useState, type FormEvent } from 'react';
 import Stats from './Stats.tsx';
-import { ingestPdf } from '../lib/api';
+import { fetchIngestJob, ingestPdf } from '../lib/api';
 
 export default function Ingest() {
   const [msg, setMsg] = useState('');
@@ -15,7 +15,20 @@ export default function Ingest() {
     setMsg('Uploading…');
     try {
       const j = await ingestPdf(file);
-      setMsg(j.ok ? `Ingested ${j.chunks} chunks in ${j.seconds ?? '?'}s` : (j.msg || 'Error'));
+      if (!j.ok) {
+        setMsg(j.msg || 'Error');
+      } else {
+        // Ingestion runs as a background job; poll until it settles.
+        let job = await fetchIngestJob(j.job_id);
+        while (job.status === 'queued' || job.status === 'running') {
+          setMsg(job.status === 'queued' ? 'Queued…' : `Ingesting… ${job.chunks_done} chunks so far`);
+          await new Promise((r) => setTimeout(r, 1000));
+          job = await fetchIngestJob(j.job_id);
+        }
+        setMsg(job.status === 'done'
+          ? `Ingested ${job.chunks_done} chunks in ${job.elapsed_seconds ?? '?'}s`
+          : (job.error || `Ingest ${job.status}`));
+      }
     } catch (err) {
       setMsg('Upload failed');
     }
@@ -18,6 +18,12 @@ export async function ingestPdf(file: File) {
   return res.json();
 }
 
+export async function fetchIngestJob(job_id: string) {
+  const res = await fetch(`/api/ingest/jobs/${job_id}`);
+  if (!res.ok) await handleErrorResponse(res, "Failed to fetch ingest job");
+  return res.json();
+}
+
 export async function chatStep(session_id: string, message: string) {
   const res = await fetch("/api/chat", {
     method: "POST",
@@ -28,6 +34,40 @@ export async function chatStep(session_id: string, message: string) {
   return res.json();
 }
 
+// Streams a chat turn over SSE. `onDelta` receives text as it is generated;
+// resolves with the final ChatOut from the `done` event.
+export async function chatStream(
+  session_id: string,
+  message: string,
+  onDelta: (text: string) => void,
+) {
+  const res = await fetch("/api/chat/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ session_id, message }),
+  });
+  if (!res.ok || !res.body) await handleErrorResponse(res, "Chat step failed");
+
+  const reader = res.body!.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) >= 0) {
+      const frame = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const event = /^event: (.*)$/m.exec(frame)?.[1];
+      const data = JSON.parse(/^data: (.*)$/m.exec(frame)?.[1] ?? "null");
+      if (event === "delta") onDelta(data.text);
+      else if (event === "done") return data;
+      else if (event === "error") throw new Error(data.detail ?? "Server error");
+    }
+  }
+  throw new Error("Stream ended unexpectedly");
+}
+
 async function handleErrorResponse(res: Response, details: string) {
     let json;
     try {
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+from app.models.dialog_models import SessionState
+from app.services import compactor as compactor_module
+from app.services.compactor import ConversationCompactor
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.calls = 0
+
+    async def response(self, model, input):
+        self.calls += 1
+        return "user feels anxious about work"
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(compactor_module, "_get_token_count", lambda text: len(text.split()))
+
+
+def turn(i: int, words: int = 10) -> dict:
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": " ".join([f"t{i}"] * words)}
+
+
+def make(oa=None, **kwargs) -> ConversationCompactor:
+    return ConversationCompactor(oa or FakeOpenAI(), model="m", **{"budget": 100, "recent_turns": 4,
+                                                                    "summary_batch": 4, **kwargs})
+
+
+def sent(history) -> list:
+    return [t["content"].split()[0] for t in json.loads(history.payload)["recent_turns"]]
+
+
+def test_recent_turns_are_kept_even_past_the_budget():
+    state = SessionState(turns=[turn(i) for i in range(5)] + [turn(5, words=500)])
+    history = make().compact(state)
+    assert sent(history)[-4:] == ["t2", "t3", "t4", "t5"]
+    assert "t0" not in sent(history)
+
+
+def test_older_turns_fill_the_remaining_budget():
+    state = SessionState(turns=[turn(i) for i in range(8)])
+    assert sent(make().compact(state)) == [f"t{i}" for i in range(8)]
+    state = SessionState(turns=[turn(i) for i in range(8)] + [turn(8, words=45)])
+    assert sent(make().compact(state)) == [f"t{i}" for i in range(3, 9)]
+
+
+def test_fold_runs_in_the_background_and_is_used_next_turn():
+    oa = FakeOpenAI()
+    compactor = make(oa)
+    state = SessionState(turns=[turn(i) for i in range(10)])
+
+    async def turn_cycle():
+        compactor.compact(state, "s1")
+        assert oa.calls == 0  # planning never waits for a fold
+        compactor.fold_later("s1", state)
+        await asyncio.gather(*compactor._tasks)
+
+    asyncio.run(turn_cycle())
+    assert oa.calls == 1 and state.history_summary is None
+
+    state.turns.append(turn(10))
+    history = compactor.compact(state, "s1")
+    assert json.loads(history.payload)["history_summary"] == "user feels anxious about work"
+    assert all(t.get("summarized") for t in state.turns[:6])
+    assert sent(history) == [f"t{i}" for i in range(6, 11)]
+
+
+def test_fold_is_dropped_when_the_turns_it_covers_are_gone():
+    compactor = make()
+    state = SessionState(turns=[turn(i) for i in range(10)])
+
+    async def fold():
+        compactor.fold_later("s1", state)
+        await asyncio.gather(*compactor._tasks)
+
+    asyncio.run(fold())
+    trimmed = SessionState(turns=state.turns[2:])
+    compactor.compact(trimmed, "s1")
+    assert trimmed.history_summary is None
+    assert not any(t.get("summarized") for t in trimmed.turns)
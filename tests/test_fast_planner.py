@@ -0,0 +1,42 @@
+import pytest
+
+from app.models.dialog_models import SessionState
+from app.services.fast_planner import FastPlanner
+
+
+@pytest.fixture
+def planner():
+    return FastPlanner()
+
+
+@pytest.mark.parametrize("msg,safety", [
+    ("I want to die", "crisis"),
+    ("I've been thinking about killing myself", "crisis"),
+    ("I feel suicidal, not sure why", "crisis"),
+    ("I took an overdose an hour ago", "medical"),
+    ("I'm having chest pains", "medical"),
+])
+def test_certain_phrases_end_the_dialog(planner, msg, safety):
+    action = planner.plan(SessionState(), msg)
+    assert action is not None
+    assert action.stage == "end" and action.safety == safety
+    assert planner.safety_hint(msg) is None
+
+
+@pytest.mark.parametrize("msg", [
+    "I'm not suicidal, just tired",
+    "I never wanted to die, I just feel flat",
+    "I don't want to die but I'm scared",
+    "my brush strokes feel clumsy lately",
+    "I keep fainting when I stand up",
+    "beats me why I'm so sad",
+])
+def test_negated_or_ambiguous_hits_go_to_the_llm_with_a_hint(planner, msg):
+    assert planner.plan(SessionState(), msg) is None
+    assert "Safety check" in planner.safety_hint(msg)
+
+
+@pytest.mark.parametrize("msg", ["I feel anxious about work", "everything has felt heavy since the move"])
+def test_messages_outside_the_lexicon_get_no_hint(planner, msg):
+    assert planner.plan(SessionState(stage="ask_feelings"), msg) is None
+    assert planner.safety_hint(msg) is None
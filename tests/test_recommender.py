@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.models.dialog_models import SessionState
+from app.services.rec_cache import RecommendationCache
+from app.services.recommender import Recommender
+
+CONTEXTS = [{"text": "Mimulus for known fears.", "meta": {"source": "bach.pdf", "page": 3}}]
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.prompts = []
+
+    async def response(self, model, input):
+        self.prompts.append(input[-1]["content"])
+        return f"recommendation {len(self.prompts)}"
+
+    async def embed(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+def make_recommender():
+    oa = FakeOpenAI()
+    retriever = SimpleNamespace(chroma_repo=SimpleNamespace(version=1))
+    return Recommender(oa, "model", retriever, RecommendationCache(similarity=0)), oa
+
+
+def test_free_text_context_reaches_the_prompt():
+    rec, oa = make_recommender()
+    state = SessionState(feelings=["sad"], context="grief after a bereavement", duration="persistent", goal="calm")
+    summary = "Sad since a bereavement last month, wants calm."
+    asyncio.run(rec.recommend(summary, state=state, contexts=CONTEXTS))
+    assert summary in oa.prompts[0]
+
+
+def test_sessions_with_context_are_not_served_from_the_cache():
+    rec, oa = make_recommender()
+    first = SessionState(feelings=["anxious"], context="work deadlines", duration="acute", goal="calm")
+    second = SessionState(feelings=["anxious"], context="exam next week", duration="acute", goal="calm")
+    asyncio.run(rec.recommend("Anxious about work deadlines.", state=first, contexts=CONTEXTS))
+    reply = asyncio.run(rec.recommend("Anxious about an exam next week.", state=second, contexts=CONTEXTS))
+    assert reply == "recommendation 2"
+    assert "work deadlines" not in oa.prompts[1]
+
+
+def test_sessions_without_context_share_a_cache_entry():
+    rec, oa = make_recommender()
+    state = SessionState(feelings=["anxious"], duration="acute", goal="calm")
+    first = asyncio.run(rec.recommend("Anxious, wants calm.", state=state, contexts=CONTEXTS))
+    again = asyncio.run(rec.recommend("Feeling anxious; calm please.", state=state.model_copy(), contexts=CONTEXTS))
+    assert again == first and len(oa.prompts) == 1